@@ -0,0 +1,3 @@
+"""
+Benchmarks de carga del bot contra servicios locales (sin red)
+"""
@@ -0,0 +1,66 @@
+"""
+Updates y contextos sintéticos para ejecutar los handlers de BotController
+sin Telegram (las respuestas van al stub de tools/stub_services.py).
+"""
+import time
+from telegram import Bot, Update
+
+
+def make_bot(api_base_url: str, token: str = "123456:BENCHMARK") -> Bot:
+    """
+    Bot de python-telegram-bot apuntando a la API de Telegram del stub
+    """
+    return Bot(token, base_url=f"{api_base_url}/bot", base_file_url=f"{api_base_url}/file/bot")
+
+
+class FakeContext:
+    """Sustituto mínimo de ContextTypes.DEFAULT_TYPE para los handlers"""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.chat_data = {}
+        self.user_data = {}
+        self.bot_data = {}
+
+
+def _user(chat_id: int) -> dict:
+    return {"id": chat_id, "is_bot": False, "first_name": f"Estudiante {chat_id}"}
+
+
+def _message(chat_id: int, message_id: int, text: str, **extra) -> dict:
+    message = {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": _user(chat_id),
+        "text": text,
+    }
+    message.update(extra)
+    return message
+
+
+def text_update(bot: Bot, update_id: int, chat_id: int, text: str) -> Update:
+    return Update.de_json({"update_id": update_id, "message": _message(chat_id, update_id, text)}, bot)
+
+
+def command_update(bot: Bot, update_id: int, chat_id: int, command: str) -> Update:
+    text = f"/{command}"
+    entities = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return Update.de_json(
+        {"update_id": update_id, "message": _message(chat_id, update_id, text, entities=entities)}, bot
+    )
+
+
+def callback_update(bot: Bot, update_id: int, chat_id: int, data: str) -> Update:
+    message = _message(chat_id, update_id, "Selecciona el recurso que deseas recibir:")
+    message["from"] = {"id": 1, "is_bot": True, "first_name": "Stub"}
+    return Update.de_json({
+        "update_id": update_id,
+        "callback_query": {
+            "id": f"cb{update_id}",
+            "from": _user(chat_id),
+            "chat_instance": f"ci{chat_id}",
+            "data": data,
+            "message": message,
+        },
+    }, bot)
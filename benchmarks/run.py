@@ -0,0 +1,309 @@
+"""
+Benchmark de carga de BotController contra servicios locales (sin red).
+
+Ejecuta los handlers reales con updates sintéticos: el LLM, la API de Telegram,
+la búsqueda web y los PDFs son los stubs de tools/stub_services.py. Informa del
+rendimiento (peticiones/s), la latencia p50/p95/p99 por handler y el mayor
+bloqueo del event loop, en JSON. Ejemplos:
+
+    python -m benchmarks.run --chats 50 --messages 3 --llm-delay 0.3
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline results.json --tolerance 0.2
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from benchmarks.fakes import FakeContext, callback_update, command_update, make_bot, text_update
+from tools.stub_services import StubServices
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+QUESTIONS = (
+    "¿Qué es un agente inteligente?",
+    "Explica la búsqueda heurística",
+    "Diferencias entre aprendizaje supervisado y no supervisado",
+    "¿Qué criterios tiene la plantilla del corte II?",
+    "¿Cuánto vale k-means en el corte III?",
+)
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(values: list) -> dict:
+    summary = {"count": len(values)}
+    for q in PERCENTILES:
+        summary[f"p{int(q * 100)}_ms"] = round(percentile(values, q) * 1000, 2)
+    summary["mean_ms"] = round(sum(values) / len(values) * 1000, 2) if values else 0.0
+    summary["max_ms"] = round(max(values) * 1000, 2) if values else 0.0
+    return summary
+
+
+class LoopStallMonitor:
+    """Mide el mayor retraso del event loop al despertar de sleeps cortos"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.max_stall = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.max_stall = max(self.max_stall, loop.time() - started - self.interval)
+
+    def start(self):
+        self.max_stall = 0.0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> float:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return self.max_stall
+
+
+def configure_environment(stub: StubServices, workdir: str, args) -> None:
+    """
+    Apunta el bot a los stubs y a directorios temporales
+    """
+    os.environ.update(
+        API_TOKEN_deepseek="benchmark",
+        LLM_BASE_URL=f"{stub.base_url}/v1",
+        WEB_SEARCH_ENDPOINT=f"{stub.base_url}/search",
+        PDF_URL=f"{stub.base_url}/material.pdf",
+        PDF_URL_CORTE_I=f"{stub.base_url}/corte_i.pdf",
+        PDF_URL_CORTE_II=f"{stub.base_url}/corte_ii.pdf",
+        PDF_URL_CORTE_III=f"{stub.base_url}/corte_iii.pdf",
+        PDF_CACHE_DIR=os.path.join(workdir, "pdf_cache"),
+        RESOURCE_REGISTRY_PATH=os.path.join(workdir, "resource_registry.json"),
+        ANSWER_CACHE_PATH=os.path.join(workdir, "answer_cache.json"),
+        FAQ_DIR=os.path.join(workdir, "faq"),
+        HISTORY_DB_PATH=os.path.join(workdir, "history.sqlite3"),
+        LOG_FILE_PATH=os.path.join(workdir, "interactions.log"),
+        RATE_LIMIT_PER_MINUTE="0",
+        STREAM_EDIT_INTERVAL=str(args.edit_interval),
+    )
+
+
+async def run_scenario(name: str, conversations: list, concurrency: int, stub: StubServices) -> dict:
+    """
+    Ejecuta las conversaciones en paralelo (cada una en orden, como hace el
+    procesador de updates por chat) y resume latencias por handler
+
+    Args:
+        name: Nombre del escenario
+        conversations: Lista de listas de (handler, update, contexto)
+        concurrency: Updates en ejecución a la vez como máximo
+        stub: Servicios locales (para contar llamadas al LLM)
+    """
+    latencies = {}
+    errors = {}
+    workers = asyncio.Semaphore(concurrency)
+    monitor = LoopStallMonitor()
+    llm_calls = stub.llm_calls
+
+    async def run_conversation(steps):
+        for handler, update, context in steps:
+            handler_name = handler.__name__
+            async with workers:
+                started = time.perf_counter()
+                try:
+                    await handler(update, context)
+                except Exception:
+                    errors[handler_name] = errors.get(handler_name, 0) + 1
+                latencies.setdefault(handler_name, []).append(time.perf_counter() - started)
+
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(run_conversation(steps) for steps in conversations))
+    wall = time.perf_counter() - started
+    max_stall = await monitor.stop()
+
+    requests = sum(len(values) for values in latencies.values())
+    result = {
+        "requests": requests,
+        "errors": sum(errors.values()),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(requests / wall, 2) if wall else 0.0,
+        "max_loop_stall_ms": round(max_stall * 1000, 2),
+        "llm_calls": stub.llm_calls - llm_calls,
+        "handlers": {
+            handler_name: {**summarize(values), "errors": errors.get(handler_name, 0)}
+            for handler_name, values in sorted(latencies.items())
+        },
+    }
+    print(
+        f"📊 {name}: {requests} updates en {wall:.2f} s ({result['throughput_rps']}/s), "
+        f"bloqueo máximo del loop {result['max_loop_stall_ms']} ms",
+        file=sys.stderr,
+    )
+    return result
+
+
+async def run_benchmarks(args) -> dict:
+    # Caché de PDFs, historial, registros e instantánea solo viven durante la ejecución
+    with tempfile.TemporaryDirectory(prefix="bot_benchmark_") as workdir:
+        return await _run_benchmarks(args, workdir)
+
+
+async def _run_benchmarks(args, workdir: str) -> dict:
+    stub = StubServices(llm_delay=args.llm_delay, llm_chunks=args.llm_chunks, llm_chunk_delay=args.llm_chunk_delay).start()
+    configure_environment(stub, workdir, args)
+
+    # Importar después de configurar el entorno
+    from controllers.bot_controller import BotController
+
+    results = {"pdf_load_ms": {}}
+    controller = BotController()
+    started = time.perf_counter()
+    controller.initialize_pdf()
+    results["pdf_load_ms"]["cold"] = round((time.perf_counter() - started) * 1000, 2)
+    warm = BotController()
+    started = time.perf_counter()
+    warm.initialize_pdf()
+    results["pdf_load_ms"]["warm"] = round((time.perf_counter() - started) * 1000, 2)
+    await warm.aclose()
+
+    bot = make_bot(stub.base_url)
+    await bot.initialize()
+    update_id = 0
+    chat_base = 100000
+
+    def next_id() -> int:
+        nonlocal update_id
+        update_id += 1
+        return update_id
+
+    def conversations(builder) -> list:
+        # Cada escenario usa chats nuevos para no heredar historial de los anteriores
+        nonlocal chat_base
+        chats = [chat_base + i for i in range(args.chats)]
+        chat_base += args.chats
+        return [builder(chat_id, FakeContext(bot)) for chat_id in chats]
+
+    scenarios = {}
+    try:
+        controller.streaming_enabled = True
+        scenarios["text_streaming"] = await run_scenario("text_streaming", conversations(lambda chat_id, ctx: [
+            (controller.handle_text_message,
+             text_update(bot, next_id(), chat_id, f"{QUESTIONS[(chat_id + m) % len(QUESTIONS)]} (variante {chat_id}-{m})"), ctx)
+            for m in range(args.messages)
+        ]), args.concurrency, stub)
+
+        controller.streaming_enabled = False
+        scenarios["text_no_streaming"] = await run_scenario("text_no_streaming", conversations(lambda chat_id, ctx: [
+            (controller.handle_text_message,
+             text_update(bot, next_id(), chat_id, f"{QUESTIONS[(chat_id + m) % len(QUESTIONS)]} (variante {chat_id}-{m})"), ctx)
+            for m in range(args.messages)
+        ]), args.concurrency, stub)
+
+        # Ráfaga de la misma pregunta en todos los chats (agrupación y caché de respuestas)
+        controller.streaming_enabled = True
+        scenarios["text_burst_same_question"] = await run_scenario("text_burst_same_question", conversations(
+            lambda chat_id, ctx: [(controller.handle_text_message, text_update(bot, next_id(), chat_id, QUESTIONS[0]), ctx)]
+        ), args.concurrency, stub)
+
+        scenarios["commands"] = await run_scenario("commands", conversations(lambda chat_id, ctx: [
+            (controller.handle_start_command, command_update(bot, next_id(), chat_id, "start"), ctx),
+            (controller.handle_resources_command, command_update(bot, next_id(), chat_id, "recursos"), ctx),
+            (controller.handle_resources_callback, callback_update(bot, next_id(), chat_id, "resource_corte_ii"), ctx),
+        ]), args.concurrency, stub)
+    finally:
+        await bot.shutdown()
+        await controller.aclose()
+        stub.stop()
+
+    results["scenarios"] = scenarios
+    results["llm_backends"] = controller.llm_client.backend_stats()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Regresiones respecto a una ejecución anterior (p95 por handler y rendimiento)
+
+    Returns:
+        list[str]: Descripción de cada regresión encontrada
+    """
+    regressions = []
+    for name, scenario in results.get("scenarios", {}).items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if scenario["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rendimiento {previous['throughput_rps']} -> {scenario['throughput_rps']} updates/s")
+        for handler_name, stats in scenario["handlers"].items():
+            before = previous.get("handlers", {}).get(handler_name)
+            if before and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name}/{handler_name}: p95 {before['p95_ms']} -> {stats['p95_ms']} ms")
+    for phase in ("cold", "warm"):
+        before = baseline.get("pdf_load_ms", {}).get(phase)
+        now = results.get("pdf_load_ms", {}).get(phase)
+        # Margen absoluto: cargas de pocos milisegundos son muy ruidosas
+        if before is not None and now is not None and now > before * (1 + tolerance) + 50:
+            regressions.append(f"pdf_load/{phase}: {before} -> {now} ms")
+    return regressions
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de carga de BotController con servicios locales")
+    parser.add_argument("--chats", type=int, default=50, help="Estudiantes (chats) simultáneos")
+    parser.add_argument("--messages", type=int, default=3, help="Preguntas por chat en los escenarios de texto")
+    parser.add_argument("--concurrency", type=int, default=16, help="Updates en ejecución a la vez (UPDATE_WORKERS)")
+    parser.add_argument("--llm-delay", type=float, default=0.3, help="Latencia simulada del LLM hasta el primer token (s)")
+    parser.add_argument("--llm-chunks", type=int, default=8, help="Fragmentos por respuesta en streaming")
+    parser.add_argument("--llm-chunk-delay", type=float, default=0.05, help="Segundos entre fragmentos en streaming")
+    parser.add_argument("--edit-interval", type=float, default=0.2, help="STREAM_EDIT_INTERVAL durante el benchmark")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados (por defecto, salida estándar)")
+    parser.add_argument("--baseline", help="Resultados anteriores con los que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Empeoramiento relativo tolerado frente a --baseline")
+    args = parser.parse_args(argv)
+
+    results = {
+        "version": 1,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+    }
+    # Los mensajes del bot van a stderr para que la salida estándar sea solo JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        results.update(asyncio.run(run_benchmarks(args)))
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        ignored = ("tolerance",)
+        if {k: v for k, v in baseline.get("config", {}).items() if k not in ignored} != \
+                {k: v for k, v in results["config"].items() if k not in ignored}:
+            print("⚠️ La referencia se obtuvo con otra configuración; la comparación puede no ser válida", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"❌ Regresión: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("✅ Sin regresiones respecto a la referencia", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
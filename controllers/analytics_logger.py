@@ -1,17 +1,46 @@
 import os
 import json
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import threading
 from datetime import datetime
 import hashlib
 
 
 class AnalyticsLogger:
+    """
+    Registro de interacciones en JSONL. Las entradas se encolan desde el event loop
+    y un hilo en segundo plano las serializa y escribe por lotes, rotando el archivo
+    por tamaño o por día y comprimiendo con gzip los segmentos rotados.
+    """
+
     def __init__(self) -> None:
         self.log_file_path = os.getenv("LOG_FILE_PATH", "logs/interactions.log")
         self.anonymize = os.getenv("ANONYMIZE_LOGS", "false").lower() == "true"
+        self.batch_size = int(os.getenv("LOG_BATCH_SIZE", "100"))
+        self.flush_interval = float(os.getenv("LOG_FLUSH_INTERVAL", "2"))
+        self.rotate_bytes = int(os.getenv("LOG_ROTATE_BYTES", str(50 * 1024 * 1024)))
+        self.rotate_daily = os.getenv("LOG_ROTATE_DAILY", "true").lower() == "true"
+        # Política con la cola llena: "drop_newest" descarta la entrada nueva,
+        # "drop_oldest" descarta la más antigua pendiente para hacerle sitio
+        self.full_policy = os.getenv("LOG_QUEUE_FULL_POLICY", "drop_newest")
+        self.dropped = 0
+        self.write_errors = 0
         directory = os.path.dirname(self.log_file_path)
         if directory:
             os.makedirs(directory, exist_ok=True)
 
+        self._queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        self._stop = object()
+        self._closed = False
+        self._segment_day = self._current_segment_day()
+        self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
     def _get_user_id(self, update) -> str | None:
         chat = update.effective_chat
         if not chat:
@@ -21,7 +50,7 @@ class AnalyticsLogger:
             return chat_id
         return hashlib.sha256(chat_id.encode("utf-8")).hexdigest()
 
-    def log_interaction(self, update, question: str, answer: str, source: str | None = None, used_web: bool | None = None) -> None:
+    def log_interaction(self, update, question: str, answer: str, source: str | None = None, used_web: str | None = None, latencies: dict | None = None, course: str | None = None) -> None:
         entry = {
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "user_id": self._get_user_id(update),
@@ -30,8 +59,100 @@ class AnalyticsLogger:
             "source": source,
             "used_web": used_web,
         }
+        if latencies:
+            entry["latency_ms"] = latencies
+        if course:
+            entry["course"] = course
+        self._enqueue(entry)
+
+    def _enqueue(self, entry: dict) -> None:
+        if self._closed:
+            return
         try:
-            with open(self.log_file_path, "a", encoding="utf-8") as f:
-                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-        except Exception:
+            self._queue.put_nowait(entry)
+            return
+        except queue.Full:
             pass
+        if self.full_policy == "drop_oldest":
+            try:
+                self._queue.get_nowait()
+                self._queue.put_nowait(entry)
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            print(f"⚠️ Cola de analítica llena: {self.dropped} entradas descartadas ({self.full_policy})")
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Vacía la cola, escribe lo pendiente y detiene el hilo escritor
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._stop)
+        self._thread.join(timeout)
+
+    # --- Hilo escritor ---
+
+    def _run(self) -> None:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is self._stop:
+                self._write(batch)
+                return
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch: list) -> None:
+        if not batch:
+            return
+        try:
+            self._maybe_rotate()
+            data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch)
+            with open(self.log_file_path, "a", encoding="utf-8") as f:
+                f.write(data)
+        except Exception as e:
+            self.write_errors += 1
+            print(f"⚠️ No se pudo escribir el registro de analítica ({len(batch)} entradas): {e}")
+
+    def _current_segment_day(self) -> str:
+        try:
+            mtime = os.path.getmtime(self.log_file_path)
+        except OSError:
+            return datetime.utcnow().strftime("%Y-%m-%d")
+        return datetime.utcfromtimestamp(mtime).strftime("%Y-%m-%d")
+
+    def _maybe_rotate(self) -> None:
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        try:
+            size = os.path.getsize(self.log_file_path)
+        except OSError:
+            self._segment_day = today
+            return
+        if size == 0:
+            return
+        if size < self.rotate_bytes and not (self.rotate_daily and today != self._segment_day):
+            return
+        # Contador fijo de 3 cifras en todos los segmentos: el orden alfabético de los
+        # nombres es el cronológico aunque roten varios en el mismo segundo
+        stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        sequence = 0
+        rotated = f"{self.log_file_path}.{stamp}-{sequence:03d}"
+        while os.path.exists(rotated + ".gz") or os.path.exists(rotated):
+            sequence += 1
+            rotated = f"{self.log_file_path}.{stamp}-{sequence:03d}"
+        os.replace(self.log_file_path, rotated)
+        self._segment_day = today
+        with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
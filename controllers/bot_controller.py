@@ -1,31 +1,208 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
-from openai import OpenAI
 from models.pdf_handler import PDFHandler
-from controllers.analytics_logger import AnalyticsLogger
+from models.page_extractor import PageExtractor, PageTextCache
+from models.material_snapshot import MaterialSnapshot
+from models.faq_store import FAQStore
+from models.history_store import HistoryStore, build_history_backend
+from models.course_registry import CourseConfig, default_course
+from models.text_index import estimate_tokens, question_key
+from controllers.llm_routing import LLMUnavailableError
+from controllers.shared_services import SharedServices
+from controllers.stream_reply import StreamingReply, split_message
+from controllers.request_control import SingleFlight, TokenBucketLimiter
+from controllers.prompt_builder import PromptBuilder
+from controllers.metrics import (
+    REGISTRY, CACHE_REQUESTS, HISTORY_ACTIVE_CHATS, MATERIAL_LOADED, PROMPT_TOKENS, RATE_LIMITED, STAGE_DURATION, instrument_handler,
+)
+from typing import Optional
 import os
-import requests
+import math
+import time
+import asyncio
+import traceback
 from io import BytesIO
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
 load_dotenv()
 
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+# Mensajes al estudiante cuando el LLM no responde (el detalle del error solo va al log)
+LLM_TIMEOUT_MESSAGE = "❌ Error: el modelo tardó demasiado en responder. Por favor, intenta de nuevo."
+LLM_UNAVAILABLE_MESSAGE = "❌ El modelo no está disponible en este momento. Por favor, intenta de nuevo en unos minutos."
+LLM_ERROR_MESSAGE = "❌ No se pudo obtener una respuesta del modelo. Por favor, intenta de nuevo."
+# Errores inesperados: el detalle va al registro, nunca al estudiante
+UNEXPECTED_ERROR_MESSAGE = "❌ Ocurrió un error inesperado. Por favor, intenta de nuevo más tarde."
+
 class BotController:
+    """
+    Bot de un curso. Sin argumentos atiende el curso configurado con las variables de
+    entorno y crea sus propios recursos; en modo multicurso cada curso tiene su
+    controlador y todos comparten los mismos `SharedServices`.
+    """
     
-    def __init__(self):
-        self.pdf_handler = PDFHandler()
-        self.client = OpenAI(
-            api_key=os.getenv("API_TOKEN_deepseek"),
-            base_url="https://openrouter.ai/api/v1"
+    def __init__(self, course: Optional[CourseConfig] = None, services: Optional[SharedServices] = None):
+        self.course = course or default_course()
+        self._owns_services = services is None
+        self.services = services or SharedServices()
+        self.pdf_store = self.services.pdf_store
+        self.http_client = self.services.http_client
+        self.llm_client = self.services.llm_client
+        self.web_search = self.services.web_search
+        self.analytics_logger = self.services.analytics_logger
+        self.resource_registry = self.services.resource_registry
+        self.answer_cache = self.services.answer_cache
+        # Texto, índice y cachés en disco del material son de cada curso
+        pdf_cache_dir = os.getenv("PDF_CACHE_DIR", "data/pdf_cache")
+        self.pdf_handler = PDFHandler(
+            self.pdf_store,
+            self.course.documents,
+            PageExtractor(PageTextCache(self.course.scoped_path(os.path.join(pdf_cache_dir, "pages")))),
+            MaterialSnapshot(self.course.scoped_path(
+                os.getenv("MATERIAL_SNAPSHOT_PATH", os.path.join(pdf_cache_dir, "material.snapshot"))
+            )),
         )
-        self.analytics_logger = AnalyticsLogger()
+        # Respuestas precalculadas con tools/build_faq.py para la versión actual del material
+        self.faq_store = FAQStore(self.course.scoped_path(os.getenv("FAQ_DIR", "data/faq")))
+        self.refresh_interval = float(os.getenv("PDF_REFRESH_SECONDS", "900"))
+        # Estado del material: "loading", "ready", "unavailable" o "idle" (sin cargar hasta la
+        # primera pregunta; solo en cursos sin precarga, que se descargan tras COURSE_IDLE_SECONDS)
+        self.material_state = "loading" if self.course.preload else "idle"
+        self.material_retry_max = float(os.getenv("PDF_LOAD_RETRY_MAX_SECONDS", "300"))
+        self.course_idle_seconds = float(os.getenv("COURSE_IDLE_SECONDS", "1800"))
+        self.last_used = time.monotonic()
+        self._material_lock = asyncio.Lock()
+        self.rag_top_k = int(os.getenv("RAG_TOP_K", "6"))
+        self.rag_token_budget = int(os.getenv("RAG_TOKEN_BUDGET", "1500"))
+        rules, closing = self.course.system_rules()
+        self.prompt_builder = PromptBuilder(rules=rules, closing=closing)
+        self.web_skip_relevance = float(os.getenv("WEB_SEARCH_SKIP_RELEVANCE", "0.6"))
+        self.answer_cache_save_every = int(os.getenv("ANSWER_CACHE_SAVE_EVERY", "25"))
+        self.streaming_enabled = os.getenv("STREAMING_ENABLED", "true").lower() == "true"
+        # Preguntas idénticas en vuelo comparten una sola llamada al LLM
+        self.single_flight = SingleFlight(int(os.getenv("SINGLE_FLIGHT_MAX_KEYS", "256")))
+        # Límite de mensajes por chat (cubeta de tokens)
+        self.rate_limiter = TokenBucketLimiter(
+            float(os.getenv("RATE_LIMIT_PER_MINUTE", "6")),
+            int(os.getenv("RATE_LIMIT_BURST", "3")),
+            int(os.getenv("RATE_LIMIT_MAX_CHATS", "10000")),
+        )
+        # Historial de conversación persistente con memoria acotada
+        self.history_store = HistoryStore(build_history_backend(
+            self.course.scoped_path(os.getenv("HISTORY_DB_PATH", "data/history.sqlite3"))
+        ))
+        self.history_summary_enabled = os.getenv("HISTORY_SUMMARY", "false").lower() == "true"
+        self.history_evict_interval = float(os.getenv("HISTORY_EVICT_INTERVAL", "300"))
+        REGISTRY.register_collector(self._collect_metrics)
+    
+    def readiness(self) -> tuple:
+        """
+        Estado para el endpoint /ready
+        
+        Returns:
+            tuple[bool, str]: (listo, detalle)
+        """
+        if self.pdf_handler.is_pdf_loaded() and self.material_state == "ready":
+            return True, f"READY material={self.pdf_handler.content_hash}"
+        if self.material_state == "idle":
+            return True, "READY material=bajo demanda"
+        if self.material_state == "loading":
+            return False, "NOT READY: cargando el material del curso"
+        return False, "NOT READY: material del curso no cargado"
+    
+    def _collect_metrics(self):
+        MATERIAL_LOADED.set(1 if self.pdf_handler.is_pdf_loaded() else 0, course=self.course.course_id)
+        HISTORY_ACTIVE_CHATS.set(self.history_store.active_chats, course=self.course.course_id)
+    
+    async def aclose(self):
+        
+        #Cierra el historial del curso y, si el controlador creó sus propios recursos,
+        #guarda la caché de respuestas, vacía la cola de analítica y cierra el pool HTTP
+        
+        await asyncio.to_thread(self.history_store.close)
+        if self._owns_services:
+            await self.services.aclose()
     
     def initialize_pdf(self) -> bool:
         
-        "Inicializa la carga del PDF"
+        "Inicializa la carga del PDF y la FAQ precalculada de esa versión del material"
         
-        return self.pdf_handler.load_pdf()
+        loaded = self.pdf_handler.load_pdf()
+        self.faq_store.activate(self.pdf_handler.content_hash)
+        return loaded
+    
+    async def load_material(self):
+        
+        #Tarea en segundo plano que carga el material al arrancar (sin retrasar el inicio del bot)
+        #y reintenta con espera creciente si falla. El bot se declara listo después de precargar
+        #el cliente del LLM, para que esa importación no coincida con el tráfico
+        
+        delay = 5.0
+        while True:
+            try:
+                loaded = await asyncio.to_thread(self.initialize_pdf)
+            except Exception as e:
+                print(f"⚠️ Error al cargar el material: {e}")
+                loaded = False
+            if loaded or self.pdf_handler.is_pdf_loaded():
+                await asyncio.to_thread(self.llm_client.warm_up)
+                self.material_state = "ready"
+                return
+            self.material_state = "unavailable"
+            print(f"⚠️ Advertencia: No se pudo cargar el PDF; reintento en {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.material_retry_max)
+    
+    async def ensure_material(self) -> bool:
+        """
+        Comprueba que el material esté en memoria; en los cursos sin precarga lo carga
+        con la primera pregunta (normalmente desde la instantánea, en milisegundos)
+        
+        Returns:
+            bool: True si el material está disponible
+        """
+        self.last_used = time.monotonic()
+        if self.pdf_handler.is_pdf_loaded():
+            return True
+        if self.course.preload:
+            # La carga (y sus reintentos) la hace load_material en segundo plano
+            return False
+        async with self._material_lock:
+            if self.pdf_handler.is_pdf_loaded():
+                return True
+            self.material_state = "loading"
+            try:
+                loaded = await asyncio.to_thread(self.initialize_pdf)
+            except Exception as e:
+                print(f"⚠️ Error al cargar el material del curso {self.course.course_id}: {e}")
+                loaded = False
+            if loaded:
+                # Como en load_material: openai se importa fuera del event loop
+                await asyncio.to_thread(self.llm_client.warm_up)
+            self.material_state = "ready" if loaded else "unavailable"
+            return loaded
+    
+    async def run_material_evictor(self):
+        
+        #Tarea en segundo plano que libera el texto y el índice de los cursos sin precarga
+        #que llevan COURSE_IDLE_SECONDS sin preguntas
+        
+        if self.course.preload or self.course_idle_seconds <= 0:
+            return
+        while True:
+            await asyncio.sleep(min(60.0, self.course_idle_seconds))
+            idle = time.monotonic() - self.last_used
+            if idle < self.course_idle_seconds or not self.pdf_handler.is_pdf_loaded():
+                continue
+            async with self._material_lock:
+                self.pdf_handler.unload()
+                self.faq_store.activate(None)
+                self.material_state = "idle"
+            print(f"💤 Material del curso {self.course.course_id} liberado tras {idle:.0f}s sin uso")
     
     def get_pdf_content(self) -> str:
         """
@@ -42,150 +219,266 @@ class BotController:
         
         return self.pdf_handler.is_pdf_loaded()
     
-    def get_pdf_file(self):
+    async def _send_resource(self, message, key: str, caption: str) -> bool:
+        """
+        Envía un recurso PDF reutilizando el file_id de Telegram cuando el documento no cambió
         
-        #Obtiene el archivo PDF para envío
+        Args:
+            message: Mensaje de Telegram al que se responde
+            key: Identificador del recurso en la configuración del curso
+            caption: Texto que acompaña al documento
         
-        return self.pdf_handler.get_pdf_file()
-    
-    def _get_pdf_from_url_env(self, env_var_name: str, default_filename: str):
-        url = os.getenv(env_var_name)
+        Returns:
+            bool: True si el documento se envió
+        """
+        resource = self.course.resource(key)
+        url = resource.url if resource else None
         if not url:
-            return None
-        try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            pdf_file = BytesIO(response.content)
-            pdf_file.name = default_filename
-            return pdf_file
-        except Exception:
-            return None
+            return False
+        
+        # La huella sale del almacén local; solo se descarga si nunca se obtuvo
+        fingerprint = self.pdf_store.current_hash(url)
+        if fingerprint is None:
+            if await asyncio.to_thread(self.pdf_store.fetch, url) is None:
+                return False
+            fingerprint = self.pdf_store.current_hash(url)
+        
+        # Los file_id son de cada bot: la clave lleva el curso
+        registry_key = self.course.scoped_key(key)
+        file_id = self.resource_registry.get(registry_key, fingerprint)
+        CACHE_REQUESTS.inc(cache="telegram_file_id", result="hit" if file_id else "miss")
+        if file_id:
+            try:
+                await message.reply_document(document=file_id, caption=caption)
+                return True
+            except BadRequest:
+                # El file_id ya no es válido para Telegram: se vuelve a subir
+                await asyncio.to_thread(self.resource_registry.invalidate, registry_key)
+        
+        content = await asyncio.to_thread(self.pdf_store.get_cached, url)
+        if not content:
+            return False
+        filename = resource.filename
+        pdf_file = BytesIO(content)
+        pdf_file.name = filename
+        with STAGE_DURATION.time(stage="telegram_send"):
+            sent = await message.reply_document(document=pdf_file, filename=filename, caption=caption)
+        if sent and sent.document:
+            await asyncio.to_thread(self.resource_registry.set, registry_key, fingerprint, sent.document.file_id)
+        return True
+    
+    def refresh_materials(self) -> None:
+        """
+        Revalida todos los PDFs configurados (bloqueante, se ejecuta en un hilo).
+        Si alguno cambió, el texto y el índice se reemplazan de forma atómica.
+        Los cursos con el material descargado de memoria no se revalidan.
+        También recoge una FAQ precalculada nueva o regenerada para el material actual.
+        """
+        previous_hash = self.pdf_handler.content_hash
+        if previous_hash is None:
+            return
+        if self.pdf_handler.refresh():
+            self.answer_cache.discard(previous_hash)
+        self.faq_store.activate(self.pdf_handler.content_hash)
+    
+    async def run_material_refresher(self):
+        
+        #Tarea en segundo plano que revalida periódicamente el material sin bloquear los handlers
+        
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await asyncio.to_thread(self.refresh_materials)
+            except Exception as e:
+                print(f"⚠️ Error al actualizar el material: {e}")
+    
+    async def run_history_evictor(self):
+        
+        #Tarea en segundo plano que descarta de memoria los chats inactivos
+        
+        while True:
+            await asyncio.sleep(self.history_evict_interval)
+            try:
+                await asyncio.to_thread(self.history_store.evict_idle)
+            except Exception as e:
+                print(f"⚠️ Error al depurar el historial: {e}")
     
     def _get_material_recomendado_text(self) -> str:
-        text = os.getenv("MATERIAL_RECOMENDADO")
+        text = self.course.material_recomendado
         if text:
             return text
         return "Por ahora no hay material recomendado configurado. Consulta al docente."
     
-    def _web_search_snippets(self, question: str) -> str:
-        endpoint = os.getenv("WEB_SEARCH_ENDPOINT", "https://api.duckduckgo.com/")
-        params = {
-            "q": question,
-            "format": "json",
-            "no_html": 1,
-            "skip_disambig": 1,
-        }
+    def _build_material_context(self, results: list) -> list:
+        """
+        Da formato a los fragmentos más relevantes para la pregunta
+        respetando el presupuesto de tokens (RAG_TOKEN_BUDGET)
+        
+        Args:
+            results: Resultado de PDFHandler.search (fragmento, puntuación)
+        
+        Returns:
+            list[str]: Fragmentos con su número de página, del más al menos relevante
+        """
+        chunks = [chunk for chunk, _ in results]
+        if not chunks:
+            # Sin coincidencias léxicas: se usa el inicio del material como contexto general
+            chunks = self.pdf_handler.get_leading_chunks(self.rag_top_k)
+        
+        parts = []
+        used = 0
+        for chunk in chunks:
+            header = (
+                "[" + (f"{chunk.document} · " if chunk.document else "") + f"Página {chunk.page}"
+                + (f" · {chunk.section}" if chunk.section else "") + "]"
+            )
+            part = f"{header}\n{chunk.text}"
+            cost = estimate_tokens(part)
+            if used + cost > self.rag_token_budget:
+                if parts:
+                    continue
+                # El primer fragmento siempre entra, recortado al presupuesto
+                part = part[: self.rag_token_budget * 4]
+                cost = self.rag_token_budget
+            parts.append(part)
+            used += cost
+        return parts
+    
+    async def _gather_context(self, question: str, trace: dict) -> tuple:
+        """
+        Busca en el material y en la web en paralelo. Si el material es lo bastante
+        relevante (WEB_SEARCH_SKIP_RELEVANCE) la búsqueda web se cancela.
+        
+        Args:
+            question: Pregunta del usuario
+            trace: Diccionario donde se anota el camino web usado ("used_web")
+        
+        Returns:
+            tuple[list, str]: (fragmentos del material, fragmentos de la web)
+        """
+        latencies = trace.setdefault("latency_ms", {})
+        started = time.perf_counter()
+        web_task = asyncio.create_task(self.web_search.search(question))
         try:
-            response = requests.get(endpoint, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-        except Exception:
-            return ""
-        snippets = []
-        abstract = data.get("AbstractText") or data.get("Abstract")
-        if abstract:
-            snippets.append(abstract)
-        related = data.get("RelatedTopics") or []
-        for item in related:
-            if isinstance(item, dict):
-                text = item.get("Text")
-                if text:
-                    snippets.append(text)
-                topics = item.get("Topics")
-                if isinstance(topics, list):
-                    for sub in topics:
-                        if isinstance(sub, dict):
-                            text = sub.get("Text")
-                            if text:
-                                snippets.append(text)
-            if len(snippets) >= 5:
-                break
-        result = "\n\n".join(snippets)
-        if len(result) > 1500:
-            result = result[:1500]
-        return result
+            results = await asyncio.to_thread(self.pdf_handler.search, question, self.rag_top_k)
+        except BaseException:
+            web_task.cancel()
+            raise
+        latencies["retrieval"] = _elapsed_ms(started)
+        STAGE_DURATION.observe(latencies["retrieval"] / 1000, stage="retrieval")
+        
+        relevance = self.pdf_handler.relevance(question, results)
+        trace["relevance"] = round(relevance, 3)
+        if relevance >= self.web_skip_relevance:
+            web_task.cancel()
+            self.web_search.record_skip()
+            trace["used_web"] = "skipped"
+            web_snippets = ""
+        else:
+            web_snippets, trace["used_web"] = await web_task
+            latencies["web"] = _elapsed_ms(started)
+        return self._build_material_context(results), web_snippets
     
-    async def generate_response(self, question: str, history=None) -> str:
+    async def _build_messages(self, question: str, history: list, trace: dict) -> list:
+        """
+        Construye los mensajes para el modelo (system prompt, historial y pregunta)
         
-        pdf_content = self.get_pdf_content()
+        Args:
+            question: Pregunta del usuario
+            history: Historial de la conversación
+            trace: Diccionario donde se anotan los detalles de la generación
         
-        if not pdf_content:
-            return "❌ El material del curso no está disponible. Por favor, contacta al administrador."
+        Returns:
+            list: Mensajes en formato chat
+        """
+        fragments, web_snippets = await self._gather_context(question, trace)
+        
+        # Prefijo estable (reglas + material fijo) y parte variable dentro del presupuesto de tokens
+        prompt = self.prompt_builder.build(self.pdf_handler.material, fragments, web_snippets, history, question)
+        trace["prompt_tokens"] = prompt.tokens
+        for section, tokens in prompt.tokens.items():
+            PROMPT_TOKENS.inc(tokens, section=section)
+        return prompt.messages
+    
+    async def generate_response(self, question: str, history=None, trace: Optional[dict] = None) -> str:
         
-        web_snippets = self._web_search_snippets(question)
-        if history is None:
-            history = []
+        if trace is None:
+            trace = {}
+        if not self.get_pdf_content():
+            trace["error"] = True
+            return "❌ El material del curso no está disponible. Por favor, contacta al administrador."
         
         try:
-            system_prompt = f"""Eres un asistente educativo especializado en Inteligencia Artificial y en apoyar la asignatura correspondiente.
-
-REGLAS ESTRICTAS:
-1. Debes responder únicamente a preguntas relacionadas con la asignatura de Inteligencia Artificial. Esto incluye tanto:
-   - preguntas que hagan referencia explícita al contenido del material del curso que te proporciono, como
-   - preguntas sobre temas de Inteligencia Artificial en general (por ejemplo, nuevos modelos LLM de Google u otras instituciones, tendencias actuales en IA, aplicaciones de redes neuronales, etc.), siempre que estén dentro del ámbito académico de la asignatura.
-2. Solo debes rechazar preguntas que sean claramente ajenas a la asignatura de Inteligencia Artificial (por ejemplo, deportes, vida personal del usuario, recetas de cocina, noticias políticas sin relación con IA, etc.). En ese caso, responde: "Lo siento, solo puedo responder preguntas relacionadas con el material del curso de Inteligencia Artificial y con mis funciones dentro de este bot. Por favor, haz una pregunta sobre el contenido del documento o sobre algún tema de Inteligencia Artificial."
-3. Debes priorizar siempre el contenido del material del curso. Si una pregunta relacionada con la materia no puede responderse claramente con el material, puedes complementar la respuesta usando la información procedente de la búsqueda web que se te proporciona, manteniéndote siempre en el contexto de la asignatura.
-4. Cuando la pregunta sea sobre temas de Inteligencia Artificial de actualidad (por ejemplo, qué modelo LLM lanzó recientemente una empresa), y esa información no esté en el material, utiliza los resultados de la búsqueda web para dar una respuesta sintética, explicando brevemente el modelo y su relación con la temática de la asignatura.
-5. Cuando el usuario te pregunte qué puedes hacer, describe de forma breve y clara tus capacidades principales: responder dudas sobre el material de Inteligencia Artificial, enviar recursos del curso (por ejemplo mediante el comando /recursos), sugerir material recomendado y usar búsqueda web como apoyo cuando sea útil.
-6. NO inventes información que no esté en el material o en los resultados de la búsqueda web.
-7. Si la información no está ni en el material ni en los resultados de la búsqueda web, indícalo claramente.
-8. Responde en español de forma clara y educativa.
-9. Puedes explicar, aclarar y profundizar en los temas del material, pero NUNCA salgas del contexto del documento ni de los temas propios de la Inteligencia Artificial.
-10. Usa el historial de conversación para mantener el contexto y permitir preguntas de seguimiento, pero no cambies de tema fuera de la asignatura ni respondas sobre asuntos totalmente ajenos.
-
-
-MATERIAL DEL CURSO:
-{pdf_content}
-
-RESULTADOS DE BUSQUEDA EN LA WEB (pueden estar vacíos):
-{web_snippets}
-
-Recuerda: SOLO respondes sobre el contenido de la asignatura de Inteligencia Artificial: prioriza el material del curso y, cuando sea necesario, complétalo con la información de la búsqueda web siempre que esté relacionada con la asignatura y con tus funciones como asistente educativo."""
-            
-            messages = [
-                {"role": "system", "content": system_prompt},
-            ]
-            for item in history:
-                role = item.get("role")
-                content = item.get("content")
-                if role and content:
-                    messages.append({"role": role, "content": content})
-            messages.append({"role": "user", "content": question})
-            
-            response = self.client.chat.completions.create(
-                model="deepseek/deepseek-chat-v3.1",
-                messages=messages,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
+            messages = await self._build_messages(question, history, trace)
+            started = time.perf_counter()
+            respuesta = await self.llm_client.complete(messages, temperature=0.7)
+            trace["latency_ms"]["llm"] = _elapsed_ms(started)
+            return respuesta
             
+        except asyncio.TimeoutError:
+            trace["error"] = True
+            return LLM_TIMEOUT_MESSAGE
+        except LLMUnavailableError:
+            trace["error"] = True
+            return LLM_UNAVAILABLE_MESSAGE
         except Exception as e:
-            return f"❌ Error: {str(e)}"
+            trace["error"] = True
+            print(f"⚠️ Error al consultar el LLM: {e}")
+            return LLM_ERROR_MESSAGE
     
+    async def stream_response(self, question: str, history=None, trace: Optional[dict] = None):
+        """
+        Variante de generate_response que entrega la respuesta por fragmentos
+        
+        Yields:
+            str: Fragmentos de texto de la respuesta (o el mensaje de error)
+        """
+        if trace is None:
+            trace = {}
+        if not self.get_pdf_content():
+            trace["error"] = True
+            yield "❌ El material del curso no está disponible. Por favor, contacta al administrador."
+            return
+        
+        try:
+            messages = await self._build_messages(question, history, trace)
+            latencies = trace["latency_ms"]
+            started = time.perf_counter()
+            async for delta in self.llm_client.stream(messages, temperature=0.7):
+                if "llm_first_token" not in latencies:
+                    latencies["llm_first_token"] = _elapsed_ms(started)
+                yield delta
+            latencies["llm"] = _elapsed_ms(started)
+        except asyncio.TimeoutError:
+            trace["error"] = True
+            yield f"\n\n{LLM_TIMEOUT_MESSAGE}"
+        except LLMUnavailableError:
+            trace["error"] = True
+            yield f"\n\n{LLM_UNAVAILABLE_MESSAGE}"
+        except Exception as e:
+            trace["error"] = True
+            print(f"⚠️ Error al consultar el LLM: {e}")
+            yield f"\n\n{LLM_ERROR_MESSAGE}"
+    
+    @instrument_handler("handle_start_command")
     async def handle_start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         #Maneja el comando /start
         
         
         # Enviar mensaje de bienvenida
-        await update.message.reply_text('Bienvenido al bot explicativo de la materia de Inteligencia Artificial')
+        await update.message.reply_text(f'Bienvenido al bot explicativo de la materia de {self.course.subject}')
         
         # Enviar estado de descarga
         await update.message.reply_text('📄 Descargando el material del curso...')
         
         try:
-            # Obtener el archivo PDF
-            pdf_file = self.get_pdf_file()
-            
-            if pdf_file:
-                # Enviar el PDF
-                await update.message.reply_document(
-                    document=pdf_file,
-                    filename="Psinoptico Inteligencia artificial_2025.pdf",
-                    caption="📚 Aquí está el material del curso de Inteligencia Artificial"
-                )
-                
+            # Enviar el PDF (se reutiliza el file_id de Telegram si ya se subió antes)
+            if await self._send_resource(
+                update.message,
+                self.course.primary.key,
+                f"📚 Aquí está el material del curso de {self.course.subject}",
+            ):
                 # Invitar a leer y hacer preguntas
                 await update.message.reply_text(
                     "📖 Te invito a leer el material y hacer cualquier pregunta sobre el contenido.\n\n"
@@ -196,107 +489,201 @@ Recuerda: SOLO respondes sobre el contenido de la asignatura de Inteligencia Art
                 await update.message.reply_text("❌ Error al descargar el PDF. Por favor, intenta más tarde.")
                 
         except Exception as e:
-            await update.message.reply_text(f"❌ Error al descargar el PDF: {str(e)}")
+            print(f"❌ Error al enviar el material del curso {self.course.course_id}: {e!r}")
+            traceback.print_exc()
+            await update.message.reply_text("❌ Error al descargar el PDF. Por favor, intenta más tarde.")
     
+    @instrument_handler("handle_resources_command")
     async def handle_resources_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         
+        # Un botón por recurso del curso con texto de menú, más el material recomendado
         keyboard = [
-            [InlineKeyboardButton("📄 Sinóptico de la materia", callback_data="resource_sinoptico")],
-            [InlineKeyboardButton("📝 Plantilla Corte I", callback_data="resource_corte_i")],
-            [InlineKeyboardButton("📝 Plantilla Corte II", callback_data="resource_corte_ii")],
-            [InlineKeyboardButton("📝 Plantilla Corte III", callback_data="resource_corte_iii")],
-            [InlineKeyboardButton("📚 Material recomendado", callback_data="resource_material")],
+            [InlineKeyboardButton(resource.button, callback_data=f"resource_{resource.key}")]
+            for resource in self.course.resources if resource.button
         ]
+        keyboard.append([InlineKeyboardButton("📚 Material recomendado", callback_data="resource_material")])
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text("Selecciona el recurso que deseas recibir:", reply_markup=reply_markup)
     
+    @instrument_handler("handle_resources_callback")
     async def handle_resources_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         query = update.callback_query
         if not query:
             return
         await query.answer()
-        data = query.data
-        if data == "resource_sinoptico":
-            pdf_file = self.get_pdf_file()
-            if pdf_file:
-                await query.message.reply_document(
-                    document=pdf_file,
-                    filename="Psinoptico Inteligencia artificial_2025.pdf",
-                    caption="📚 Sinóptico de la materia de Inteligencia Artificial",
-                )
-            else:
-                await query.message.reply_text("❌ No se pudo obtener el sinóptico.")
-        elif data == "resource_corte_i":
-            pdf_file = self._get_pdf_from_url_env("PDF_URL_CORTE_I", "Plantilla_De_Medicion_De_Corte_I.pdf")
-            if pdf_file:
-                await query.message.reply_document(
-                    document=pdf_file,
-                    filename="Plantilla_De_Medicion_De_Corte_I.pdf",
-                    caption="📝 Plantilla de medición de Corte I",
-                )
-            else:
-                await query.message.reply_text("❌ No se pudo obtener la plantilla de Corte I.")
-        elif data == "resource_corte_ii":
-            pdf_file = self._get_pdf_from_url_env("PDF_URL_CORTE_II", "Plantilla_De_Medicion_De_Corte_II.pdf")
-            if pdf_file:
-                await query.message.reply_document(
-                    document=pdf_file,
-                    filename="Plantilla_De_Medicion_De_Corte_II.pdf",
-                    caption="📝 Plantilla de medición de Corte II",
-                )
-            else:
-                await query.message.reply_text("❌ No se pudo obtener la plantilla de Corte II.")
-        elif data == "resource_corte_iii":
-            pdf_file = self._get_pdf_from_url_env("PDF_URL_CORTE_III", "Plantilla_De_Medicion_De_Corte_III.pdf")
-            if pdf_file:
-                await query.message.reply_document(
-                    document=pdf_file,
-                    filename="Plantilla_De_Medicion_De_Corte_III.pdf",
-                    caption="📝 Plantilla de medición de Corte III",
-                )
-            else:
-                await query.message.reply_text("❌ No se pudo obtener la plantilla de Corte III.")
+        data = query.data or ""
+        resource = self.course.resource(data[len("resource_"):]) if data.startswith("resource_") else None
+        if resource is not None and resource.button:
+            if not await self._send_resource(query.message, resource.key, resource.caption):
+                await query.message.reply_text(resource.error_text)
         elif data == "resource_material":
             text = self._get_material_recomendado_text()
             await query.message.reply_text(text)
     
+    @instrument_handler("handle_text_message")
     async def handle_text_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
   
         #Maneja mensajes de texto del usuario
         
       
-        # Verificar que el PDF esté disponible
-        if not self.is_pdf_available():
+        # Verificar que el PDF esté disponible (los cursos sin precarga lo cargan aquí)
+        if not await self.ensure_material():
+            if self.material_state == "loading":
+                await update.message.reply_text(
+                    "⏳ Estoy cargando el material del curso, inténtalo de nuevo en unos segundos."
+                )
+                return
             await update.message.reply_text(
                 "❌ El material del curso no está disponible. Por favor, contacta al administrador."
             )
             return
         
         # Obtener el mensaje del usuario
+        received = time.perf_counter()
         pregunta = update.message.text
-        history = context.chat_data.get("history", [])
+        chat_id = update.effective_chat.id
+        history = await asyncio.to_thread(self.history_store.get, chat_id)
         
+        # Preguntas sin historial: se intenta responder desde la caché de respuestas
+        # y, si no está, desde la FAQ precalculada (ninguna de las dos llama al LLM)
+        material_hash = self.pdf_handler.content_hash
+        if not history:
+            cached, source = self.answer_cache.get(pregunta, material_hash), "answer_cache"
+            CACHE_REQUESTS.inc(cache="answer", result="hit" if cached else "miss")
+            if not cached and self.faq_store.active:
+                cached, source = self.faq_store.lookup(pregunta, material_hash), "faq"
+                CACHE_REQUESTS.inc(cache="faq", result="hit" if cached else "miss")
+            if cached:
+                for parte in split_message(cached):
+                    await update.message.reply_text(parte)
+                await self._remember(chat_id, pregunta, cached)
+                if self.analytics_logger:
+                    self.analytics_logger.log_interaction(
+                        update, pregunta, cached, source=source,
+                        latencies={"total": _elapsed_ms(received)}, course=self.course.course_id,
+                    )
+                return
+        
+        # Límite por chat: el primer mensaje rechazado recibe un aviso, los siguientes se ignoran
+        allowed, retry_after, notify = self.rate_limiter.acquire(chat_id)
+        if not allowed:
+            RATE_LIMITED.inc()
+            if notify:
+                await update.message.reply_text(
+                    f"⏳ Espera un momento: estás enviando mensajes muy rápido. "
+                    f"Podrás preguntar de nuevo en {math.ceil(retry_after)} s."
+                )
+            return
+        
+        try:
+            # Preguntas sin historial idénticas y simultáneas comparten la misma respuesta del LLM
+            question = question_key(pregunta) if not history else ""
+            key = (question, material_hash) if question and material_hash else None
+            (respuesta, trace), shared = await self.single_flight.run(
+                key, lambda: self._answer(update, context, pregunta, history, received)
+            )
+            if key is not None:
+                CACHE_REQUESTS.inc(cache="single_flight", result="hit" if shared else "miss")
+            source = "llm"
+            failed = bool(trace.get("error"))
+            if shared:
+                for parte in split_message(respuesta):
+                    await update.message.reply_text(parte)
+                source = "coalesced"
+                trace = {"used_web": trace.get("used_web"), "latency_ms": {"total": _elapsed_ms(received)}}
+            elif not history and not failed:
+                self.answer_cache.put(pregunta, material_hash, respuesta)
+                if self.answer_cache.pending_writes >= self.answer_cache_save_every:
+                    await asyncio.to_thread(self.answer_cache.save)
+            # Un mensaje de error no es un turno de la conversación: no se guarda en el historial
+            if not failed:
+                await self._remember(chat_id, pregunta, respuesta)
+            if self.analytics_logger:
+                self.analytics_logger.log_interaction(
+                    update, pregunta, respuesta, source=source,
+                    used_web=trace.get("used_web"), latencies=trace.get("latency_ms"),
+                    course=self.course.course_id,
+                )
+            
+        except Exception as e:
+            print(f"❌ Error inesperado al responder en el curso {self.course.course_id}: {e!r}")
+            traceback.print_exc()
+            await update.message.reply_text(UNEXPECTED_ERROR_MESSAGE)
+    
+    async def _answer(self, update: Update, context: ContextTypes.DEFAULT_TYPE, pregunta: str, history: list, received: float) -> tuple:
+        """
+        Genera la respuesta y la envía al chat (en streaming si está activado)
+        
+        Returns:
+            tuple[str, dict]: (respuesta completa, trace de la generación)
+        """
         # Mostrar que está escribiendo
         await context.bot.send_chat_action(
             chat_id=update.effective_chat.id,
             action='typing'
         )
         
-        try:
+        trace = {}
+        if self.streaming_enabled:
+            # Enviar la respuesta en cuanto llegan los primeros tokens y editarla en el sitio
+            # (el tiempo de envío es el que se pasa esperando a Telegram)
+            reply = StreamingReply(update.message)
+            send_time = 0.0
+            async for delta in self.stream_response(pregunta, history, trace):
+                started = time.perf_counter()
+                await reply.push(delta)
+                send_time += time.perf_counter() - started
+            started = time.perf_counter()
+            respuesta = await reply.finish()
+            send_time += time.perf_counter() - started
+        else:
             # Generar respuesta usando el controlador
-            respuesta = await self.generate_response(pregunta, history)
-            
-            # Enviar respuesta al usuario
-            await update.message.reply_text(respuesta)
-            
-            history.append({"role": "user", "content": pregunta})
-            history.append({"role": "assistant", "content": respuesta})
-            if len(history) > 10:
-                history = history[-10:]
-            context.chat_data["history"] = history
-            if self.analytics_logger:
-                self.analytics_logger.log_interaction(update, pregunta, respuesta)
+            respuesta = await self.generate_response(pregunta, history, trace)
             
+            # Enviar respuesta al usuario (en varias partes si supera el límite de Telegram)
+            started = time.perf_counter()
+            for parte in split_message(respuesta):
+                await update.message.reply_text(parte)
+            send_time = time.perf_counter() - started
+        STAGE_DURATION.observe(send_time, stage="telegram_send")
+        latencies = trace.setdefault("latency_ms", {})
+        latencies["send"] = round(send_time * 1000, 1)
+        latencies["total"] = _elapsed_ms(received)
+        return respuesta, trace
+    
+    async def _remember(self, chat_id: int, pregunta: str, respuesta: str):
+        """
+        Guarda el turno en el historial del chat (recortado por tokens) y, si está
+        activado HISTORY_SUMMARY, condensa los turnos descartados en el resumen
+        """
+        dropped = await asyncio.to_thread(self.history_store.append, chat_id, pregunta, respuesta)
+        if dropped and self.history_summary_enabled:
+            previous = await asyncio.to_thread(self.history_store.get_summary, chat_id)
+            summary = await self._summarize(previous, dropped)
+            if summary and summary != previous:
+                await asyncio.to_thread(self.history_store.set_summary, chat_id, summary)
+    
+    async def _summarize(self, previous: str, dropped: list) -> str:
+        """
+        Condensa el resumen anterior y los turnos descartados en un nuevo resumen breve
+        
+        Returns:
+            str: Nuevo resumen (o el anterior si el modelo falla)
+        """
+        turns = "\n".join(
+            f"{'Estudiante' if m['role'] == 'user' else 'Asistente'}: {m['content']}" for m in dropped
+        )
+        messages = [
+            {"role": "system", "content": (
+                "Resume en español, en un máximo de 120 palabras, de qué trata la conversación entre "
+                f"un estudiante y el asistente de {self.course.subject}. Conserva los temas, "
+                "conceptos y dudas concretas que puedan servir para preguntas de seguimiento."
+            )},
+            {"role": "user", "content": f"Resumen previo:\n{previous or '(ninguno)'}\n\nTurnos nuevos:\n{turns}"},
+        ]
+        try:
+            return (await self.llm_client.complete(messages, temperature=0.3)).strip()
         except Exception as e:
-            await update.message.reply_text(f"❌ Error: {str(e)}")
+            print(f"⚠️ No se pudo resumir el historial: {e}")
+            return previous
@@ -0,0 +1,98 @@
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from controllers.metrics import REGISTRY
+
+
+class HealthServer:
+    """
+    Servidor HTTP ligero para Render y monitorización:
+    - `/` y `/health`: el proceso está vivo
+    - `/ready`: 200 si el material del curso está cargado, 503 si no
+    - `/metrics`: métricas en formato de texto de Prometheus
+    - POST en cada ruta de `webhooks` (modo webhook): updates de Telegram
+      para el `WebhookBridge` de esa ruta (uno por bot). El secreto se comprueba
+      antes de leer el cuerpo, que debe traer Content-Length y no superar
+      WEBHOOK_MAX_BODY_BYTES.
+    """
+
+    def __init__(self, readiness, port: int | None = None, webhooks: dict | None = None):
+        self.readiness = readiness
+        self.webhooks = dict(webhooks or {})
+        # Los updates de Telegram ocupan pocos KB
+        self.webhook_max_body = int(os.getenv("WEBHOOK_MAX_BODY_BYTES", "262144"))
+        if port is None:
+            try:
+                port = int(os.environ.get("PORT", "8000"))
+            except Exception:
+                port = 8000
+        self.port = port
+        self._server = None
+
+    def _make_handler(self):
+        server = self
+
+        class _HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path in ("/", "/health"):
+                    self._reply(200, b"OK")
+                elif path == "/ready":
+                    ready, detail = server.readiness()
+                    self._reply(200 if ready else 503, detail.encode("utf-8"))
+                elif path == "/metrics":
+                    self._reply(200, REGISTRY.render().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+                else:
+                    self._reply(404, b"Not Found")
+
+            def do_POST(self):
+                path = self.path.split("?", 1)[0]
+                bridge = server.webhooks.get(path)
+                if bridge is None:
+                    self._reply(404, b"Not Found")
+                    return
+                # Nada del cuerpo se lee antes de comprobar el secreto y el tamaño
+                if not bridge.authorized(self.headers):
+                    self._reply(403, b"Forbidden")
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", ""))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self._reply(411, b"Length Required")
+                    return
+                if length > server.webhook_max_body:
+                    self._reply(413, b"Payload Too Large")
+                    return
+                body = self.rfile.read(length)
+                status = bridge.handle(body, self.headers)
+                self._reply(status, b"OK" if status == 200 else b"Error")
+
+            def _reply(self, status: int, body: bytes, content_type: str = "text/plain; charset=utf-8"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # Evitar logs por cada request
+            def log_message(self, format, *args):
+                return
+
+        return _HealthHandler
+
+    def start(self) -> None:
+        """
+        Arranca el servidor en un hilo daemon
+        """
+        self._server = ThreadingHTTPServer(("0.0.0.0", self.port), self._make_handler())
+        self._server.daemon_threads = True
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        print(f"🔌 Health server listening on port {self.port}")
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,393 @@
+import os
+import time
+import asyncio
+import httpx
+from controllers.llm_routing import LLMUnavailableError, parse_backends
+from controllers.metrics import (
+    REGISTRY, LLM_ATTEMPTS, LLM_BACKEND_LATENCY, LLM_BACKEND_OPEN, LLM_HEDGES, LLM_REQUESTS, LLM_TOKENS, STAGE_DURATION,
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """
+    Crea el cliente HTTP asíncrono compartido (pool de conexiones)
+
+    Returns:
+        httpx.AsyncClient: Cliente reutilizable para OpenRouter y la búsqueda web
+    """
+    limits = httpx.Limits(
+        max_connections=_env_int("HTTP_MAX_CONNECTIONS", 20),
+        max_keepalive_connections=_env_int("HTTP_MAX_KEEPALIVE", 10),
+    )
+    timeout = httpx.Timeout(_env_float("HTTP_TIMEOUT", 30.0), connect=10.0)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True)
+
+
+class LLMClient:
+    """
+    Cliente asíncrono para el modelo de lenguaje (OpenRouter) con límite de concurrencia.
+
+    - `LLM_BACKENDS` define los modelos/proveedores en orden de preferencia; si un
+      intento falla se pasa al siguiente y los que fallan seguido se saltan durante
+      un tiempo (circuit breaker).
+    - Cada intento tiene su propio plazo (`LLM_ATTEMPT_TIMEOUT`); si el intento en
+      curso supera la latencia p95 observada del backend se envía un duplicado al
+      siguiente y gana la primera respuesta.
+    """
+
+    def __init__(self, http_client: httpx.AsyncClient):
+        self.model = os.getenv("LLM_MODEL", "deepseek/deepseek-chat-v3.1")
+        self.timeout = _env_float("LLM_TIMEOUT", 60.0)
+        self.attempt_timeout = _env_float("LLM_ATTEMPT_TIMEOUT", self.timeout)
+        self.max_attempts = max(1, _env_int("LLM_MAX_ATTEMPTS", 3))
+        self.max_concurrency = max(1, _env_int("LLM_MAX_CONCURRENCY", 8))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.backends = parse_backends(
+            os.getenv("LLM_BACKENDS", ""),
+            self.model,
+            _env_int("LLM_BREAKER_FAILURES", 3),
+            _env_float("LLM_BREAKER_COOLDOWN", 30.0),
+            _env_int("LLM_STATS_WINDOW", 200),
+        )
+        # Solicitudes duplicadas: se envían tras la latencia p95 del backend (o LLM_HEDGE_DELAY
+        # mientras no haya LLM_HEDGE_MIN_SAMPLES muestras), nunca antes de LLM_HEDGE_MIN_DELAY
+        self.hedge_enabled = os.getenv("LLM_HEDGE", "true").lower() == "true"
+        self.hedge_delay = _env_float("LLM_HEDGE_DELAY", 10.0)
+        self.hedge_min_delay = _env_float("LLM_HEDGE_MIN_DELAY", 0.5)
+        self.hedge_min_samples = max(1, _env_int("LLM_HEDGE_MIN_SAMPLES", 20))
+        self.api_key = os.getenv("API_TOKEN_deepseek")
+        self.base_url = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1")
+        self.http_client = http_client
+        self._client = None
+        REGISTRY.register_collector(self._collect_metrics)
+
+    @property
+    def client(self):
+        # openai tarda en importarse y no hace falta para arrancar: se carga en el primer uso
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=self.http_client,
+                timeout=self.attempt_timeout,
+                max_retries=0,
+            )
+        return self._client
+
+    def warm_up(self) -> None:
+        """
+        Importa openai y crea el cliente por adelantado (p. ej. en un hilo tras arrancar)
+        """
+        self.client
+
+    def backend_stats(self) -> dict:
+        """
+        Latencia, errores y estado del circuit breaker de cada backend
+
+        Returns:
+            dict: Nombre del backend -> estadísticas
+        """
+        return {
+            backend.name: {**backend.stats.snapshot(), "circuit": backend.breaker.state}
+            for backend in self.backends
+        }
+
+    def _collect_metrics(self):
+        for backend in self.backends:
+            for label, fraction, first_token in (("p50", 0.5, False), ("p95", 0.95, False), ("first_token_p95", 0.95, True)):
+                value = backend.stats.percentile(fraction, first_token)
+                if value is not None:
+                    LLM_BACKEND_LATENCY.set(value, backend=backend.name, quantile=label)
+            LLM_BACKEND_OPEN.set(1 if backend.breaker.state == "open" else 0, backend=backend.name)
+
+    def _next_backend(self, tried: list):
+        # Primero los backends aún no usados en esta solicitud, por orden de preferencia;
+        # si ya se usaron todos, se repite el primero disponible
+        for backend in self.backends:
+            if backend not in tried and backend.breaker.allow():
+                return backend
+        for backend in self.backends:
+            if backend.breaker.allow():
+                return backend
+        return None
+
+    def _hedge_after(self, backend, first_token: bool) -> float:
+        p95 = backend.stats.percentile(0.95, first_token, self.hedge_min_samples)
+        return max(self.hedge_min_delay, self.hedge_delay if p95 is None else p95)
+
+    @staticmethod
+    def _counts_as_failure(error: BaseException) -> bool:
+        # Los errores del cliente (p. ej. 400 por un prompt inválido) no indican que el backend falle
+        status = getattr(error, "status_code", None)
+        return status is None or status >= 500 or status in (408, 429)
+
+    async def _attempt(self, backend, request, first_token: bool):
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(request(backend), timeout=self.attempt_timeout)
+        except asyncio.TimeoutError:
+            backend.stats.record("timeout")
+            backend.breaker.record_failure()
+            LLM_ATTEMPTS.inc(backend=backend.name, outcome="timeout")
+            raise
+        except asyncio.CancelledError:
+            # Perdió la carrera contra otro intento
+            backend.stats.record("cancelled")
+            backend.breaker.release()
+            LLM_ATTEMPTS.inc(backend=backend.name, outcome="cancelled")
+            raise
+        except Exception as e:
+            backend.stats.record("error")
+            if self._counts_as_failure(e):
+                backend.breaker.record_failure()
+            else:
+                backend.breaker.release()
+            LLM_ATTEMPTS.inc(backend=backend.name, outcome="error")
+            raise
+        elapsed = time.perf_counter() - started
+        if first_token:
+            backend.stats.record("ok", first_token=elapsed)
+        else:
+            backend.stats.record("ok", latency=elapsed)
+        backend.breaker.record_success()
+        LLM_ATTEMPTS.inc(backend=backend.name, outcome="ok")
+        return result
+
+    async def _race(self, request, first_token: bool = False, discard=None):
+        """
+        Ejecuta `request(backend)` con reintentos en otros backends y solicitudes duplicadas.
+        El llamador debe tener un permiso de `_semaphore` (cubre un intento); cada duplicado
+        simultáneo toma otro permiso y, si no queda ninguno libre, no se envía.
+
+        Args:
+            request: Función que recibe un backend y devuelve la corrutina del intento
+            first_token: Si las latencias del backend se miden hasta el primer fragmento
+            discard: Corrutina opcional para liberar los resultados de los intentos perdedores
+
+        Returns:
+            tuple: (backend ganador, resultado)
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        tried, pending = [], {}
+        last_error = None
+        exhausted = False
+        # Permisos extra tomados para los intentos simultáneos (se devuelven al terminar)
+        extra_permits = 0
+        hedge_blocked = False
+
+        async def launch(hedge: bool) -> bool:
+            nonlocal exhausted, extra_permits, hedge_blocked
+            if len(pending) > extra_permits:
+                if self._semaphore.locked():
+                    # LLM_MAX_CONCURRENCY alcanzado: se sigue esperando al intento en curso
+                    hedge_blocked = True
+                    return False
+                await self._semaphore.acquire()
+                extra_permits += 1
+            backend = self._next_backend(tried)
+            if backend is None:
+                exhausted = True
+                return False
+            tried.append(backend)
+            if hedge:
+                LLM_HEDGES.inc(backend=backend.name)
+            task = asyncio.ensure_future(self._attempt(backend, request, first_token))
+            pending[task] = (backend, loop.time())
+            return True
+
+        if not await launch(False):
+            raise LLMUnavailableError("todos los backends del LLM están en pausa tras fallos repetidos")
+        try:
+            while pending:
+                now = loop.time()
+                if now >= deadline:
+                    raise asyncio.TimeoutError()
+                can_hedge = (
+                    self.hedge_enabled and not exhausted and not hedge_blocked and len(tried) < self.max_attempts
+                )
+                wait = deadline - now
+                if can_hedge:
+                    last_started = max(started for _, started in pending.values())
+                    hedge_at = last_started + self._hedge_after(tried[0], first_token)
+                    wait = max(0.0, min(wait, hedge_at - now))
+                done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if can_hedge and loop.time() >= hedge_at:
+                        await launch(True)
+                    continue
+                for task in done:
+                    backend, _ = pending.pop(task)
+                    if task.exception() is None:
+                        return backend, task.result()
+                    last_error = task.exception()
+                # El intento falló: se pasa enseguida al siguiente backend
+                if not exhausted and len(tried) < self.max_attempts:
+                    await launch(False)
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                results = await asyncio.gather(*pending, return_exceptions=True)
+                if discard is not None:
+                    for result in results:
+                        if not isinstance(result, BaseException):
+                            await discard(result)
+            for _ in range(extra_permits):
+                self._semaphore.release()
+
+    async def complete(self, messages: list, temperature: float = 0.7) -> str:
+        """
+        Solicita una respuesta completa al modelo sin bloquear el event loop
+
+        Args:
+            messages: Mensajes en formato chat (system/user/assistant)
+            temperature: Temperatura de muestreo
+
+        Returns:
+            str: Texto de la respuesta del modelo
+        """
+        def request(backend):
+            return self.client.chat.completions.create(
+                model=backend.model,
+                messages=messages,
+                temperature=temperature,
+                extra_body=backend.request_options() or None,
+            )
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                _, response = await self._race(request)
+            except asyncio.TimeoutError:
+                LLM_REQUESTS.inc(outcome="timeout")
+                raise
+            except LLMUnavailableError:
+                LLM_REQUESTS.inc(outcome="unavailable")
+                raise
+            except Exception:
+                LLM_REQUESTS.inc(outcome="error")
+                raise
+            STAGE_DURATION.observe(time.perf_counter() - started, stage="llm")
+        LLM_REQUESTS.inc(outcome="ok")
+        self._record_usage(getattr(response, "usage", None))
+        return response.choices[0].message.content or ""
+
+    @staticmethod
+    def _record_usage(usage) -> None:
+        if usage is None:
+            return
+        prompt = getattr(usage, "prompt_tokens", None)
+        completion = getattr(usage, "completion_tokens", None)
+        if prompt:
+            LLM_TOKENS.inc(prompt, type="prompt")
+        # Parte del prompt servida desde la caché del proveedor (prefijo estable)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details is not None else None
+        if cached is None and isinstance(details, dict):
+            cached = details.get("cached_tokens")
+        if cached:
+            LLM_TOKENS.inc(cached, type="prompt_cached")
+        if completion:
+            LLM_TOKENS.inc(completion, type="completion")
+
+    async def _open_stream(self, backend, messages: list, temperature: float) -> tuple:
+        # Abre el stream y espera el primer fragmento con texto: así gana el intento
+        # que empieza a responder antes
+        stream = await self.client.chat.completions.create(
+            model=backend.model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            # Pedir el uso de tokens en el último fragmento
+            extra_body={"stream_options": {"include_usage": True}, **backend.request_options()},
+        )
+        iterator = stream.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return stream, iterator, None
+                self._record_usage(getattr(chunk, "usage", None))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    return stream, iterator, chunk.choices[0].delta.content
+        except BaseException:
+            await stream.close()
+            raise
+
+    @staticmethod
+    async def _close_stream(opened: tuple) -> None:
+        await opened[0].close()
+
+    async def stream(self, messages: list, temperature: float = 0.7):
+        """
+        Solicita la respuesta en modo streaming
+
+        Args:
+            messages: Mensajes en formato chat (system/user/assistant)
+            temperature: Temperatura de muestreo
+
+        Yields:
+            str: Fragmentos de texto a medida que llegan (LLM_TIMEOUT es el tiempo
+            máximo de espera entre fragmentos). Los reintentos y duplicados solo
+            aplican hasta el primer fragmento.
+        """
+        async with self._semaphore:
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                backend, (stream, iterator, first_delta) = await self._race(
+                    lambda candidate: self._open_stream(candidate, messages, temperature),
+                    first_token=True,
+                    discard=self._close_stream,
+                )
+                try:
+                    if first_delta:
+                        STAGE_DURATION.observe(time.perf_counter() - started, stage="llm_first_token")
+                        yield first_delta
+                    while first_delta is not None:
+                        try:
+                            chunk = await asyncio.wait_for(iterator.__anext__(), timeout=self.timeout)
+                        except StopAsyncIteration:
+                            break
+                        # Algunos proveedores envían el uso de tokens en el último fragmento
+                        self._record_usage(getattr(chunk, "usage", None))
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            yield delta
+                    outcome = "ok"
+                except Exception:
+                    # Fallo a mitad de respuesta: ya no se puede cambiar de backend
+                    backend.breaker.record_failure()
+                    raise
+                finally:
+                    await stream.close()
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise
+            except LLMUnavailableError:
+                outcome = "unavailable"
+                raise
+            finally:
+                LLM_REQUESTS.inc(outcome=outcome)
+                if outcome == "ok":
+                    STAGE_DURATION.observe(time.perf_counter() - started, stage="llm")
@@ -0,0 +1,166 @@
+import time
+import threading
+from collections import deque
+
+
+class LLMUnavailableError(RuntimeError):
+    """Todos los backends del LLM están en pausa por el circuit breaker"""
+
+
+class BackendStats:
+    """
+    Estadísticas de un backend: latencias recientes (ventana de `window` muestras)
+    y contadores por resultado desde el arranque
+    """
+
+    def __init__(self, window: int = 200):
+        self.latencies = deque(maxlen=max(1, window))
+        self.first_token = deque(maxlen=max(1, window))
+        self.outcomes = {}
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str, latency: float = None, first_token: float = None) -> None:
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            if latency is not None:
+                self.latencies.append(latency)
+            if first_token is not None:
+                self.first_token.append(first_token)
+
+    @staticmethod
+    def _percentile(values: list, fraction: float):
+        if not values:
+            return None
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def percentile(self, fraction: float, first_token: bool = False, min_samples: int = 1):
+        """
+        Percentil de la latencia (total o hasta el primer fragmento)
+
+        Returns:
+            Optional[float]: Segundos, o None si hay menos de `min_samples` muestras
+        """
+        with self._lock:
+            values = list(self.first_token if first_token else self.latencies)
+        if len(values) < max(1, min_samples):
+            return None
+        return self._percentile(values, fraction)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = list(self.latencies)
+            first_token = list(self.first_token)
+            outcomes = dict(self.outcomes)
+        total = sum(outcomes.values())
+        failures = total - outcomes.get("ok", 0) - outcomes.get("cancelled", 0)
+        return {
+            "requests": total,
+            "outcomes": outcomes,
+            "error_rate": round(failures / total, 4) if total else 0.0,
+            "p50_s": self._percentile(latencies, 0.5),
+            "p95_s": self._percentile(latencies, 0.95),
+            "first_token_p95_s": self._percentile(first_token, 0.95),
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por backend: tras `failure_threshold` fallos seguidos se abre y
+    el backend se salta durante `cooldown` segundos; después se deja pasar una sola
+    solicitud de prueba (semiabierto) que lo cierra si sale bien o lo reabre si falla.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = max(0.0, cooldown)
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """
+        Indica si se puede enviar una solicitud (reserva la prueba en estado semiabierto)
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self) -> None:
+        """
+        Libera la prueba reservada si la solicitud se canceló sin resultado
+        """
+        with self._lock:
+            self._probing = False
+
+
+class Backend:
+    """
+    Modelo (y, opcionalmente, proveedor de OpenRouter) al que se puede enviar una
+    solicitud, con su circuit breaker y sus estadísticas
+    """
+
+    def __init__(self, model: str, provider: str = None, breaker: CircuitBreaker = None, stats: BackendStats = None):
+        self.model = model
+        self.provider = provider
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = stats or BackendStats()
+
+    @property
+    def name(self) -> str:
+        return f"{self.model}@{self.provider}" if self.provider else self.model
+
+    def request_options(self) -> dict:
+        """
+        Parámetros extra de la llamada para fijar el proveedor en OpenRouter
+        """
+        if not self.provider:
+            return {}
+        return {"provider": {"order": [self.provider], "allow_fallbacks": False}}
+
+
+def parse_backends(spec: str, default_model: str, failure_threshold: int = 3,
+                   cooldown: float = 30.0, window: int = 200) -> list:
+    """
+    Convierte LLM_BACKENDS ("modelo" o "modelo@proveedor", separados por comas y en
+    orden de preferencia) en la lista de backends; si está vacío se usa `default_model`
+    """
+    backends = []
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        model, _, provider = entry.partition("@")
+        backends.append(Backend(
+            model.strip(), provider.strip() or None, CircuitBreaker(failure_threshold, cooldown), BackendStats(window),
+        ))
+    if not backends:
+        backends.append(Backend(default_model, None, CircuitBreaker(failure_threshold, cooldown), BackendStats(window)))
+    return backends
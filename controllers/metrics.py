@@ -0,0 +1,240 @@
+import time
+import asyncio
+import functools
+import threading
+
+# Límites de los histogramas de latencia (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items)
+        return lines
+
+
+class Gauge:
+    """Valor instantáneo con etiquetas"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = list(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items)
+        return lines
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas (formato Prometheus)"""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        """
+        Número de observaciones de la serie con esas etiquetas
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            return series[2] if series else 0
+
+    def time(self, **labels):
+        """
+        Context manager que observa la duración del bloque
+        """
+        return _Timer(self, labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, (list(series[0]), series[1], series[2])) for key, series in self._series.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Registro de métricas del bot con salida en formato de texto de Prometheus"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def register_collector(self, collector) -> None:
+        """
+        Registra una función que actualiza métricas justo antes de cada lectura
+        (p. ej. copiar contadores de las cachés a gauges)
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"⚠️ Error al recoger métricas: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registro global del proceso
+REGISTRY = MetricsRegistry()
+
+HANDLER_DURATION = REGISTRY.histogram("bot_handler_duration_seconds", "Duración de los handlers de Telegram")
+HANDLER_REQUESTS = REGISTRY.counter("bot_handler_requests_total", "Updates procesados por handler y resultado")
+STAGE_DURATION = REGISTRY.histogram("bot_stage_duration_seconds", "Duración de cada etapa (pdf_fetch, retrieval, web_search, llm, llm_first_token, telegram_send)")
+CACHE_REQUESTS = REGISTRY.counter("bot_cache_requests_total", "Consultas a las cachés por resultado")
+LLM_TOKENS = REGISTRY.counter("bot_llm_tokens_total", "Tokens consumidos en el LLM según lo informado por el proveedor")
+PROMPT_TOKENS = REGISTRY.counter("bot_prompt_tokens_total", "Tokens estimados de los prompts por sección (prefix, context, history, question)")
+LLM_REQUESTS = REGISTRY.counter("bot_llm_requests_total", "Solicitudes al LLM por resultado")
+LLM_ATTEMPTS = REGISTRY.counter("bot_llm_attempts_total", "Intentos enviados a cada backend del LLM por resultado (incluye duplicados y reintentos)")
+LLM_HEDGES = REGISTRY.counter("bot_llm_hedges_total", "Solicitudes duplicadas al superar la latencia p95 del backend")
+LLM_BACKEND_LATENCY = REGISTRY.gauge("bot_llm_backend_latency_seconds", "Latencia reciente de cada backend del LLM por percentil")
+LLM_BACKEND_OPEN = REGISTRY.gauge("bot_llm_backend_circuit_open", "1 si el circuit breaker del backend está abierto")
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "bot_event_loop_lag_seconds", "Retraso del event loop respecto al intervalo esperado",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_LAG_LAST = REGISTRY.gauge("bot_event_loop_lag_last_seconds", "Último retraso medido del event loop")
+RATE_LIMITED = REGISTRY.counter("bot_rate_limited_total", "Mensajes rechazados por el límite de mensajes por chat")
+HISTORY_ACTIVE_CHATS = REGISTRY.gauge("bot_history_active_chats", "Chats con historial cargado en memoria")
+MATERIAL_LOADED = REGISTRY.gauge("bot_material_loaded", "1 si el material del curso está cargado")
+
+
+def instrument_handler(name: str):
+    """
+    Decorador para handlers async: cuenta updates y mide su duración
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "ok"
+            try:
+                return await func(*args, **kwargs)
+            except BaseException:
+                outcome = "error"
+                raise
+            finally:
+                HANDLER_DURATION.observe(time.perf_counter() - started, handler=name)
+                HANDLER_REQUESTS.inc(handler=name, outcome=outcome)
+        return wrapper
+    return decorator
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """
+    Tarea que mide cuánto se retrasa el event loop al despertar de un sleep
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        EVENT_LOOP_LAG.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
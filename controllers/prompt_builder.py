@@ -0,0 +1,200 @@
+import os
+import hashlib
+from dataclasses import dataclass, field
+from models.text_index import estimate_tokens
+
+# Reglas fijas del asistente: forman, junto con el material estable, el prefijo del prompt
+SYSTEM_RULES = """Eres un asistente educativo especializado en Inteligencia Artificial y en apoyar la asignatura correspondiente.
+
+REGLAS ESTRICTAS:
+1. Debes responder únicamente a preguntas relacionadas con la asignatura de Inteligencia Artificial. Esto incluye tanto:
+   - preguntas que hagan referencia explícita al contenido del material del curso que te proporciono, como
+   - preguntas sobre temas de Inteligencia Artificial en general (por ejemplo, nuevos modelos LLM de Google u otras instituciones, tendencias actuales en IA, aplicaciones de redes neuronales, etc.), siempre que estén dentro del ámbito académico de la asignatura.
+2. Solo debes rechazar preguntas que sean claramente ajenas a la asignatura de Inteligencia Artificial (por ejemplo, deportes, vida personal del usuario, recetas de cocina, noticias políticas sin relación con IA, etc.). En ese caso, responde: "Lo siento, solo puedo responder preguntas relacionadas con el material del curso de Inteligencia Artificial y con mis funciones dentro de este bot. Por favor, haz una pregunta sobre el contenido del documento o sobre algún tema de Inteligencia Artificial."
+3. Debes priorizar siempre el contenido del material del curso. Si una pregunta relacionada con la materia no puede responderse claramente con el material, puedes complementar la respuesta usando la información procedente de la búsqueda web que se te proporciona, manteniéndote siempre en el contexto de la asignatura.
+4. Cuando la pregunta sea sobre temas de Inteligencia Artificial de actualidad (por ejemplo, qué modelo LLM lanzó recientemente una empresa), y esa información no esté en el material, utiliza los resultados de la búsqueda web para dar una respuesta sintética, explicando brevemente el modelo y su relación con la temática de la asignatura.
+5. Cuando el usuario te pregunte qué puedes hacer, describe de forma breve y clara tus capacidades principales: responder dudas sobre el material de Inteligencia Artificial, enviar recursos del curso (por ejemplo mediante el comando /recursos), sugerir material recomendado y usar búsqueda web como apoyo cuando sea útil.
+6. NO inventes información que no esté en el material o en los resultados de la búsqueda web.
+7. Si la información no está ni en el material ni en los resultados de la búsqueda web, indícalo claramente.
+8. Responde en español de forma clara y educativa.
+9. Puedes explicar, aclarar y profundizar en los temas del material, pero NUNCA salgas del contexto del documento ni de los temas propios de la Inteligencia Artificial.
+10. Usa el historial de conversación para mantener el contexto y permitir preguntas de seguimiento, pero no cambies de tema fuera de la asignatura ni respondas sobre asuntos totalmente ajenos."""
+
+CLOSING_REMINDER = "Recuerda: SOLO respondes sobre el contenido de la asignatura de Inteligencia Artificial: prioriza el material del curso y, cuando sea necesario, complétalo con la información de la búsqueda web siempre que esté relacionada con la asignatura y con tus funciones como asistente educativo."
+
+MATERIAL_HEADER = "MATERIAL DEL CURSO (fragmentos más relevantes para la pregunta, con su documento y número de página; cita el documento y la página cuando uses un fragmento):"
+WEB_HEADER = "RESULTADOS DE BUSQUEDA EN LA WEB (pueden estar vacíos):"
+
+# Tokens aproximados que añade cada mensaje (rol y separadores)
+MESSAGE_OVERHEAD = 4
+
+# Orden en que se recortan las secciones variables cuando se supera el presupuesto
+DROP_ORDER = ("web", "history", "material")
+
+
+def build_outline(chunks: list, max_tokens: int) -> str:
+    """
+    Esquema del material (documentos y secciones con su primera página) en orden de aparición
+
+    Args:
+        chunks: Fragmentos del índice del material
+        max_tokens: Tokens máximos del esquema
+
+    Returns:
+        str: Una línea por sección
+    """
+    lines = []
+    seen = set()
+    used = 0
+    for chunk in chunks:
+        candidates = []
+        if chunk.document and chunk.document not in seen:
+            seen.add(chunk.document)
+            candidates.append(f"{chunk.document}:")
+        if chunk.section and (chunk.document, chunk.section) not in seen:
+            seen.add((chunk.document, chunk.section))
+            candidates.append(f"- {chunk.section} (pág. {chunk.page})")
+        for line in candidates:
+            cost = estimate_tokens(line) + 1
+            if used + cost > max_tokens:
+                return "\n".join(lines)
+            lines.append(line)
+            used += cost
+    return "\n".join(lines)
+
+
+@dataclass
+class BuiltPrompt:
+    """Resultado de PromptBuilder.build"""
+    messages: list
+    # Tokens estimados por sección tras aplicar el presupuesto
+    tokens: dict = field(default_factory=dict)
+    # Elementos descartados por sección (fragmentos, mensajes del historial, web)
+    dropped: dict = field(default_factory=dict)
+    # Huella del prefijo estable: cambia solo si cambian las reglas o el material
+    prefix_hash: str = ""
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.tokens.values())
+
+
+class PromptBuilder:
+    """
+    Arma los mensajes para el modelo en dos partes:
+
+    1. Prefijo estable (primer mensaje de sistema): reglas + material fijo. Es idéntico
+       byte a byte mientras no cambie el material, así que el proveedor puede
+       cachearlo entre preguntas.
+    2. Parte variable: fragmentos recuperados y resultados web (segundo mensaje de
+       sistema), historial y pregunta.
+
+    El material fijo es el esquema de secciones (PROMPT_STABLE_MATERIAL="outline") o
+    el texto completo ("full", para materiales cortos; entonces no se envían fragmentos).
+    Si el total supera PROMPT_TOKEN_BUDGET se recorta en el orden de DROP_ORDER.
+    La salida depende solo de las entradas.
+    """
+
+    def __init__(self, token_budget: int | None = None, stable_material: str | None = None,
+                 outline_tokens: int | None = None, rules: str | None = None, closing: str | None = None):
+        # Reglas y recordatorio final propios del curso (por defecto, los de Inteligencia Artificial)
+        self.rules = rules or SYSTEM_RULES
+        self.closing = CLOSING_REMINDER if closing is None else closing
+        self.token_budget = token_budget or int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+        self.stable_material = (stable_material or os.getenv("PROMPT_STABLE_MATERIAL", "outline")).lower()
+        self.outline_tokens = outline_tokens or int(os.getenv("PROMPT_OUTLINE_TOKENS", "600"))
+        self._prefix_cache = (None, "")
+
+    @property
+    def uses_fragments(self) -> bool:
+        return self.stable_material != "full"
+
+    def prefix(self, material) -> str:
+        """
+        Prefijo estable para el material dado (se recalcula solo si cambia su hash)
+        """
+        key = material.content_hash if material else None
+        cached_key, cached = self._prefix_cache
+        if key is not None and key == cached_key:
+            return cached
+        parts = [self.rules]
+        if material is not None:
+            if self.uses_fragments:
+                outline = build_outline(material.index.chunks, self.outline_tokens)
+                parts.append(
+                    f"ESQUEMA DEL MATERIAL DEL CURSO ({len(material.documents) or 1} documentos, {material.page_count} páginas):\n"
+                    + (outline or "(sin secciones detectadas)")
+                )
+            else:
+                parts.append(f"MATERIAL DEL CURSO:\n{material.content}")
+        if self.closing:
+            parts.append(self.closing)
+        prefix = "\n\n\n".join(parts)
+        if key is not None:
+            self._prefix_cache = (key, prefix)
+        return prefix
+
+    def _context_message(self, fragments: list, web_snippets: str) -> str:
+        parts = []
+        if self.uses_fragments:
+            parts.append(f"{MATERIAL_HEADER}\n" + "\n\n".join(fragments))
+        parts.append(f"{WEB_HEADER}\n{web_snippets}")
+        return "\n\n".join(parts)
+
+    def build(self, material, fragments: list, web_snippets: str, history: list, question: str) -> BuiltPrompt:
+        """
+        Construye los mensajes respetando el presupuesto de tokens
+
+        Args:
+            material: Instantánea del material (CourseMaterial) o None
+            fragments: Fragmentos recuperados, del más al menos relevante
+            web_snippets: Resultados de la búsqueda web (texto)
+            history: Historial en formato chat (resumen + turnos)
+            question: Pregunta del usuario
+
+        Returns:
+            BuiltPrompt: Mensajes, tokens por sección y elementos descartados
+        """
+        prefix = self.prefix(material)
+        fragments = list(fragments) if self.uses_fragments else []
+        history = [m for m in history or [] if m.get("role") and m.get("content")]
+        dropped = {"web": 0, "history": 0, "material": 0}
+
+        def cost(text: str) -> int:
+            return estimate_tokens(text) + MESSAGE_OVERHEAD
+
+        fixed = cost(prefix) + cost(question)
+        parts = {"web": web_snippets, "history": history, "material": fragments}
+        while True:
+            context = self._context_message(parts["material"], parts["web"])
+            history_tokens = sum(cost(m["content"]) for m in history)
+            if fixed + cost(context) + history_tokens <= self.token_budget:
+                break
+            section = next((name for name in DROP_ORDER if parts[name]), None)
+            if section is None:
+                break
+            if section == "web":
+                parts["web"] = ""
+            elif section == "history":
+                # Primero los turnos más antiguos; el resumen (mensaje de sistema) al final
+                turns = [i for i, m in enumerate(history) if m["role"] != "system"]
+                history.pop(turns[0] if turns else 0)
+            else:
+                # Primero los fragmentos menos relevantes
+                fragments.pop()
+            dropped[section] += 1
+
+        messages = [{"role": "system", "content": prefix}, {"role": "system", "content": context}]
+        messages.extend({"role": m["role"], "content": m["content"]} for m in history)
+        messages.append({"role": "user", "content": question})
+        return BuiltPrompt(
+            messages=messages,
+            tokens={
+                "prefix": cost(prefix),
+                "context": cost(context),
+                "history": history_tokens,
+                "question": cost(question),
+            },
+            dropped=dropped,
+            prefix_hash=hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16],
+        )
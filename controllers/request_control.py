@@ -0,0 +1,112 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """
+    Limitador por chat con cubetas de tokens: cada chat dispone de `burst` mensajes
+    seguidos y recupera `rate_per_minute` por minuto.
+
+    El estado está acotado a `max_chats` cubetas (LRU); olvidar una cubeta equivale
+    a devolverle todos sus tokens, lo que solo afecta a chats inactivos.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_chats: int = 10000):
+        self.rate = max(0.0, rate_per_minute) / 60.0
+        self.burst = max(1, burst)
+        self.max_chats = max(1, max_chats)
+        self._buckets = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, chat_id) -> tuple:
+        """
+        Consume un token del chat si hay disponible
+
+        Returns:
+            tuple[bool, float, bool]: (permitido, segundos hasta el próximo token,
+            primer rechazo desde el último mensaje permitido)
+        """
+        if not self.enabled:
+            return True, 0.0, False
+        now = time.monotonic()
+        bucket = self._buckets.pop(chat_id, None)
+        if bucket is None:
+            bucket = [float(self.burst), now, False]
+        else:
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        self._buckets[chat_id] = bucket
+        while len(self._buckets) > self.max_chats:
+            self._buckets.popitem(last=False)
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            bucket[2] = False
+            return True, 0.0, False
+        first_rejection = not bucket[2]
+        bucket[2] = True
+        return False, (1.0 - bucket[0]) / self.rate, first_rejection
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave: la primera ejecuta el trabajo
+    y las demás esperan su resultado. Como mucho hay `max_keys` claves en vuelo;
+    por encima de ese límite las llamadas se ejecutan sin agrupar. Si la ejecución
+    compartida falla, cada seguidor repite el trabajo por su cuenta.
+    """
+
+    def __init__(self, max_keys: int = 256):
+        self.max_keys = max(0, max_keys)
+        self._inflight = {}
+
+    async def run(self, key, factory) -> tuple:
+        """
+        Ejecuta `factory()` o se une a la ejecución en curso con la misma clave
+
+        Args:
+            key: Clave de agrupación (None = no agrupar)
+            factory: Función sin argumentos que devuelve la corrutina a ejecutar
+
+        Returns:
+            tuple[Any, bool]: (resultado, True si se reutilizó una ejecución en curso)
+        """
+        future = self._inflight.get(key) if key is not None else None
+        if future is not None:
+            try:
+                # shield: si este seguidor se cancela no se cancela el trabajo compartido
+                return await asyncio.shield(future), True
+            except Exception:
+                pass
+            return await factory(), False
+
+        if key is None or len(self._inflight) >= self.max_keys:
+            return await factory(), False
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await factory()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.set_exception(RuntimeError("la solicitud compartida fue cancelada"))
+            else:
+                future.set_exception(e)
+            # Evitar el aviso de excepción no recuperada si no había seguidores
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._inflight.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,36 @@
+import asyncio
+from models.pdf_store import PDFStore
+from models.resource_registry import ResourceRegistry
+from models.answer_cache import AnswerCache
+from controllers.analytics_logger import AnalyticsLogger
+from controllers.llm_client import LLMClient, build_http_client
+from controllers.web_search import WebSearch
+from controllers.metrics import STAGE_DURATION
+
+
+class SharedServices:
+    """
+    Recursos que comparten todos los cursos del proceso: pool HTTP, cliente del LLM
+    (con su límite de concurrencia y estadísticas por backend), búsqueda web, almacén
+    de PDFs, registro de file_id, caché de respuestas y registro de analítica.
+    """
+
+    def __init__(self):
+        # Almacén local de PDFs compartido por el material y los recursos descargables
+        self.pdf_store = PDFStore()
+        self.pdf_store.on_fetch = lambda seconds, status: STAGE_DURATION.observe(seconds, stage="pdf_fetch")
+        # Pool de conexiones compartido por el LLM y la búsqueda web
+        self.http_client = build_http_client()
+        self.llm_client = LLMClient(self.http_client)
+        self.web_search = WebSearch(self.http_client)
+        self.analytics_logger = AnalyticsLogger()
+        self.resource_registry = ResourceRegistry()
+        self.answer_cache = AnswerCache()
+
+    async def aclose(self):
+        """
+        Guarda la caché de respuestas, vacía la cola de analítica y cierra el pool HTTP
+        """
+        await asyncio.to_thread(self.answer_cache.save)
+        await asyncio.to_thread(self.analytics_logger.close)
+        await self.http_client.aclose()
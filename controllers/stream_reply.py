@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+from telegram.error import BadRequest, RetryAfter
+
+# Límite de caracteres de un mensaje de Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def _split_point(text: str, limit: int) -> int:
+    # Corta en el último salto de párrafo, línea, frase o espacio antes del límite
+    window = text[:limit]
+    for separator in ("\n\n", "\n", ". ", " "):
+        position = window.rfind(separator)
+        if position >= limit // 2:
+            return position + len(separator)
+    return limit
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> list:
+    """
+    Divide un texto largo en partes que respetan el límite de Telegram
+
+    Args:
+        text: Texto completo
+        limit: Longitud máxima de cada parte
+
+    Returns:
+        list[str]: Partes en orden
+    """
+    parts = []
+    while len(text) > limit:
+        cut = _split_point(text, limit)
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text or not parts:
+        parts.append(text)
+    return parts
+
+
+class StreamingReply:
+    """
+    Respuesta que se envía en cuanto llegan los primeros tokens y se actualiza
+    con edit_message_text, limitando la frecuencia de ediciones y continuando
+    en un mensaje nuevo al superar el límite de 4096 caracteres.
+    """
+
+    def __init__(self, message, edit_interval: float | None = None):
+        self.message = message
+        self.edit_interval = edit_interval if edit_interval is not None else float(os.getenv("STREAM_EDIT_INTERVAL", "1.2"))
+        self.text = ""
+        self._offset = 0          # inicio del texto que muestra el mensaje actual
+        self._current = None      # mensaje de Telegram que se está editando
+        self._shown = ""          # texto que muestra actualmente ese mensaje
+        self._next_edit_at = 0.0
+
+    async def push(self, delta: str) -> None:
+        """
+        Añade un fragmento de texto y actualiza el mensaje si ya toca
+        """
+        self.text += delta
+        if not self.text.strip() or time.monotonic() < self._next_edit_at:
+            return
+        try:
+            await self._flush()
+        except RetryAfter:
+            # Se reintenta en el siguiente fragmento o al terminar
+            pass
+
+    async def finish(self) -> str:
+        """
+        Envía el texto pendiente y devuelve la respuesta completa
+        """
+        while True:
+            try:
+                await self._flush(final=True)
+                return self.text
+            except RetryAfter as e:
+                await asyncio.sleep(float(e.retry_after))
+
+    async def _flush(self, final: bool = False) -> None:
+        segment = self.text[self._offset:]
+        # Los mensajes que ya no caben se cierran y el resto continúa en uno nuevo
+        while len(segment) > TELEGRAM_MESSAGE_LIMIT:
+            cut = _split_point(segment, TELEGRAM_MESSAGE_LIMIT)
+            await self._show(segment[:cut].rstrip(), required=True)
+            self._offset += cut
+            self._current = None
+            self._shown = ""
+            segment = self.text[self._offset:]
+            while segment[:1].isspace():
+                self._offset += 1
+                segment = segment[1:]
+        if segment.strip() or (final and self._current is None):
+            await self._show(segment if segment.strip() else "…", required=final)
+
+    async def _show(self, text: str, required: bool = False) -> None:
+        if text == self._shown:
+            return
+        try:
+            if self._current is None:
+                self._current = await self.message.reply_text(text)
+            else:
+                await self._current.edit_text(text)
+            self._shown = text
+            self._next_edit_at = time.monotonic() + self.edit_interval
+        except RetryAfter as e:
+            # Telegram pide esperar: se pospone la siguiente edición
+            self._next_edit_at = time.monotonic() + float(e.retry_after)
+            if required:
+                raise
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
@@ -0,0 +1,59 @@
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Procesa updates de chats distintos en paralelo manteniendo el orden dentro de cada chat.
+
+    - `max_workers`: updates que se ejecutan a la vez como máximo.
+    - `max_pending`: updates admitidos (en ejecución o esperando) antes de que
+      python-telegram-bot deje de sacar más de la cola.
+
+    Cada chat tiene un candado FIFO que se toma antes que el cupo de trabajo, de modo
+    que los mensajes en espera de un mismo chat no ocupan cupos de otros chats.
+    Los candados se eliminan en cuanto su chat no tiene updates pendientes.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int = 1000):
+        super().__init__(max(max_pending, max_workers, 2))
+        self.max_workers = max(1, max_workers)
+        self._workers = asyncio.Semaphore(self.max_workers)
+        self._chat_locks = {}
+
+    @staticmethod
+    def _chat_id(update: object):
+        if isinstance(update, Update) and update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        chat_id = self._chat_id(update)
+        if chat_id is None:
+            async with self._workers:
+                await coroutine
+            return
+
+        entry = self._chat_locks.get(chat_id)
+        if entry is None:
+            entry = self._chat_locks[chat_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._workers:
+                    await coroutine
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._chat_locks.pop(chat_id, None)
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._chat_locks)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
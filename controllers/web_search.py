@@ -0,0 +1,110 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+import httpx
+from models.text_index import normalize_query
+from controllers.metrics import CACHE_REQUESTS, STAGE_DURATION
+
+
+def parse_snippets(data: dict) -> str:
+    """
+    Extrae hasta 5 fragmentos de texto de una respuesta JSON de DuckDuckGo
+    """
+    snippets = []
+    abstract = data.get("AbstractText") or data.get("Abstract")
+    if abstract:
+        snippets.append(abstract)
+    related = data.get("RelatedTopics") or []
+    for item in related:
+        if isinstance(item, dict):
+            text = item.get("Text")
+            if text:
+                snippets.append(text)
+            topics = item.get("Topics")
+            if isinstance(topics, list):
+                for sub in topics:
+                    if isinstance(sub, dict):
+                        text = sub.get("Text")
+                        if text:
+                            snippets.append(text)
+        if len(snippets) >= 5:
+            break
+    result = "\n\n".join(snippets)
+    if len(result) > 1500:
+        result = result[:1500]
+    return result
+
+
+class WebSearch:
+    """Búsqueda web asíncrona con caché TTL/LRU por pregunta normalizada"""
+
+    def __init__(self, http_client: httpx.AsyncClient):
+        self.http_client = http_client
+        self.endpoint = os.getenv("WEB_SEARCH_ENDPOINT", "https://api.duckduckgo.com/")
+        self.timeout = float(os.getenv("WEB_SEARCH_TIMEOUT", "10"))
+        self.ttl = float(os.getenv("WEB_SEARCH_CACHE_TTL", "3600"))
+        self.max_entries = int(os.getenv("WEB_SEARCH_CACHE_SIZE", "512"))
+        self._cache = OrderedDict()
+
+    def _get_cached(self, key: str) -> Optional[str]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, snippets = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return snippets
+
+    def _store(self, key: str, snippets: str) -> None:
+        self._cache[key] = (time.monotonic() + self.ttl, snippets)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def record_skip(self) -> None:
+
+        #Registra que la búsqueda se omitió porque el material era suficiente
+
+        CACHE_REQUESTS.inc(cache="web_search", result="skipped")
+
+    async def search(self, question: str) -> tuple:
+        """
+        Obtiene fragmentos de la web para la pregunta, usando la caché si es posible
+
+        Args:
+            question: Pregunta del usuario
+
+        Returns:
+            tuple[str, str]: (fragmentos, camino usado: "cache", "network" o "unavailable")
+        """
+        key = normalize_query(question) or question.strip().lower()
+        cached = self._get_cached(key)
+        if cached is not None:
+            CACHE_REQUESTS.inc(cache="web_search", result="hit")
+            return cached, "cache"
+
+        params = {
+            "q": question,
+            "format": "json",
+            "no_html": 1,
+            "skip_disambig": 1,
+        }
+        started = time.perf_counter()
+        try:
+            response = await self.http_client.get(self.endpoint, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            STAGE_DURATION.observe(time.perf_counter() - started, stage="web_search")
+            CACHE_REQUESTS.inc(cache="web_search", result="miss")
+            return "", "unavailable"
+        # Las búsquedas canceladas por relevancia (CancelledError) no llegan aquí: no cuentan
+        # en la latencia, solo como "skipped"
+        STAGE_DURATION.observe(time.perf_counter() - started, stage="web_search")
+        CACHE_REQUESTS.inc(cache="web_search", result="miss")
+        snippets = parse_snippets(data) if isinstance(data, dict) else ""
+        self._store(key, snippets)
+        return snippets, "network"
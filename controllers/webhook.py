@@ -0,0 +1,53 @@
+import json
+import asyncio
+import hmac
+from telegram import Update
+from telegram.ext import Application
+
+
+class WebhookBridge:
+    """
+    Recibe los POST de Telegram en el hilo del servidor HTTP y los entrega a la
+    cola de updates de la Application que corre en el event loop.
+    """
+
+    def __init__(self, application: Application, loop: asyncio.AbstractEventLoop, secret_token: str | None = None):
+        self.application = application
+        self.loop = loop
+        self.secret_token = secret_token
+
+    def authorized(self, headers) -> bool:
+        """
+        Comprueba la cabecera con el secreto del webhook (si hay secreto configurado)
+        """
+        if not self.secret_token:
+            return True
+        received = headers.get("X-Telegram-Bot-Api-Secret-Token") or ""
+        return hmac.compare_digest(received, self.secret_token)
+
+    def handle(self, body: bytes, headers) -> int:
+        """
+        Procesa el cuerpo de un POST del webhook (se llama desde el hilo HTTP)
+
+        Args:
+            body: Cuerpo JSON del update
+            headers: Cabeceras HTTP de la petición
+
+        Returns:
+            int: Código de estado HTTP para la respuesta
+        """
+        if not self.authorized(headers):
+            return 403
+        try:
+            data = json.loads(body)
+            update = Update.de_json(data, self.application.bot)
+        except Exception:
+            return 400
+        if update is None:
+            return 400
+        try:
+            future = asyncio.run_coroutine_threadsafe(self.application.update_queue.put(update), self.loop)
+            future.result(timeout=5)
+        except Exception:
+            return 503
+        return 200
@@ -1,44 +1,76 @@
-from telegram import BotCommand
+from telegram import BotCommand, Update
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, CallbackQueryHandler, filters, Application
 
 from dotenv import load_dotenv
 import os
-import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import signal
+import asyncio
 from controllers.bot_controller import BotController
+from controllers.shared_services import SharedServices
+from controllers.health_server import HealthServer
+from controllers.metrics import monitor_event_loop_lag
+from controllers.update_processor import ChatOrderedUpdateProcessor
+from controllers.webhook import WebhookBridge
+from models.course_registry import DEFAULT_COURSE_ID, load_courses
 
 # Cargar variables de entorno
 load_dotenv()
 
-async def post_init(application: Application):
+def build_post_init(bot_controller: BotController, monitor_loop: bool = True):
     """
-    Configura los comandos del bot en el menú de Telegram
+    Crea el callback que configura los comandos del bot en el menú de Telegram
+    y arranca las tareas en segundo plano (carga, actualización y liberación del
+    material, limpieza del historial y, si `monitor_loop`, medición del retraso
+    del event loop, que es uno por proceso)
     """
-    await application.bot.set_my_commands([
-        BotCommand("start", "Iniciar el bot"),
-        BotCommand("recursos", "Ver recursos disponibles")
-    ])
+    async def post_init(application: Application):
+        await application.bot.set_my_commands([
+            BotCommand("start", "Iniciar el bot"),
+            BotCommand("recursos", "Ver recursos disponibles")
+        ])
+        tasks = [
+            asyncio.create_task(bot_controller.run_material_refresher()),
+            asyncio.create_task(bot_controller.run_history_evictor()),
+            asyncio.create_task(bot_controller.run_material_evictor()),
+        ]
+        if bot_controller.course.preload:
+            tasks.append(asyncio.create_task(bot_controller.load_material()))
+        if monitor_loop:
+            tasks.append(asyncio.create_task(monitor_event_loop_lag()))
+        application.bot_data["background_tasks"] = tasks
+    return post_init
 
-def main():
-    #Función principal que inicializa y ejecuta el bot
-    
-    # Obtener token de Telegram
-    TG_Bot = os.getenv("API_TOKEN_Telegram")
-    
-    if not TG_Bot:
-        print("❌ Error: API_TOKEN_Telegram no está configurado en las variables de entorno")
-        return
-    
-    # Inicializar controlador
-    bot_controller = BotController()
-    
-    # Cargar PDF al iniciar
-    print("🤖 Iniciando bot...")
-    if not bot_controller.initialize_pdf():
-        print("⚠️ Advertencia: No se pudo cargar el PDF inicialmente")
-    
-    # Crear aplicación
-    application = ApplicationBuilder().token(TG_Bot).post_init(post_init).build()
+def build_post_shutdown(bot_controller: BotController):
+    """
+    Crea el callback que libera los recursos del controlador al detener el bot
+    """
+    async def post_shutdown(application: Application):
+        for task in application.bot_data.pop("background_tasks", []):
+            task.cancel()
+        await bot_controller.aclose()
+    return post_shutdown
+
+def build_application(token: str, bot_controller: BotController, monitor_loop: bool = True) -> Application:
+    """
+    Crea la aplicación de Telegram con sus handlers. Los updates de chats distintos
+    se procesan en paralelo (hasta UPDATE_WORKERS a la vez) y los de un mismo chat en orden.
+    """
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .concurrent_updates(ChatOrderedUpdateProcessor(
+            int(os.getenv("UPDATE_WORKERS", "16")),
+            int(os.getenv("UPDATE_MAX_PENDING", "1000")),
+        ))
+        .post_init(build_post_init(bot_controller, monitor_loop))
+        .post_shutdown(build_post_shutdown(bot_controller))
+    )
+    # API de Telegram alternativa (p. ej. el stub local de tools/webhook_harness.py)
+    api_base_url = os.getenv("TELEGRAM_API_BASE_URL")
+    if api_base_url:
+        api_base_url = api_base_url.rstrip("/")
+        builder = builder.base_url(f"{api_base_url}/bot").base_file_url(f"{api_base_url}/file/bot")
+    application = builder.build()
     
     # Registrar comandos
     application.add_handler(CommandHandler("start", bot_controller.handle_start_command))
@@ -47,33 +79,133 @@ def main():
     # Registrar handler para mensajes de texto
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot_controller.handle_text_message))
     application.add_handler(CallbackQueryHandler(bot_controller.handle_resources_callback))
-    
-    # Iniciar bot
-    # Levantar un servidor HTTP ligero para que Render detecte un puerto abierto (health check)
-    class _HealthHandler(BaseHTTPRequestHandler):
-        def do_GET(self):
-            self.send_response(200)
-            self.send_header("Content-Type", "text/plain; charset=utf-8")
-            self.end_headers()
-            self.wfile.write(b"OK")
+    return application
 
-        # Evitar logs por cada request
-        def log_message(self, format, *args):
-            return
+def build_readiness(controllers: list):
+    """
+    Readiness del proceso: con varios cursos, listo solo si lo están todos
+    (los cursos sin precarga cuentan como listos mientras su material no falle)
+    """
+    def readiness() -> tuple:
+        states = [(controller.course.course_id, *controller.readiness()) for controller in controllers]
+        if len(states) == 1:
+            return states[0][1], states[0][2]
+        ready = all(state[1] for state in states)
+        return ready, "\n".join(f"{course_id}: {detail}" for course_id, _, detail in states)
+    return readiness
 
-    def _start_health_server():
+async def run_applications(applications: list, readiness, bot_mode: str, services: SharedServices | None = None):
+    """
+    Ciclo de vida manual de una o varias aplicaciones (una por curso) en el mismo
+    event loop. En modo webhook Telegram envía los updates por POST al puerto del
+    servidor de health-check, en WEBHOOK_PATH (con varios cursos, WEBHOOK_PATH/<curso>).
+    
+    Args:
+        applications: Lista de (id del curso, aplicación)
+        readiness: Función para /ready
+        bot_mode: "polling" o "webhook"
+        services: Recursos compartidos que se cierran al terminar (modo multicurso)
+    """
+    webhook_url = os.getenv("WEBHOOK_URL", "").rstrip("/")
+    webhook_path = "/" + os.getenv("WEBHOOK_PATH", "telegram").strip("/")
+    secret_token = os.getenv("WEBHOOK_SECRET") or None
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
         try:
-            port = int(os.environ.get("PORT", "8000"))
-        except Exception:
-            port = 8000
-        server = HTTPServer(("0.0.0.0", port), _HealthHandler)
-        thread = threading.Thread(target=server.serve_forever, daemon=True)
-        thread.start()
-        print(f"🔌 Health server listening on port {port}")
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+    
+    def path_for(course_id: str) -> str:
+        return webhook_path if len(applications) == 1 else f"{webhook_path}/{course_id}"
+    
+    # run_polling/run_webhook llaman a post_init y post_shutdown; aquí el ciclo de vida es manual
+    health_server = None
+    try:
+        for _, application in applications:
+            await application.initialize()
+            await application.post_init(application)
+        webhooks = {}
+        if bot_mode == "webhook":
+            webhooks = {
+                path_for(course_id): WebhookBridge(application, loop, secret_token)
+                for course_id, application in applications
+            }
+        health_server = HealthServer(readiness, webhooks=webhooks)
+        for course_id, application in applications:
+            if bot_mode == "webhook":
+                await application.bot.set_webhook(
+                    url=f"{webhook_url}{path_for(course_id)}",
+                    secret_token=secret_token,
+                    allowed_updates=Update.ALL_TYPES,
+                )
+            else:
+                await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            await application.start()
+        health_server.start()
+        if bot_mode == "webhook":
+            print(f"✅ Bot iniciado en modo webhook ({webhook_url}{webhook_path}). Presiona Ctrl+C para detener.\n")
+        else:
+            print(f"✅ {len(applications)} bots iniciados. Presiona Ctrl+C para detener.\n")
+        await stop_event.wait()
+    finally:
+        if health_server:
+            health_server.stop()
+        for _, application in applications:
+            if application.updater and application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+            await application.shutdown()
+            await application.post_shutdown(application)
+        if services:
+            await services.aclose()
 
-    _start_health_server()
+def main():
+    #Función principal que inicializa y ejecuta el bot (o los bots de todos los cursos)
+    
+    try:
+        courses = load_courses()
+    except ValueError as e:
+        print(f"❌ Error: configuración de cursos no válida ({e})")
+        return
+    
+    # Obtener token de Telegram
+    if courses[0].course_id == DEFAULT_COURSE_ID and not courses[0].token:
+        print("❌ Error: API_TOKEN_Telegram no está configurado en las variables de entorno")
+        return
+    
+    bot_mode = os.getenv("BOT_MODE", "polling").lower()
+    if bot_mode == "webhook" and not os.getenv("WEBHOOK_URL"):
+        print("❌ Error: WEBHOOK_URL no está configurado (requerido con BOT_MODE=webhook)")
+        return
+    
+    # Inicializar controladores: con varios cursos comparten pools HTTP/LLM, cachés y analítica
+    services = SharedServices() if len(courses) > 1 else None
+    controllers = [BotController(course, services) for course in courses]
+    
+    # El material se carga en segundo plano (post_init) para empezar a recibir updates cuanto antes
+    print("🤖 Iniciando bot..." if len(courses) == 1 else f"🤖 Iniciando {len(courses)} cursos: {', '.join(c.course_id for c in courses)}")
+    
+    # Crear aplicaciones
+    applications = [
+        (controller.course.course_id, build_application(controller.course.token, controller, monitor_loop=index == 0))
+        for index, controller in enumerate(controllers)
+    ]
+    readiness = build_readiness(controllers)
+    
+    # Iniciar bot
+    if bot_mode == "webhook" or len(applications) > 1:
+        asyncio.run(run_applications(applications, readiness, bot_mode, services))
+        return
+    
+    # Levantar un servidor HTTP ligero para que Render detecte un puerto abierto (health check),
+    # con /ready (material cargado) y /metrics (formato Prometheus)
+    HealthServer(readiness).start()
     print("✅ Bot iniciado. Presiona Ctrl+C para detener.\n")
-    application.run_polling()
+    applications[0][1].run_polling()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
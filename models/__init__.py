@@ -1,6 +1,12 @@
 """
 Paquete de modelos
 """
+from .answer_cache import AnswerCache
+from .course_registry import CourseConfig, load_courses
+from .faq_store import FAQStore
+from .history_store import HistoryStore
 from .pdf_handler import PDFHandler
+from .pdf_store import PDFStore
+from .resource_registry import ResourceRegistry
 
-__all__ = ['PDFHandler']
+__all__ = ['AnswerCache', 'CourseConfig', 'load_courses', 'FAQStore', 'HistoryStore', 'PDFHandler', 'PDFStore', 'ResourceRegistry']
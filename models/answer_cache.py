@@ -0,0 +1,212 @@
+import os
+import json
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from models.text_index import INTERROGATIVES, STOPWORDS, question_key
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Cambia si cambia la clave de las preguntas (las entradas guardadas antes se ignoran)
+CACHE_FORMAT = 2
+
+
+class MinHasher:
+    """Firmas MinHash sobre shingles de caracteres para detectar preguntas casi idénticas"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._params = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def _shingles(self, text: str) -> set:
+        if len(text) <= self.shingle_size:
+            return {text}
+        return {text[i:i + self.shingle_size] for i in range(len(text) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> tuple:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+            for shingle in self._shingles(text)
+        ]
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+            for a, b in self._params
+        )
+
+    @staticmethod
+    def similarity(sig_a: tuple, sig_b: tuple) -> float:
+
+        #Estimación de la similitud de Jaccard entre dos firmas
+
+        if not sig_a or len(sig_a) != len(sig_b):
+            return 0.0
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+def _anchors(key: str) -> list:
+    # Interrogativos y términos cortos o numéricos ("ii", "iii", "2025") deben coincidir
+    # exactamente: "¿cuándo es el corte ii?" y "¿dónde es el corte iii?" son casi iguales
+    # por shingles pero no son la misma pregunta
+    return sorted(
+        tok for tok in key.split()
+        if tok in INTERROGATIVES
+        or (tok not in STOPWORDS and (len(tok) <= 3 or any(ch.isdigit() for ch in tok)))
+    )
+
+
+class AnswerCache:
+    """
+    Caché de respuestas para preguntas sin historial. Coincide por la clave de la
+    pregunta (`question_key`) y, si no hay coincidencia exacta, por similitud MinHash (con
+    LSH por bandas). Las claves incluyen el hash del material, de modo que las
+    entradas dejan de ser válidas cuando cambia el PDF.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("ANSWER_CACHE_PATH", "data/answer_cache.json")
+        self.max_entries = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+        self.threshold = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.85"))
+        self.bands = 16
+        self.hasher = MinHasher(num_perm=64)
+        self._rows = self.hasher.num_perm // self.bands
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._dirty = 0
+        self._load()
+
+    def _key(self, key: str, material_hash: str) -> str:
+        return f"{material_hash}:{key}"
+
+    def _band_keys(self, material_hash: str, signature: tuple) -> list:
+        return [
+            (material_hash, band, signature[band * self._rows:(band + 1) * self._rows])
+            for band in range(self.bands)
+        ]
+
+    def _insert(self, key: str, entry: dict) -> None:
+        self._remove(key)
+        self._entries[key] = entry
+        for band_key in self._band_keys(entry["material_hash"], tuple(entry["signature"])):
+            self._buckets.setdefault(band_key, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(entry["material_hash"], tuple(entry["signature"])):
+            bucket = self._buckets.get(band_key)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def get(self, question: str, material_hash: Optional[str]) -> Optional[str]:
+        """
+        Busca una respuesta guardada para la pregunta
+
+        Args:
+            question: Pregunta del usuario
+            material_hash: Hash del contenido actual del material
+
+        Returns:
+            Optional[str]: Respuesta guardada o None
+        """
+        key = question_key(question)
+        if not key or not material_hash:
+            return None
+        with self._lock:
+            entry_key = self._key(key, material_hash)
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+                return entry["answer"]
+
+            signature = self.hasher.signature(key)
+            candidates = set()
+            for band_key in self._band_keys(material_hash, signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            anchors = _anchors(key)
+            best_key, best_score = None, 0.0
+            for candidate in candidates:
+                if self._entries[candidate].get("anchors") != anchors:
+                    continue
+                score = MinHasher.similarity(signature, tuple(self._entries[candidate]["signature"]))
+                if score > best_score:
+                    best_key, best_score = candidate, score
+            if best_key is not None and best_score >= self.threshold:
+                self._entries.move_to_end(best_key)
+                return self._entries[best_key]["answer"]
+
+            return None
+
+    def put(self, question: str, material_hash: Optional[str], answer: str) -> None:
+        """
+        Guarda la respuesta a una pregunta sin historial
+        """
+        key = question_key(question)
+        if not key or not material_hash or not answer:
+            return
+        with self._lock:
+            self._insert(self._key(key, material_hash), {
+                "material_hash": material_hash,
+                "signature": list(self.hasher.signature(key)),
+                "anchors": _anchors(key),
+                "answer": answer,
+            })
+            self._dirty += 1
+
+    def discard(self, material_hash: Optional[str]) -> None:
+
+        #Elimina las entradas de una versión concreta del material (la caché puede
+        #ser compartida por varios cursos, así que no se tocan las de otros materiales)
+
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e["material_hash"] == material_hash]:
+                self._remove(key)
+                self._dirty += 1
+
+    @property
+    def pending_writes(self) -> int:
+        return self._dirty
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"⚠️ No se pudo leer la caché de respuestas: {e}")
+            return
+        if data.get("format") != CACHE_FORMAT:
+            return
+        for key, entry in data.get("entries", []):
+            self._insert(key, entry)
+
+    def save(self) -> None:
+        """
+        Persiste la caché en disco (bloqueante, llamar desde un hilo)
+        """
+        with self._lock:
+            data = {"format": CACHE_FORMAT, "entries": list(self._entries.items())}
+            self._dirty = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar la caché de respuestas: {e}")
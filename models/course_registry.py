@@ -0,0 +1,209 @@
+import os
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+# Curso que se arma con las variables de entorno de siempre (sin COURSES_CONFIG);
+# sus archivos de datos conservan las rutas originales
+DEFAULT_COURSE_ID = "default"
+
+# Reglas genéricas para cursos sin prompt propio; {subject} es el nombre de la asignatura
+SUBJECT_RULES_TEMPLATE = """Eres un asistente educativo especializado en {subject} y en apoyar la asignatura correspondiente.
+
+REGLAS ESTRICTAS:
+1. Debes responder únicamente a preguntas relacionadas con la asignatura de {subject}: tanto las que hagan referencia al material del curso que te proporciono como las de temas generales de la asignatura dentro de su ámbito académico.
+2. Solo debes rechazar preguntas que sean claramente ajenas a la asignatura. En ese caso, responde: "Lo siento, solo puedo responder preguntas relacionadas con el material del curso de {subject} y con mis funciones dentro de este bot. Por favor, haz una pregunta sobre el contenido del documento o sobre algún tema de {subject}."
+3. Debes priorizar siempre el contenido del material del curso. Si una pregunta relacionada con la materia no puede responderse claramente con el material, puedes complementar la respuesta usando la información procedente de la búsqueda web que se te proporciona, manteniéndote siempre en el contexto de la asignatura.
+4. Cuando el usuario te pregunte qué puedes hacer, describe de forma breve y clara tus capacidades principales: responder dudas sobre el material de {subject}, enviar recursos del curso (por ejemplo mediante el comando /recursos), sugerir material recomendado y usar búsqueda web como apoyo cuando sea útil.
+5. NO inventes información que no esté en el material o en los resultados de la búsqueda web.
+6. Si la información no está ni en el material ni en los resultados de la búsqueda web, indícalo claramente.
+7. Responde en español de forma clara y educativa.
+8. Usa el historial de conversación para mantener el contexto y permitir preguntas de seguimiento, pero no cambies de tema fuera de la asignatura ni respondas sobre asuntos totalmente ajenos."""
+
+SUBJECT_CLOSING_TEMPLATE = "Recuerda: SOLO respondes sobre el contenido de la asignatura de {subject}: prioriza el material del curso y, cuando sea necesario, complétalo con la información de la búsqueda web siempre que esté relacionada con la asignatura."
+
+
+@dataclass(frozen=True)
+class CourseResource:
+    """Documento del curso: forma parte del material consultable y puede ofrecerse en /recursos"""
+    key: str
+    title: str
+    url: Optional[str]
+    filename: str
+    # Texto del botón en /recursos ("" = no aparece en el menú)
+    button: str = ""
+    caption: str = ""
+    error_text: str = "❌ No se pudo obtener el recurso."
+
+
+@dataclass(frozen=True)
+class CourseConfig:
+    """
+    Configuración de un curso: token del bot, documentos, menú de recursos y prompt.
+    El primer recurso es el documento principal (se envía con /start).
+    """
+    course_id: str
+    subject: str
+    token: Optional[str]
+    resources: tuple
+    rules: Optional[str] = None
+    closing: Optional[str] = None
+    material_recomendado: str = ""
+    # Cargar el material al arrancar (si no, se carga con la primera pregunta y se
+    # descarta de memoria tras COURSE_IDLE_SECONDS sin uso)
+    preload: bool = True
+
+    @property
+    def documents(self) -> dict:
+        """
+        Documentos del material en el formato de PDFHandler (id -> (título, url))
+        """
+        return {resource.key: (resource.title, resource.url) for resource in self.resources}
+
+    @property
+    def primary(self) -> CourseResource:
+        return self.resources[0]
+
+    def resource(self, key: str) -> Optional[CourseResource]:
+        for resource in self.resources:
+            if resource.key == key:
+                return resource
+        return None
+
+    def scoped_key(self, key: str) -> str:
+        """
+        Clave con el curso como prefijo (p. ej. para los file_id, que son de cada bot)
+        """
+        return key if self.course_id == DEFAULT_COURSE_ID else f"{self.course_id}/{key}"
+
+    def scoped_path(self, path: str) -> str:
+        """
+        Ruta de datos propia del curso: `data/history.sqlite3` -> `data/history_<curso>.sqlite3`
+        """
+        if self.course_id == DEFAULT_COURSE_ID:
+            return path
+        root, ext = os.path.splitext(path.rstrip("/\\"))
+        return f"{root}_{self.course_id}{ext}"
+
+    def system_rules(self) -> tuple:
+        """
+        Reglas y recordatorio final del prompt del curso
+
+        Returns:
+            tuple[Optional[str], Optional[str]]: (reglas, recordatorio); None = los de PromptBuilder
+        """
+        if self.rules:
+            return self.rules, self.closing or ""
+        if self.course_id == DEFAULT_COURSE_ID:
+            return None, None
+        return (
+            SUBJECT_RULES_TEMPLATE.format(subject=self.subject),
+            self.closing or SUBJECT_CLOSING_TEMPLATE.format(subject=self.subject),
+        )
+
+
+def default_course() -> CourseConfig:
+    """
+    Curso único configurado con las variables de entorno (API_TOKEN_Telegram, PDF_URL...)
+    """
+    return CourseConfig(
+        course_id=DEFAULT_COURSE_ID,
+        subject="Inteligencia Artificial",
+        token=os.getenv("API_TOKEN_Telegram"),
+        resources=(
+            CourseResource(
+                "sinoptico", "Sinóptico", os.getenv("PDF_URL"), "Psinoptico Inteligencia artificial_2025.pdf",
+                "📄 Sinóptico de la materia", "📚 Sinóptico de la materia de Inteligencia Artificial",
+                "❌ No se pudo obtener el sinóptico.",
+            ),
+            CourseResource(
+                "corte_i", "Plantilla de medición de Corte I", os.getenv("PDF_URL_CORTE_I"),
+                "Plantilla_De_Medicion_De_Corte_I.pdf", "📝 Plantilla Corte I", "📝 Plantilla de medición de Corte I",
+                "❌ No se pudo obtener la plantilla de Corte I.",
+            ),
+            CourseResource(
+                "corte_ii", "Plantilla de medición de Corte II", os.getenv("PDF_URL_CORTE_II"),
+                "Plantilla_De_Medicion_De_Corte_II.pdf", "📝 Plantilla Corte II", "📝 Plantilla de medición de Corte II",
+                "❌ No se pudo obtener la plantilla de Corte II.",
+            ),
+            CourseResource(
+                "corte_iii", "Plantilla de medición de Corte III", os.getenv("PDF_URL_CORTE_III"),
+                "Plantilla_De_Medicion_De_Corte_III.pdf", "📝 Plantilla Corte III", "📝 Plantilla de medición de Corte III",
+                "❌ No se pudo obtener la plantilla de Corte III.",
+            ),
+        ),
+        material_recomendado=os.getenv("MATERIAL_RECOMENDADO", ""),
+        preload=True,
+    )
+
+
+def _parse_resource(course_id: str, data: dict) -> CourseResource:
+    key = str(data.get("id") or "").strip()
+    if not key:
+        raise ValueError(f"curso '{course_id}': todos los recursos necesitan 'id'")
+    if key == "material":
+        # "resource_material" es el botón del material recomendado
+        raise ValueError(f"curso '{course_id}': 'material' es un id de recurso reservado")
+    title = data.get("title") or key
+    url = data.get("url") or (os.getenv(data["url_env"]) if data.get("url_env") else None)
+    return CourseResource(
+        key=key,
+        title=title,
+        url=url,
+        filename=data.get("filename") or f"{key}.pdf",
+        button=data.get("button", ""),
+        caption=data.get("caption") or f"📄 {title}",
+        error_text=data.get("error") or f"❌ No se pudo obtener {title}.",
+    )
+
+
+def _parse_course(data: dict) -> CourseConfig:
+    course_id = str(data.get("id") or "").strip()
+    if not course_id or "/" in course_id:
+        raise ValueError("cada curso necesita un 'id' sin '/'")
+    token = data.get("token") or (os.getenv(data["token_env"]) if data.get("token_env") else None)
+    if not token:
+        raise ValueError(f"curso '{course_id}': falta el token del bot ('token_env' o 'token')")
+    resources = tuple(_parse_resource(course_id, resource) for resource in data.get("resources", []))
+    if not resources:
+        raise ValueError(f"curso '{course_id}': se necesita al menos un recurso (el primero es el material principal)")
+    keys = [resource.key for resource in resources]
+    if len(set(keys)) != len(keys):
+        raise ValueError(f"curso '{course_id}': hay ids de recurso repetidos")
+    return CourseConfig(
+        course_id=course_id,
+        subject=data.get("subject") or course_id,
+        token=token,
+        resources=resources,
+        rules=data.get("prompt"),
+        closing=data.get("closing"),
+        material_recomendado=data.get("material_recomendado", ""),
+        preload=bool(data.get("preload", False)),
+    )
+
+
+def load_courses(path: Optional[str] = None) -> list:
+    """
+    Cursos que atiende el proceso: los del archivo COURSES_CONFIG (JSON) o, si no
+    está definido, el curso único de las variables de entorno
+
+    Raises:
+        ValueError: Si el archivo no es válido (ids o tokens repetidos, campos obligatorios...)
+    """
+    path = path or os.getenv("COURSES_CONFIG")
+    if not path:
+        return [default_course()]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"no se pudo leer {path}: {e}") from e
+    entries = data.get("courses") if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path} no contiene ningún curso")
+    courses = [_parse_course(entry) for entry in entries]
+    for attribute, label in (("course_id", "ids"), ("token", "tokens")):
+        values = [getattr(course, attribute) for course in courses]
+        if len(set(values)) != len(values):
+            raise ValueError(f"{path}: hay {label} de curso repetidos")
+    return courses
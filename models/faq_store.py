@@ -0,0 +1,150 @@
+import os
+import json
+from datetime import datetime
+from typing import Optional
+from models.answer_cache import MinHasher, _anchors
+from models.text_index import question_key
+
+# Cambia si cambia el formato de los archivos de FAQ (los anteriores se ignoran)
+FAQ_FORMAT = 1
+
+
+class FAQStore:
+    """
+    Respuestas precalculadas (FAQ) generadas offline con `tools/build_faq.py` a partir
+    de los temas del material y de las preguntas frecuentes de los registros.
+
+    Hay un archivo JSON por versión del material (`FAQ_DIR/<hash del material>.json`),
+    así que un cambio en los PDFs deja de servir las respuestas antiguas sin borrarlas.
+    Solo se sirven coincidencias de alta confianza con la pregunta o con uno de sus alias
+    (ver `question_key`): la misma clave o una similitud MinHash de al menos
+    `FAQ_MATCH_THRESHOLD` con los mismos interrogativos y términos ancla.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.getenv("FAQ_DIR", "data/faq")
+        self.enabled = os.getenv("FAQ_ENABLED", "true").lower() == "true"
+        self.threshold = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.9"))
+        self.hasher = MinHasher(num_perm=64)
+        # (hash del material, mtime del archivo, clave de la pregunta -> respuesta, [(firma, anclas, respuesta)])
+        self._active = (None, None, {}, [])
+
+    def path_for(self, material_hash: str) -> str:
+        return os.path.join(self.root, f"{material_hash}.json")
+
+    def read(self, material_hash: str) -> Optional[dict]:
+        """
+        Lee el archivo de FAQ de una versión del material
+
+        Returns:
+            Optional[dict]: Contenido del archivo o None si no existe o es de otro formato
+        """
+        try:
+            with open(self.path_for(material_hash), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo leer la FAQ precalculada: {e}")
+            return None
+        if data.get("format") != FAQ_FORMAT or data.get("material_hash") != material_hash:
+            return None
+        return data
+
+    def save(self, material_hash: str, entries: list, meta: Optional[dict] = None) -> str:
+        """
+        Guarda (de forma atómica) las entradas de una versión del material
+
+        Args:
+            material_hash: Hash del contenido del material con el que se generaron
+            entries: Lista de {"question", "aliases", "kind", "count", "answer"}
+            meta: Datos informativos del proceso de generación
+
+        Returns:
+            str: Ruta del archivo
+        """
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path_for(material_hash)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": FAQ_FORMAT,
+                "material_hash": material_hash,
+                "built_at": datetime.utcnow().isoformat() + "Z",
+                "meta": meta or {},
+                "entries": entries,
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+    def activate(self, material_hash: Optional[str]) -> int:
+        """
+        Carga en memoria la FAQ del material actual (bloqueante). No hace nada si ya
+        está cargada y el archivo no cambió, así que puede llamarse periódicamente.
+
+        Returns:
+            int: Entradas disponibles
+        """
+        if not self.enabled or not material_hash:
+            self._active = (None, None, {}, [])
+            return 0
+        try:
+            mtime = os.stat(self.path_for(material_hash)).st_mtime
+        except OSError:
+            mtime = None
+        active_hash, active_mtime, exact, _ = self._active
+        if active_hash == material_hash and active_mtime == mtime:
+            return len(exact)
+        data = self.read(material_hash) if mtime is not None else None
+        exact, near = {}, []
+        for entry in (data or {}).get("entries", []):
+            answer = entry.get("answer")
+            if not answer:
+                continue
+            for text in [entry.get("question", "")] + list(entry.get("aliases", [])):
+                key = question_key(text)
+                if key and key not in exact:
+                    exact[key] = answer
+                    near.append((self.hasher.signature(key), _anchors(key), answer))
+        self._active = (material_hash, mtime, exact, near)
+        if exact:
+            print(f"💡 FAQ precalculada cargada: {len(exact)} preguntas")
+        return len(exact)
+
+    @property
+    def active(self) -> bool:
+        return bool(self._active[2])
+
+    def lookup(self, question: str, material_hash: Optional[str]) -> Optional[str]:
+        """
+        Respuesta precalculada para la pregunta si la coincidencia es de alta confianza
+
+        Args:
+            question: Pregunta del usuario
+            material_hash: Hash del material actual (debe ser el de la FAQ cargada)
+
+        Returns:
+            Optional[str]: Respuesta o None
+        """
+        active_hash, _, exact, near = self._active
+        if not exact or active_hash != material_hash:
+            return None
+        key = question_key(question)
+        if not key:
+            return None
+        answer = exact.get(key)
+        if answer is not None:
+            return answer
+        # Lista corta (cientos de entradas como mucho): se recorre entera
+        signature = self.hasher.signature(key)
+        anchors = _anchors(key)
+        best_answer, best_score = None, 0.0
+        for candidate_signature, candidate_anchors, candidate_answer in near:
+            if candidate_anchors != anchors:
+                continue
+            score = MinHasher.similarity(signature, candidate_signature)
+            if score > best_score:
+                best_answer, best_score = candidate_answer, score
+        if best_answer is not None and best_score >= self.threshold:
+            return best_answer
+        return None
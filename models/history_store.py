@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+from models.text_index import estimate_tokens
+
+
+@dataclass
+class Conversation:
+    """Historial de un chat: turnos recientes y resumen de los anteriores"""
+    messages: list = field(default_factory=list)
+    summary: str = ""
+    touched: float = field(default_factory=time.monotonic)
+
+    def as_messages(self) -> list:
+        """
+        Mensajes en formato chat para el modelo (el resumen va primero)
+        """
+        if not self.summary:
+            return list(self.messages)
+        return [{"role": "system", "content": f"Resumen de la conversación anterior: {self.summary}"}] + self.messages
+
+
+class MemoryHistoryBackend:
+    """Backend en memoria (sin persistencia); útil para pruebas"""
+
+    def __init__(self):
+        self._rows = {}
+
+    def load(self, chat_id: int) -> Optional[tuple]:
+        return self._rows.get(chat_id)
+
+    def save(self, chat_id: int, messages: list, summary: str) -> None:
+        self._rows[chat_id] = (list(messages), summary)
+
+    def delete_older_than(self, cutoff: float) -> int:
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteHistoryBackend:
+    """Backend persistente en SQLite: una fila por chat con los turnos en JSON"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "chat_id INTEGER PRIMARY KEY, messages TEXT NOT NULL, summary TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load(self, chat_id: int) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT messages, summary FROM conversations WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def save(self, chat_id: int, messages: list, summary: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO conversations (chat_id, messages, summary, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET messages = excluded.messages, "
+                "summary = excluded.summary, updated_at = excluded.updated_at",
+                (chat_id, json.dumps(messages, ensure_ascii=False), summary, time.time()),
+            )
+            self._conn.commit()
+
+    def delete_older_than(self, cutoff: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM conversations WHERE updated_at < ?", (cutoff,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def build_history_backend(path: Optional[str] = None):
+    """
+    Crea el backend indicado en HISTORY_BACKEND ("sqlite" o "memory")
+
+    Args:
+        path: Archivo SQLite (por defecto HISTORY_DB_PATH)
+    """
+    kind = os.getenv("HISTORY_BACKEND", "sqlite").lower()
+    if kind == "memory":
+        return MemoryHistoryBackend()
+    if kind != "sqlite":
+        print(f"⚠️ HISTORY_BACKEND desconocido ({kind}); se usa sqlite")
+    return SQLiteHistoryBackend(path or os.getenv("HISTORY_DB_PATH", "data/history.sqlite3"))
+
+
+class HistoryStore:
+    """
+    Historial de conversación por chat con memoria acotada.
+
+    - Los chats activos se mantienen en una LRU de `HISTORY_CACHE_SIZE` entradas y se
+      descartan tras `HISTORY_IDLE_SECONDS` sin actividad; el resto vive en el backend.
+    - Cada turno se escribe en el backend al momento, así que el historial sobrevive
+      a los reinicios.
+    - El recorte es por tokens (`HISTORY_TOKEN_BUDGET`): se quitan los turnos más
+      antiguos y se devuelven para que, opcionalmente, se condensen en el resumen.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or build_history_backend()
+        self.max_chats = int(os.getenv("HISTORY_CACHE_SIZE", "500"))
+        self.idle_seconds = float(os.getenv("HISTORY_IDLE_SECONDS", "1800"))
+        self.token_budget = int(os.getenv("HISTORY_TOKEN_BUDGET", "1200"))
+        self.retention_days = float(os.getenv("HISTORY_RETENTION_DAYS", "30"))
+        self._lock = threading.Lock()
+        self._active = OrderedDict()
+
+    def _conversation(self, chat_id: int) -> Conversation:
+        with self._lock:
+            conversation = self._active.get(chat_id)
+            if conversation is not None:
+                self._active.move_to_end(chat_id)
+                conversation.touched = time.monotonic()
+                return conversation
+        try:
+            row = self.backend.load(chat_id)
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el historial del chat: {e}")
+            row = None
+        conversation = Conversation(*row) if row else Conversation()
+        with self._lock:
+            # Otro hilo pudo cargarlo mientras tanto
+            conversation = self._active.setdefault(chat_id, conversation)
+            self._active.move_to_end(chat_id)
+            while len(self._active) > self.max_chats:
+                self._active.popitem(last=False)
+        return conversation
+
+    def get(self, chat_id: int) -> list:
+        """
+        Historial del chat en formato chat (resumen + turnos recientes)
+        """
+        return self._conversation(chat_id).as_messages()
+
+    def append(self, chat_id: int, question: str, answer: str) -> list:
+        """
+        Añade un turno, recorta por tokens y lo persiste
+
+        Returns:
+            list: Mensajes descartados por el recorte (del más antiguo al más reciente)
+        """
+        conversation = self._conversation(chat_id)
+        conversation.messages.append({"role": "user", "content": question})
+        conversation.messages.append({"role": "assistant", "content": answer})
+        dropped = self._trim(conversation)
+        self._persist(chat_id, conversation)
+        return dropped
+
+    def get_summary(self, chat_id: int) -> str:
+        return self._conversation(chat_id).summary
+
+    def set_summary(self, chat_id: int, summary: str) -> None:
+        conversation = self._conversation(chat_id)
+        conversation.summary = self._bound_summary(summary)
+        self._persist(chat_id, conversation)
+
+    def _bound_summary(self, summary: str) -> str:
+        # El resumen ocupa como mucho la mitad del presupuesto: el resto es para los turnos
+        max_chars = (self.token_budget // 2) * 4
+        if len(summary) <= max_chars:
+            return summary
+        return summary[:max(0, max_chars - 1)].rstrip() + "…"
+
+    def _trim(self, conversation: Conversation) -> list:
+        # Se descartan turnos completos (pregunta + respuesta) empezando por los más antiguos,
+        # pero siempre se conserva el último para que funcionen las preguntas de seguimiento
+        messages = conversation.messages
+        conversation.summary = self._bound_summary(conversation.summary)
+        budget = self.token_budget - estimate_tokens(conversation.summary)
+        total = sum(estimate_tokens(m["content"]) for m in messages)
+        cut = 0
+        while total > budget and len(messages) - cut > 2:
+            total -= estimate_tokens(messages[cut]["content"]) + estimate_tokens(messages[cut + 1]["content"])
+            cut += 2
+        dropped = messages[:cut]
+        conversation.messages = messages[cut:]
+        if total > budget and conversation.messages:
+            # La última respuesta conserva al menos una cuarta parte del presupuesto
+            # aunque la pregunta sea muy larga
+            last = conversation.messages[-1]
+            max_chars = max(self.token_budget // 4, budget - estimate_tokens(conversation.messages[0]["content"])) * 4
+            if len(last["content"]) > max_chars:
+                conversation.messages[-1] = {**last, "content": last["content"][:max_chars].rstrip() + "…"}
+        return dropped
+
+    def _persist(self, chat_id: int, conversation: Conversation) -> None:
+        try:
+            self.backend.save(chat_id, conversation.messages, conversation.summary)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el historial del chat: {e}")
+
+    def evict_idle(self) -> int:
+        """
+        Descarta de memoria los chats inactivos y borra del backend los muy antiguos
+
+        Returns:
+            int: Chats descartados de memoria
+        """
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [chat_id for chat_id, conversation in self._active.items() if conversation.touched < cutoff]
+            for chat_id in idle:
+                del self._active[chat_id]
+        if self.retention_days > 0:
+            try:
+                self.backend.delete_older_than(time.time() - self.retention_days * 86400)
+            except Exception as e:
+                print(f"⚠️ No se pudo depurar el historial: {e}")
+        return len(idle)
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._active)
+
+    def close(self) -> None:
+        self.backend.close()
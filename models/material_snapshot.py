@@ -0,0 +1,58 @@
+import os
+import sys
+import mmap
+import marshal
+from typing import Optional
+
+# Cambia si cambia el formato de la instantánea; el formato de marshal depende de la versión de Python
+SNAPSHOT_FORMAT = f"1-py{sys.version_info[0]}.{sys.version_info[1]}"
+
+
+class MaterialSnapshot:
+    """
+    Instantánea del material ya procesado (texto, fragmentos y estadísticas del
+    índice) en un único archivo `marshal` que se lee con mmap. Al reiniciar con los
+    mismos PDFs el material queda listo en milisegundos, sin importar PyPDF2 ni
+    volver a tokenizar.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv(
+            "MATERIAL_SNAPSHOT_PATH", os.path.join(os.getenv("PDF_CACHE_DIR", "data/pdf_cache"), "material.snapshot")
+        )
+
+    def load(self, source_hash: str) -> Optional[dict]:
+        """
+        Devuelve los datos guardados si corresponden a los PDFs indicados
+
+        Args:
+            source_hash: Huella combinada de los PDFs de origen
+
+        Returns:
+            Optional[dict]: Datos de la instantánea o None si no existe o está desactualizada
+        """
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                data = marshal.loads(view)
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+        if not isinstance(data, dict) or data.get("format") != SNAPSHOT_FORMAT:
+            return None
+        if data.get("source_hash") != source_hash:
+            return None
+        return data
+
+    def save(self, data: dict) -> None:
+        """
+        Guarda la instantánea de forma atómica (solo tipos simples: dict, list, str, números)
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                marshal.dump({**data, "format": SNAPSHOT_FORMAT}, f)
+            os.replace(tmp_path, self.path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo guardar la instantánea del material: {e}")
@@ -0,0 +1,123 @@
+import os
+import json
+import hashlib
+import functools
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version
+from typing import Optional
+
+
+@functools.lru_cache(maxsize=None)
+def extractor_version() -> str:
+    # Cambia si cambia la forma de extraer el texto (invalida la caché de páginas).
+    # Se consulta la versión instalada sin importar PyPDF2, que solo hace falta al extraer.
+    return f"pypdf2-{version('PyPDF2')}-1"
+
+
+def _pool_context():
+    # Se extrae desde un hilo mientras el proceso ya tiene otros hilos (analítica, servidor
+    # HTTP, event loop): con "fork" los hijos podrían heredar locks tomados y bloquearse
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _extract_range(content: bytes, start: int, stop: int) -> list:
+    # Se ejecuta en un proceso del pool: cada proceso abre su propia copia del PDF
+    import PyPDF2
+    reader = PyPDF2.PdfReader(BytesIO(content))
+    texts = []
+    for number in range(start, stop):
+        try:
+            texts.append(reader.pages[number].extract_text() or "")
+        except Exception:
+            texts.append("")
+    return texts
+
+
+class PageTextCache:
+    """
+    Caché en disco del texto de cada página, indexada por el SHA-256 del documento.
+    Un documento que no cambió se carga sin volver a extraer el texto.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.path.join(os.getenv("PDF_CACHE_DIR", "data/pdf_cache"), "pages")
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, f"{sha256}.json")
+
+    def get(self, sha256: str) -> Optional[list]:
+        try:
+            with open(self._path(sha256), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("extractor") != extractor_version() or not isinstance(data.get("pages"), list):
+            return None
+        return data["pages"]
+
+    def put(self, sha256: str, pages: list) -> None:
+        path = self._path(sha256)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"extractor": extractor_version(), "pages": pages}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la caché de páginas: {e}")
+
+    def retain(self, sha256s: set) -> None:
+        """
+        Borra las entradas de documentos que ya no forman parte del material
+        """
+        for name in os.listdir(self.root):
+            if name.endswith(".json") and name[:-5] not in sha256s:
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError:
+                    pass
+
+
+class PageExtractor:
+    """
+    Extrae el texto de las páginas de un PDF. Los documentos grandes se reparten
+    por rangos de páginas entre procesos (PDF_EXTRACT_WORKERS) para no quedar
+    limitados por el GIL; los pequeños se extraen en el proceso actual.
+    """
+
+    def __init__(self, cache: Optional[PageTextCache] = None):
+        self.cache = cache or PageTextCache()
+        self.workers = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.parallel_min_pages = int(os.getenv("PDF_EXTRACT_PARALLEL_MIN_PAGES", "16"))
+
+    def extract(self, content: bytes) -> list:
+        """
+        Texto de cada página del PDF (desde la caché si el documento no cambió)
+
+        Args:
+            content: Bytes del PDF
+
+        Returns:
+            list[str]: Texto por página (índice 0 = página 1)
+        """
+        sha256 = hashlib.sha256(content).hexdigest()
+        pages = self.cache.get(sha256)
+        if pages is not None:
+            return pages
+
+        import PyPDF2
+        page_count = len(PyPDF2.PdfReader(BytesIO(content)).pages)
+        if self.workers > 1 and page_count >= self.parallel_min_pages:
+            step = -(-page_count // self.workers)
+            ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+            with ProcessPoolExecutor(max_workers=len(ranges), mp_context=_pool_context()) as pool:
+                futures = [pool.submit(_extract_range, content, start, stop) for start, stop in ranges]
+                pages = [text for future in futures for text in future.result()]
+        else:
+            pages = _extract_range(content, 0, page_count)
+
+        self.cache.put(sha256, pages)
+        return pages
@@ -1,86 +1,278 @@
-import requests
-from io import BytesIO
-import PyPDF2
+from dataclasses import dataclass
 from typing import Optional
 import os
+import hashlib
 from dotenv import load_dotenv
+from models.pdf_store import PDFStore
+from models.material_snapshot import MaterialSnapshot
+from models.page_extractor import PageExtractor
+from models.text_index import BM25Index, TextChunk, chunk_pages
 
 # Cargar variables de entorno
 load_dotenv()
 
+
+@dataclass(frozen=True)
+class CourseDocument:
+    """Documento del corpus del curso"""
+    doc_id: str
+    title: str
+    page_count: int
+    source_hash: str
+
+
+@dataclass(frozen=True)
+class CourseMaterial:
+    """Instantánea inmutable del material cargado (texto, índice y hashes)"""
+    content: str
+    index: BM25Index
+    content_hash: str
+    source_hash: str
+    page_count: int
+    documents: tuple = ()
+
+
 class PDFHandler:
-    """Modelo para manejar la carga y procesamiento de PDFs"""
-    
-    def __init__(self):
-        self.content = ""
-        self.is_loaded = False
-        self.pdf_url = os.getenv("PDF_URL")
-    
+    """
+    Modelo para manejar la carga y procesamiento de PDFs.
+
+    El material del curso es un corpus con todos los documentos configurados
+    (`documents`: id -> (título, URL)); el primero es el principal (sinóptico) y
+    es obligatorio, el resto se incluyen si están disponibles. Cada fragmento del
+    índice conserva su documento y página de origen. El material procesado se
+    guarda en una instantánea para que los reinicios no vuelvan a extraerlo.
+    """
+
+    def __init__(self, store: Optional[PDFStore] = None, documents: Optional[dict] = None,
+                 extractor: Optional[PageExtractor] = None, snapshot: Optional[MaterialSnapshot] = None):
+        self.documents = documents or {"sinoptico": ("Sinóptico", os.getenv("PDF_URL"))}
+        self.store = store or PDFStore()
+        self.extractor = extractor or PageExtractor()
+        self.snapshot = snapshot or MaterialSnapshot()
+        # Toda la información derivada de los PDFs se reemplaza de una sola vez
+        self._material: Optional[CourseMaterial] = None
+
+    @property
+    def material(self) -> Optional[CourseMaterial]:
+        return self._material
+
+    @property
+    def content(self) -> str:
+        material = self._material
+        return material.content if material else ""
+
+    @property
+    def index(self) -> Optional[BM25Index]:
+        material = self._material
+        return material.index if material else None
+
+    @property
+    def content_hash(self) -> Optional[str]:
+        material = self._material
+        return material.content_hash if material else None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._material is not None
+
+    def _primary_id(self) -> str:
+        return next(iter(self.documents))
+
     def load_pdf(self) -> bool:
         """
-        Carga y procesa el PDF desde la URL configurada
-        
+        Carga y procesa los PDFs del curso, usando la copia local si existe (arranque
+        en frío sin red); si no hay copia se descargan desde las URLs configuradas
+
         Returns:
             bool: True si se cargó exitosamente, False en caso contrario
         """
+        print("📄 Cargando contenido del PDF...")
+        # Arranque en caliente: si los PDFs locales son los de la instantánea no hace falta procesarlos
+        local_hashes = {}
+        for doc_id, (_, url) in self.documents.items():
+            sha256 = self.store.current_hash(url) if url else None
+            if sha256:
+                local_hashes[doc_id] = sha256
+        if self._primary_id() in local_hashes and self._install_snapshot(self._combined_hash(local_hashes)):
+            return True
+
+        contents = {}
+        for doc_id, (_, url) in self.documents.items():
+            if not url:
+                continue
+            content = self.store.get_cached(url)
+            if content is None:
+                content = self.store.fetch(url)
+            if content is not None:
+                contents[doc_id] = content
+        if self._primary_id() not in contents:
+            print("❌ Error al cargar el PDF: no se pudo descargar ni hay copia local")
+            return False
+        return self._install(contents)
+
+    def refresh(self) -> bool:
+        """
+        Revalida los PDFs con GET condicionales y, si alguno cambió, reemplaza el
+        texto y el índice de forma atómica. Pensado para ejecutarse en segundo plano.
+
+        Returns:
+            bool: True si se instaló una nueva versión del material
+        """
+        contents = {}
+        for doc_id, (_, url) in self.documents.items():
+            content = self.store.fetch(url) if url else None
+            if content is not None:
+                contents[doc_id] = content
+        if self._primary_id() not in contents:
+            return False
+        material = self._material
+        if material and self._source_hash(contents) == material.source_hash:
+            return False
+        print("🔄 Nueva versión del material detectada, actualizando...")
+        return self._install(contents)
+
+    @staticmethod
+    def _combined_hash(hashes: dict) -> str:
+        # Huella de todo el corpus a partir del SHA-256 de cada documento
+        digest = hashlib.sha256()
+        for doc_id in sorted(hashes):
+            digest.update(f"{doc_id}:{hashes[doc_id]}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _source_hash(self, contents: dict) -> str:
+        return self._combined_hash({doc_id: hashlib.sha256(content).hexdigest() for doc_id, content in contents.items()})
+
+    def _install_snapshot(self, source_hash: str) -> bool:
+        data = self.snapshot.load(source_hash)
+        if data is None:
+            return False
         try:
-            print("📄 Cargando contenido del PDF...")
-            
-            # Descargar el PDF
-            response = requests.get(self.pdf_url, timeout=30)
-            response.raise_for_status()
-            
-            # Leer el PDF
-            pdf_file = BytesIO(response.content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            # Extraer texto de todas las páginas
-            text_content = []
-            for page in pdf_reader.pages:
-                text = page.extract_text()
-                if text:
-                    text_content.append(text)
-            
+            chunks = [TextChunk(*chunk) for chunk in data["chunks"]]
+            self._material = CourseMaterial(
+                content=data["content"],
+                index=BM25Index.from_state(chunks, data["index"]),
+                content_hash=data["content_hash"],
+                source_hash=source_hash,
+                page_count=data["page_count"],
+                documents=tuple(CourseDocument(*document) for document in data["documents"]),
+            )
+        except (KeyError, TypeError) as e:
+            print(f"⚠️ Instantánea del material no válida: {e}")
+            return False
+        print(f"⚡ Material cargado desde la instantánea: {len(chunks)} fragmentos")
+        return True
+
+    def _save_snapshot(self, material: CourseMaterial) -> None:
+        self.snapshot.save({
+            "source_hash": material.source_hash,
+            "content_hash": material.content_hash,
+            "content": material.content,
+            "page_count": material.page_count,
+            "documents": [
+                [document.doc_id, document.title, document.page_count, document.source_hash]
+                for document in material.documents
+            ],
+            "chunks": [[chunk.text, chunk.page, chunk.section, chunk.document] for chunk in material.index.chunks],
+            "index": material.index.to_state(),
+        })
+
+    def _install(self, contents: dict) -> bool:
+        try:
+            documents = []
+            texts = []
+            chunks = []
+            for doc_id, content in contents.items():
+                title = self.documents[doc_id][0]
+                # Texto por página (desde la caché si el documento no cambió)
+                pages = self.extractor.extract(content)
+                documents.append(CourseDocument(doc_id, title, len(pages), hashlib.sha256(content).hexdigest()))
+                texts.append(f"=== {title} ===\n\n" + "\n\n".join(page for page in pages if page))
+                chunks.extend(chunk_pages(pages, document=title))
+
             # Unir todo el contenido
-            self.content = "\n\n".join(text_content)
-            self.is_loaded = True
-            
-            print(f"✅ PDF cargado exitosamente: {len(pdf_reader.pages)} páginas, {len(self.content)} caracteres")
+            text = "\n\n".join(texts)
+            content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+            # El índice solo se reconstruye si cambió el texto
+            previous = self._material
+            if previous and previous.content_hash == content_hash:
+                index = previous.index
+            else:
+                index = BM25Index(chunks)
+                print(f"🔎 Índice del material construido: {len(chunks)} fragmentos")
+
+            self._material = CourseMaterial(
+                content=text,
+                index=index,
+                content_hash=content_hash,
+                source_hash=self._source_hash(contents),
+                page_count=sum(document.page_count for document in documents),
+                documents=tuple(documents),
+            )
+            self.extractor.cache.retain({document.source_hash for document in documents})
+            self._save_snapshot(self._material)
+            print(
+                f"✅ PDF cargado exitosamente: {len(documents)} documentos, "
+                f"{self._material.page_count} páginas, {len(text)} caracteres"
+            )
             return True
-            
+
         except Exception as e:
-            print(f"❌ Error al cargar el PDF: {e}")
-            self.content = ""
-            self.is_loaded = False
+            print(f"❌ Error al procesar el PDF: {e}")
             return False
-    
+
+    def search(self, query: str, k: int = 5) -> list:
+        """
+        Busca los fragmentos del material más relevantes para la pregunta
+
+        Args:
+            query: Pregunta del usuario
+            k: Número máximo de fragmentos
+
+        Returns:
+            list[tuple[TextChunk, float]]: Fragmentos y su puntuación
+        """
+        index = self.index
+        if index is None:
+            return []
+        return index.search(query, k)
+
+    def relevance(self, query: str, results: list) -> float:
+
+        #Relevancia normalizada (0-1) del mejor fragmento encontrado para la pregunta
+
+        index = self.index
+        if index is None or not results:
+            return 0.0
+        return index.relevance(query, results[0][1])
+
+    def get_leading_chunks(self, k: int = 3) -> list:
+
+        #Primeros fragmentos del material, usados cuando la búsqueda no encuentra coincidencias
+
+        index = self.index
+        if index is None:
+            return []
+        return index.chunks[:k]
+
     def get_content(self) -> str:
         """
         Obtiene el contenido del PDF
-        
-      
+
+
         str: Contenido del PDF o string vacío si no está cargado
         """
-        return self.content if self.is_loaded else ""
-    
+        return self.content
+
+    def unload(self) -> None:
+        """
+        Libera de memoria el texto y el índice (se vuelven a cargar con load_pdf,
+        normalmente desde la instantánea)
+        """
+        self._material = None
+
     def is_pdf_loaded(self) -> bool:
-        
+
         #Verifica si el PDF está cargado
 
         return self.is_loaded
-    
-    def get_pdf_file(self) -> Optional[BytesIO]:
-        
-        #Obtiene el archivo PDF como BytesIO para envío
-        
-        try:
-            response = requests.get(self.pdf_url, timeout=30)
-            response.raise_for_status()
-            
-            pdf_file = BytesIO(response.content)
-            pdf_file.name = "Psinoptico Inteligencia artificial_2025.pdf"
-            return pdf_file
-            
-        except Exception as e:
-            print(f"❌ Error al obtener archivo PDF: {e}")
-            return None
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import requests
+from typing import Optional
+
+
+class PDFStore:
+    """
+    Almacén local de PDFs direccionado por contenido (SHA-256).
+    Cada URL apunta al hash de su última versión conocida junto con los
+    validadores HTTP (ETag / Last-Modified) para revalidar con GET condicional.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.getenv("PDF_CACHE_DIR", "data/pdf_cache")
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._manifest = self._load_manifest()
+        # Callback opcional (segundos, estado) para medir las descargas
+        self.on_fetch = None
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el manifiesto de PDFs: {e}")
+            return {}
+
+    def _save_manifest(self) -> None:
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, f"{sha256}.pdf")
+
+    def _read_object(self, sha256: str) -> Optional[bytes]:
+        try:
+            with open(self._object_path(sha256), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_object(self, content: bytes) -> str:
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self._object_path(sha256)
+        if not os.path.exists(path):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return sha256
+
+    def current_hash(self, url: str) -> Optional[str]:
+        """
+        Hash de la última versión conocida del documento (sin acceder a la red)
+        """
+        entry = self._manifest.get(url)
+        if entry and os.path.exists(self._object_path(entry["sha256"])):
+            return entry["sha256"]
+        return None
+
+    def get_cached(self, url: str) -> Optional[bytes]:
+        """
+        Devuelve los bytes almacenados para la URL sin acceder a la red
+        """
+        sha256 = self.current_hash(url)
+        return self._read_object(sha256) if sha256 else None
+
+    def fetch(self, url: str) -> Optional[bytes]:
+        """
+        Revalida el documento con un GET condicional y devuelve su versión actual.
+        Si el servidor no responde se devuelve la copia local (si existe).
+
+        Args:
+            url: URL del PDF
+
+        Returns:
+            Optional[bytes]: Contenido del PDF o None si no hay copia disponible
+        """
+        if not url:
+            return None
+        entry = self._manifest.get(url) or {}
+        headers = {}
+        if self.current_hash(url):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        started = time.perf_counter()
+        response = None
+        try:
+            response = requests.get(url, headers=headers, timeout=30)
+            self._report_fetch(started, str(response.status_code))
+            if response.status_code == 304:
+                with self._lock:
+                    entry["checked_at"] = time.time()
+                    self._manifest[url] = entry
+                    self._save_manifest()
+                return self.get_cached(url)
+            response.raise_for_status()
+        except Exception as e:
+            if response is None:
+                self._report_fetch(started, "error")
+            print(f"⚠️ No se pudo revalidar {url}: {e}")
+            return self.get_cached(url)
+
+        content = response.content
+        with self._lock:
+            previous = entry.get("sha256")
+            sha256 = self._write_object(content)
+            self._manifest[url] = {
+                "sha256": sha256,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "checked_at": time.time(),
+            }
+            self._save_manifest()
+            if previous and previous != sha256:
+                self._remove_unreferenced(previous)
+        return content
+
+    def _report_fetch(self, started: float, status: str) -> None:
+        if self.on_fetch:
+            try:
+                self.on_fetch(time.perf_counter() - started, status)
+            except Exception:
+                pass
+
+    def _remove_unreferenced(self, sha256: str) -> None:
+        # Borra versiones antiguas que ya no referencia ninguna URL
+        if any(entry.get("sha256") == sha256 for entry in self._manifest.values()):
+            return
+        try:
+            os.remove(self._object_path(sha256))
+        except OSError:
+            pass
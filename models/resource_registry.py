@@ -0,0 +1,80 @@
+import os
+import json
+import time
+import threading
+from typing import Optional
+
+
+class ResourceRegistry:
+    """
+    Registro persistente de los file_id que Telegram devuelve al subir un recurso.
+    Cada entrada guarda la huella (SHA-256) del documento de origen, de modo que
+    un cambio en el documento invalida el file_id almacenado.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("RESOURCE_REGISTRY_PATH", "data/resource_registry.json")
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el registro de recursos: {e}")
+            return {}
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str, fingerprint: str) -> Optional[str]:
+        """
+        Devuelve el file_id solo si corresponde a la versión actual del documento
+
+        Args:
+            key: Identificador del recurso
+            fingerprint: Huella del documento de origen
+
+        Returns:
+            Optional[str]: file_id o None si el documento cambió o nunca se subió
+        """
+        entry = self._entries.get(key)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return None
+        return entry.get("file_id")
+
+    def set(self, key: str, fingerprint: str, file_id: str) -> None:
+        """
+        Registra (o renueva) el file_id de un recurso y lo persiste en disco
+        """
+        with self._lock:
+            self._entries[key] = {
+                "fingerprint": fingerprint,
+                "file_id": file_id,
+                "checked_at": time.time(),
+            }
+            try:
+                self._save()
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar el registro de recursos: {e}")
+
+    def invalidate(self, key: str) -> None:
+        """
+        Elimina el file_id de un recurso (p. ej. si Telegram lo rechaza)
+        """
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                try:
+                    self._save()
+                except Exception as e:
+                    print(f"⚠️ No se pudo guardar el registro de recursos: {e}")
@@ -0,0 +1,230 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+
+
+# Palabras vacías frecuentes en español que no aportan relevancia
+# ("no" y "sin" se conservan: cambian el sentido de la pregunta)
+STOPWORDS = {
+    "a", "al", "algo", "como", "con", "cual", "cuales", "cuando", "de", "del", "donde", "el", "ella",
+    "en", "entre", "era", "es", "esa", "ese", "eso", "esta", "este", "esto", "fue", "ha", "hay", "la",
+    "las", "le", "lo", "los", "me", "mas", "mi", "muy", "o", "para", "pero", "por", "que", "quien",
+    "se", "sea", "segun", "si", "sobre", "son", "su", "sus", "tambien", "te", "tu", "un", "una",
+    "uno", "unos", "unas", "y", "ya", "yo",
+}
+
+# Palabras que distinguen qué se pregunta sobre un mismo tema
+INTERROGATIVES = {
+    "que", "cual", "cuales", "cuando", "donde", "adonde", "quien", "quienes", "como",
+    "cuanto", "cuanta", "cuantos", "cuantas", "porque",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9ñ]+")
+_POR_QUE_RE = re.compile(r"\bpor que\b")
+_HEADING_RE = re.compile(r"^(\d+(\.\d+)*[.)]?\s+\S|(unidad|tema|capitulo|modulo|objetivo|contenido)s?\b)", re.IGNORECASE)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Pasa el texto a minúsculas y elimina los acentos (conserva la ñ)
+    """
+    text = text.lower().replace("ñ", "\0")
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.replace("\0", "ñ")
+
+
+def _stem(token: str) -> str:
+    # Reducción mínima de plurales ("redes" -> "red", "agentes" -> "agente")
+    if len(token) > 4 and token.endswith("es") and token[-3] in "dlnrzj":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list:
+    """
+    Divide el texto en términos normalizados sin palabras vacías
+    """
+    return [_stem(tok) for tok in _TOKEN_RE.findall(normalize_text(text)) if len(tok) > 1 and tok not in STOPWORDS]
+
+
+def normalize_query(question: str) -> str:
+    """
+    Clave de caché de una pregunta: términos normalizados, sin palabras vacías y ordenados
+    """
+    return " ".join(sorted(set(tokenize(question))))
+
+
+def question_key(question: str) -> str:
+    """
+    Clave de una pregunta para reutilizar respuestas: texto normalizado que conserva
+    los interrogativos y el orden de las palabras ("¿cuándo es el corte II?" y
+    "¿dónde es el corte II?" no comparten clave). Vacía si no hay términos de contenido.
+    """
+    if not tokenize(question):
+        return ""
+    key = " ".join(_TOKEN_RE.findall(normalize_text(question)))
+    return _POR_QUE_RE.sub("porque", key)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimación rápida de tokens del modelo (~4 caracteres por token)
+    """
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class TextChunk:
+    """Fragmento del material del curso con su procedencia"""
+    text: str
+    page: int
+    section: str = ""
+    document: str = ""
+
+
+def _is_heading(line: str) -> bool:
+    line = line.strip()
+    if not line or len(line) > 90:
+        return False
+    if _HEADING_RE.match(line):
+        return True
+    letters = [ch for ch in line if ch.isalpha()]
+    return len(letters) >= 4 and all(ch.isupper() for ch in letters)
+
+
+def chunk_pages(pages: list, max_chars: int = 1200, document: str = "") -> list:
+    """
+    Divide el texto de cada página en fragmentos por sección
+
+    Args:
+        pages: Texto extraído de cada página (índice 0 = página 1)
+        max_chars: Tamaño máximo aproximado de cada fragmento
+        document: Título del documento de origen
+
+    Returns:
+        list[TextChunk]: Fragmentos con número de página y sección
+    """
+    chunks = []
+    section = ""
+    for page_number, page_text in enumerate(pages, start=1):
+        buffer = []
+        size = 0
+
+        def flush():
+            nonlocal buffer, size
+            text = "\n".join(buffer).strip()
+            if text:
+                chunks.append(TextChunk(text=text, page=page_number, section=section, document=document))
+            buffer = []
+            size = 0
+
+        for line in (page_text or "").splitlines():
+            if _is_heading(line):
+                flush()
+                section = line.strip()
+            if size + len(line) > max_chars and buffer:
+                flush()
+            buffer.append(line)
+            size += len(line) + 1
+        flush()
+    return chunks
+
+
+class BM25Index:
+    """Índice léxico BM25 en memoria sobre los fragmentos del material"""
+
+    def __init__(self, chunks: list, k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(tokenize(f"{chunk.document}\n{chunk.section}\n{chunk.text}")) for chunk in chunks]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        doc_freqs = Counter()
+        for tf in self._term_freqs:
+            doc_freqs.update(tf.keys())
+        total = len(chunks)
+        self._idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in doc_freqs.items()
+        }
+
+    def to_state(self) -> dict:
+        """
+        Estadísticas del índice como datos simples (para guardarlas en una instantánea)
+        """
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "term_freqs": [dict(tf) for tf in self._term_freqs],
+            "lengths": self._lengths,
+            "avg_length": self._avg_length,
+            "idf": self._idf,
+        }
+
+    @classmethod
+    def from_state(cls, chunks: list, state: dict) -> "BM25Index":
+        """
+        Reconstruye el índice sin volver a tokenizar los fragmentos
+        """
+        index = cls.__new__(cls)
+        index.chunks = chunks
+        index.k1 = state["k1"]
+        index.b = state["b"]
+        index._term_freqs = state["term_freqs"]
+        index._lengths = state["lengths"]
+        index._avg_length = state["avg_length"]
+        index._idf = state["idf"]
+        return index
+
+    def search(self, query: str, k: int = 5) -> list:
+        """
+        Busca los fragmentos más relevantes para la consulta
+
+        Args:
+            query: Pregunta del usuario
+            k: Número máximo de resultados
+
+        Returns:
+            list[tuple[TextChunk, float]]: Fragmentos ordenados por puntuación descendente
+        """
+        terms = [term for term in set(tokenize(query)) if term in self._idf]
+        if not terms or not self.chunks:
+            return []
+        scored = []
+        for i, tf in enumerate(self._term_freqs):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / (self._avg_length or 1.0))
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scored.append((score, i))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(self.chunks[i], score) for score, i in scored[:k]]
+
+    def relevance(self, query: str, score: float) -> float:
+        """
+        Normaliza una puntuación BM25 al rango [0, 1] respecto a la consulta.
+        Un fragmento de longitud media que contiene una vez cada término vale ~1;
+        los términos que no aparecen en el material cuentan con el IDF máximo.
+
+        Args:
+            query: Pregunta del usuario
+            score: Puntuación BM25 del mejor fragmento
+
+        Returns:
+            float: Relevancia normalizada del material para la consulta
+        """
+        terms = set(tokenize(query))
+        if not terms or not self.chunks:
+            return 0.0
+        max_idf = math.log(1 + (len(self.chunks) + 0.5) / 0.5)
+        upper = sum(self._idf.get(term, max_idf) for term in terms)
+        return min(1.0, score / upper) if upper else 0.0
@@ -0,0 +1,41 @@
+import gzip
+import json
+from types import SimpleNamespace
+from controllers.analytics_logger import AnalyticsLogger
+from tools.analytics_report import iter_log_entries, resolve_log_files
+
+
+def make_logger(tmp_path, monkeypatch, **env):
+    settings = {
+        "LOG_FILE_PATH": str(tmp_path / "interactions.log"),
+        "LOG_BATCH_SIZE": "1",
+        "LOG_FLUSH_INTERVAL": "0.01",
+        "LOG_ROTATE_DAILY": "false",
+        **env,
+    }
+    for name, value in settings.items():
+        monkeypatch.setenv(name, value)
+    return AnalyticsLogger()
+
+
+def update_for(chat_id: int):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id))
+
+
+def test_rotated_segments_are_gzipped_and_sort_chronologically(tmp_path, monkeypatch):
+    # Cada escritura supera el tamaño máximo: varias rotaciones en el mismo segundo
+    logger = make_logger(tmp_path, monkeypatch, LOG_ROTATE_BYTES="1")
+    for i in range(12):
+        logger.log_interaction(update_for(1), f"pregunta {i}", "respuesta")
+    logger.close()
+
+    files = resolve_log_files([])
+    segments = [f for f in files if f.endswith(".gz")]
+    assert len(segments) == 11
+    assert files[-1] == str(tmp_path / "interactions.log")
+    for segment in segments:
+        with gzip.open(segment, "rt", encoding="utf-8") as f:
+            assert all(json.loads(line) for line in f)
+
+    questions = [entry["question"] for entry in iter_log_entries(files)]
+    assert questions == [f"pregunta {i}" for i in range(12)]
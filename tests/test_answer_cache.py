@@ -0,0 +1,55 @@
+import pytest
+from models.answer_cache import AnswerCache
+from models.text_index import question_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(path=str(tmp_path / "answer_cache.json"))
+
+
+def test_question_key_keeps_interrogatives_and_order():
+    assert question_key("¿Cuándo es el Corte II?") == "cuando es el corte ii"
+    assert question_key("¿Por qué falla?") == "porque falla"
+    assert question_key("¿Qué es?") == ""
+
+
+def test_exact_hit(cache):
+    cache.put("¿Qué es una heurística admisible?", "h1", "Una que nunca sobreestima")
+
+    assert cache.get("que es una heuristica admisible", "h1") == "Una que nunca sobreestima"
+
+
+def test_different_interrogative_misses(cache):
+    cache.put("¿Cuándo es el corte II?", "h1", "El 15 de octubre")
+
+    assert cache.get("¿Dónde es el corte II?", "h1") is None
+    assert cache.get("¿Cuál es el corte II?", "h1") is None
+    assert cache.get("¿Cuándo es el corte III?", "h1") is None
+
+
+def test_near_duplicate_with_typo_hits(cache):
+    cache.put("¿Qué es una heurística admisible?", "h1", "Una que nunca sobreestima")
+
+    assert cache.get("que es una heuristica admisibel", "h1") == "Una que nunca sobreestima"
+
+
+def test_discard_only_removes_that_material(cache):
+    cache.put("¿Qué es una heurística admisible?", "h1", "vieja")
+    cache.put("¿Qué es una heurística admisible?", "h2", "otro curso")
+    cache.discard("h1")
+
+    assert cache.get("¿Qué es una heurística admisible?", "h1") is None
+    assert cache.get("¿Qué es una heurística admisible?", "h2") == "otro curso"
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "answer_cache.json")
+    cache = AnswerCache(path=path)
+    cache.put("¿Qué es una heurística admisible?", "h1", "Una que nunca sobreestima")
+    assert cache.pending_writes == 1
+    cache.save()
+    assert cache.pending_writes == 0
+
+    reloaded = AnswerCache(path=path)
+    assert reloaded.get("que es una heuristica admisibel", "h1") == "Una que nunca sobreestima"
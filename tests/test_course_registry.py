@@ -0,0 +1,86 @@
+import json
+import pytest
+from models.course_registry import DEFAULT_COURSE_ID, load_courses
+
+
+def write_config(tmp_path, data) -> str:
+    path = tmp_path / "courses.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def course(course_id: str, token: str, resources=None, **extra) -> dict:
+    return {
+        "id": course_id,
+        "token": token,
+        "resources": resources if resources is not None else [{"id": "programa", "url": "https://example.org/p.pdf"}],
+        **extra,
+    }
+
+
+def test_without_config_uses_default_course(monkeypatch):
+    monkeypatch.delenv("COURSES_CONFIG", raising=False)
+    monkeypatch.setenv("API_TOKEN_Telegram", "t0")
+    monkeypatch.setenv("PDF_URL", "https://example.org/sinoptico.pdf")
+
+    [default] = load_courses()
+    assert default.course_id == DEFAULT_COURSE_ID
+    assert default.token == "t0"
+    assert default.primary.url == "https://example.org/sinoptico.pdf"
+    assert default.scoped_key("sinoptico") == "sinoptico"
+    assert default.system_rules() == (None, None)
+
+
+def test_parses_courses_and_defaults(tmp_path, monkeypatch):
+    monkeypatch.setenv("CALCULO_TOKEN", "t2")
+    monkeypatch.setenv("CALCULO_PDF", "https://example.org/calculo.pdf")
+    path = write_config(tmp_path, {"courses": [
+        course("ia", "t1", subject="Inteligencia Artificial", preload=True),
+        {"id": "calculo", "token_env": "CALCULO_TOKEN", "resources": [
+            {"id": "guia", "title": "Guía", "url_env": "CALCULO_PDF", "button": "📘 Guía"},
+            {"id": "taller", "url": "https://example.org/taller.pdf"},
+        ]},
+    ]})
+
+    ia, calculo = load_courses(path)
+    assert (ia.subject, ia.preload) == ("Inteligencia Artificial", True)
+    assert (calculo.subject, calculo.token, calculo.preload) == ("calculo", "t2", False)
+    assert calculo.documents == {
+        "guia": ("Guía", "https://example.org/calculo.pdf"),
+        "taller": ("taller", "https://example.org/taller.pdf"),
+    }
+    assert calculo.resource("taller").filename == "taller.pdf"
+    assert calculo.resource("guia").caption == "📄 Guía"
+    assert calculo.scoped_key("guia") == "calculo/guia"
+    assert calculo.scoped_path("data/history.sqlite3") == "data/history_calculo.sqlite3"
+    rules, closing = calculo.system_rules()
+    assert "calculo" in rules and "calculo" in closing
+
+
+def test_top_level_list_is_accepted(tmp_path):
+    assert [c.course_id for c in load_courses(write_config(tmp_path, [course("ia", "t1")]))] == ["ia"]
+
+
+@pytest.mark.parametrize("data, message", [
+    ([course("a/b", "t1")], "sin '/'"),
+    ([course("ia", "")], "falta el token"),
+    ([course("ia", "t1", resources=[])], "al menos un recurso"),
+    ([course("ia", "t1", resources=[{"url": "x"}])], "necesitan 'id'"),
+    ([course("ia", "t1", resources=[{"id": "material"}])], "reservado"),
+    ([course("ia", "t1", resources=[{"id": "a"}, {"id": "a"}])], "ids de recurso repetidos"),
+    ([course("ia", "t1"), course("ia", "t2")], "ids de curso repetidos"),
+    ([course("ia", "t1"), course("calculo", "t1")], "tokens de curso repetidos"),
+    ({"courses": []}, "ningún curso"),
+])
+def test_invalid_config_raises(tmp_path, data, message):
+    with pytest.raises(ValueError, match=message):
+        load_courses(write_config(tmp_path, data))
+
+
+def test_unreadable_config_raises(tmp_path):
+    path = tmp_path / "courses.json"
+    path.write_text("{no es json", encoding="utf-8")
+    with pytest.raises(ValueError, match="no se pudo leer"):
+        load_courses(str(path))
+    with pytest.raises(ValueError, match="no se pudo leer"):
+        load_courses(str(tmp_path / "no_existe.json"))
@@ -0,0 +1,64 @@
+import json
+import pytest
+from models.faq_store import FAQStore
+from tools.build_faq import frequent_questions
+
+ENTRIES = [
+    {
+        "question": "Explícame el tema: Búsqueda heurística",
+        "aliases": ["¿Qué es búsqueda heurística?", "Explícame búsqueda heurística"],
+        "kind": "topic", "count": 0, "answer": "La búsqueda heurística usa una estimación...",
+    },
+    {
+        "question": "¿Cuándo es el corte II?", "aliases": [],
+        "kind": "log", "count": 5, "answer": "El 15 de octubre",
+    },
+]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAQ_ENABLED", "true")
+    faq = FAQStore(root=str(tmp_path))
+    faq.save("h1", ENTRIES)
+    assert faq.activate("h1") == 4
+    return faq
+
+
+def test_question_and_alias_hit(store):
+    assert store.lookup("Explícame el tema: búsqueda heurística", "h1").startswith("La búsqueda")
+    assert store.lookup("¿que es busqueda heuristica?", "h1").startswith("La búsqueda")
+    assert store.lookup("cuando es el corte II", "h1") == "El 15 de octubre"
+
+
+def test_different_interrogative_or_bare_topic_misses(store):
+    assert store.lookup("¿Dónde es el corte II?", "h1") is None
+    assert store.lookup("¿Cuál es el corte II?", "h1") is None
+    assert store.lookup("¿Cuándo es el corte III?", "h1") is None
+    assert store.lookup("búsqueda heurística", "h1") is None
+
+
+def test_stale_material_hash_is_ignored(store, tmp_path):
+    # Otro material activo: la FAQ cargada no se sirve
+    assert store.lookup("¿Cuándo es el corte II?", "h2") is None
+
+    # Un archivo generado con otro material (o con otro formato) no se carga
+    with open(tmp_path / "h2.json", "w", encoding="utf-8") as f:
+        json.dump({"format": 1, "material_hash": "h1", "entries": ENTRIES}, f)
+    assert store.activate("h2") == 0
+    assert not store.active
+    assert store.lookup("¿Cuándo es el corte II?", "h2") is None
+
+
+def test_frequent_questions_count_by_question_key(tmp_path):
+    path = tmp_path / "bot.log"
+    lines = (
+        ["¿Cuándo es el corte II?", "cuando es el corte ii"] * 2
+        + ["¿Dónde es el corte II?", "hola", "gracias profe"]
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        for question in lines:
+            f.write(json.dumps({"question": question, "answer": "ok"}) + "\n")
+
+    questions = frequent_questions([str(path)], limit=10, min_count=2, course_id="default")
+    assert questions == [("¿Cuándo es el corte II?", 4)]
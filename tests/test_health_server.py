@@ -0,0 +1,89 @@
+import http.client
+import pytest
+from controllers.health_server import HealthServer
+from controllers.webhook import WebhookBridge
+
+SECRET = "secreto"
+
+
+class RecordingBridge(WebhookBridge):
+    """Puente que solo anota los cuerpos recibidos (sin Application ni event loop)"""
+
+    def __init__(self):
+        super().__init__(application=None, loop=None, secret_token=SECRET)
+        self.bodies = []
+
+    def handle(self, body: bytes, headers) -> int:
+        self.bodies.append(body)
+        return 200
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("WEBHOOK_MAX_BODY_BYTES", "1024")
+    bridge = RecordingBridge()
+    health = HealthServer(lambda: (True, "READY"), port=0, webhooks={"/telegram": bridge})
+    health.start()
+    yield health._server.server_address[1], bridge
+    health.stop()
+
+
+def post(port: int, body: bytes | None, headers: dict) -> int:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        connection.putrequest("POST", "/telegram")
+        for name, value in headers.items():
+            connection.putheader(name, value)
+        connection.endheaders()
+        if body:
+            connection.send(body)
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def test_valid_update_is_delivered(server):
+    port, bridge = server
+    status = post(port, b'{"update_id": 1}', {"Content-Length": "16", "X-Telegram-Bot-Api-Secret-Token": SECRET})
+
+    assert status == 200
+    assert bridge.bodies == [b'{"update_id": 1}']
+
+
+@pytest.mark.parametrize("secret", [None, "otro"])
+def test_wrong_secret_is_rejected_before_reading_body(server, secret):
+    port, bridge = server
+    headers = {"Content-Length": "16"}
+    if secret:
+        headers["X-Telegram-Bot-Api-Secret-Token"] = secret
+
+    # El cuerpo no se envía: si el servidor intentara leerlo, la petición quedaría esperando
+    assert post(port, None, headers) == 403
+    assert bridge.bodies == []
+
+
+@pytest.mark.parametrize("length", [None, "abc", "-5"])
+def test_missing_or_invalid_length_is_rejected(server, length):
+    port, bridge = server
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    if length is not None:
+        headers["Content-Length"] = length
+
+    assert post(port, None, headers) == 411
+    assert bridge.bodies == []
+
+
+def test_oversized_body_is_rejected_without_reading(server):
+    port, bridge = server
+    headers = {"Content-Length": str(10 * 1024 * 1024), "X-Telegram-Bot-Api-Secret-Token": SECRET}
+
+    assert post(port, None, headers) == 413
+    assert bridge.bodies == []
+
+
+def test_unknown_path_is_not_found(server):
+    port, _ = server
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.request("POST", "/otro", body=b"{}")
+    assert connection.getresponse().status == 404
+    connection.close()
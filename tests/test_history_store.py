@@ -0,0 +1,119 @@
+import time
+import pytest
+from models.history_store import HistoryStore, MemoryHistoryBackend, SQLiteHistoryBackend
+from models.text_index import estimate_tokens
+
+
+@pytest.fixture
+def make_store(monkeypatch):
+    def make(backend=None, **env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        return HistoryStore(backend or MemoryHistoryBackend())
+    return make
+
+
+def test_trim_drops_oldest_turns_and_keeps_last(make_store):
+    store = make_store(HISTORY_TOKEN_BUDGET=100)
+    for i in range(5):
+        store.append(1, f"pregunta {i} " + "x" * 80, f"respuesta {i} " + "y" * 80)
+
+    messages = store.get(1)
+    assert messages[-2]["content"].startswith("pregunta 4")
+    assert messages[-1]["content"].startswith("respuesta 4")
+    assert sum(estimate_tokens(m["content"]) for m in messages) <= 100
+
+
+def test_trim_returns_dropped_turns_in_order(make_store):
+    store = make_store(HISTORY_TOKEN_BUDGET=60)
+    assert store.append(1, "a" * 100, "b" * 100) == []
+    dropped = store.append(1, "c" * 100, "d" * 100)
+
+    assert [m["content"][0] for m in dropped] == ["a", "b"]
+    assert [m["role"] for m in dropped] == ["user", "assistant"]
+
+
+def test_trim_truncates_oversized_last_answer(make_store):
+    store = make_store(HISTORY_TOKEN_BUDGET=100)
+    store.append(1, "¿pregunta?", "z" * 2000)
+
+    answer = store.get(1)[-1]["content"]
+    assert answer.endswith("…")
+    assert 100 < len(answer) < 2000
+
+
+def test_oversized_summary_does_not_destroy_last_answer(make_store):
+    store = make_store(HISTORY_TOKEN_BUDGET=100)
+    store.set_summary(1, "s" * 500)
+    store.append(1, "¿Qué es un agente?", "Un agente percibe su entorno y actúa sobre él. " * 3)
+
+    conversation = store._conversation(1)
+    assert estimate_tokens(conversation.summary) <= 50
+    assert conversation.messages[-1]["content"].startswith("Un agente percibe su entorno")
+    assert len(conversation.messages[-1]["content"]) > 50
+
+
+def test_long_question_still_leaves_room_for_answer(make_store):
+    store = make_store(HISTORY_TOKEN_BUDGET=100)
+    store.append(1, "q" * 1000, "respuesta " * 30)
+
+    assert len(store.get(1)[-1]["content"]) >= 100
+
+
+def test_lru_bounds_active_chats(make_store):
+    backend = MemoryHistoryBackend()
+    store = make_store(backend, HISTORY_CACHE_SIZE=2)
+    for chat_id in (1, 2, 3):
+        store.append(chat_id, f"hola {chat_id}", "respuesta")
+    assert store.active_chats == 2
+    assert 1 not in store._active
+
+    # El chat descartado de memoria se recupera del backend
+    assert store.get(1)[0]["content"] == "hola 1"
+    assert 2 not in store._active
+
+
+def test_evict_idle_keeps_history_in_backend(make_store):
+    store = make_store(HISTORY_IDLE_SECONDS=0)
+    store.append(1, "hola", "respuesta")
+
+    assert store.evict_idle() == 1
+    assert store.active_chats == 0
+    assert store.get(1)[0]["content"] == "hola"
+
+
+def test_evict_idle_keeps_recent_chats(make_store):
+    store = make_store(HISTORY_IDLE_SECONDS=3600)
+    store.append(1, "hola", "respuesta")
+
+    assert store.evict_idle() == 0
+    assert store.active_chats == 1
+
+
+def test_history_persists_across_instances(make_store, tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    store = make_store(SQLiteHistoryBackend(path))
+    store.append(7, "¿Qué es A*?", "Un algoritmo de búsqueda informada.")
+    store.set_summary(7, "Hablamos de búsqueda.")
+    store.close()
+
+    reopened = make_store(SQLiteHistoryBackend(path))
+    messages = reopened.get(7)
+    reopened.close()
+    assert messages[0] == {"role": "system", "content": "Resumen de la conversación anterior: Hablamos de búsqueda."}
+    assert messages[1:] == [
+        {"role": "user", "content": "¿Qué es A*?"},
+        {"role": "assistant", "content": "Un algoritmo de búsqueda informada."},
+    ]
+
+
+def test_retention_deletes_old_rows(make_store, tmp_path):
+    backend = SQLiteHistoryBackend(str(tmp_path / "history.sqlite3"))
+    store = make_store(backend, HISTORY_IDLE_SECONDS=0)
+    store.append(1, "hola", "respuesta")
+    store.retention_days = 1e-9
+    time.sleep(0.01)
+
+    store.evict_idle()
+    assert store.get(1) == []
+    store.close()
@@ -0,0 +1,221 @@
+import time
+import asyncio
+import pytest
+from types import SimpleNamespace
+from controllers.llm_client import LLMClient
+from controllers.llm_routing import CircuitBreaker, LLMUnavailableError
+
+
+class FakeHTTPError(Exception):
+    """Error con código HTTP, como los de openai"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    def make(**env):
+        settings = {
+            "LLM_BACKENDS": "a,b,c",
+            "LLM_TIMEOUT": "5",
+            "LLM_HEDGE": "true",
+            "LLM_HEDGE_DELAY": "0.05",
+            "LLM_HEDGE_MIN_DELAY": "0.01",
+            "LLM_BREAKER_FAILURES": "1",
+            "LLM_BREAKER_COOLDOWN": "60",
+            **env,
+        }
+        for name, value in settings.items():
+            monkeypatch.setenv(name, value)
+        return LLMClient(http_client=None)
+    return make
+
+
+def backend(client: LLMClient, name: str):
+    return next(b for b in client.backends if b.name == name)
+
+
+def test_slow_primary_loses_to_hedge(make_client):
+    client = make_client()
+    calls = []
+
+    async def request(b):
+        calls.append(b.name)
+        await asyncio.sleep(2.0 if b.name == "a" else 0.01)
+        return f"respuesta de {b.name}"
+
+    started = time.perf_counter()
+    winner, result = asyncio.run(client._race(request))
+
+    assert winner.name == "b"
+    assert result == "respuesta de b"
+    assert time.perf_counter() - started < 1.0
+    assert calls == ["a", "b"]
+    # El perdedor se cancela sin contar como fallo ni abrir su circuito
+    assert backend(client, "a").stats.outcomes == {"cancelled": 1}
+    assert backend(client, "a").breaker.state == "closed"
+
+
+def test_server_error_fails_over_immediately(make_client):
+    client = make_client(LLM_HEDGE_DELAY="10", LLM_HEDGE_MIN_DELAY="10")
+
+    async def request(b):
+        if b.name == "a":
+            raise FakeHTTPError(503)
+        return "ok"
+
+    started = time.perf_counter()
+    winner, result = asyncio.run(client._race(request))
+
+    assert (winner.name, result) == ("b", "ok")
+    assert time.perf_counter() - started < 1.0
+    assert backend(client, "a").breaker.state == "open"
+    assert backend(client, "b").breaker.state == "closed"
+
+
+def test_client_error_does_not_trip_breaker(make_client):
+    client = make_client(LLM_HEDGE_DELAY="10", LLM_HEDGE_MIN_DELAY="10")
+
+    async def request(b):
+        if b.name == "a":
+            raise FakeHTTPError(400)
+        return "ok"
+
+    winner, _ = asyncio.run(client._race(request))
+
+    assert winner.name == "b"
+    assert backend(client, "a").breaker.state == "closed"
+    assert backend(client, "a").breaker.failures == 0
+    assert backend(client, "a").stats.outcomes == {"error": 1}
+
+
+def test_last_error_is_raised_when_every_attempt_fails(make_client):
+    client = make_client(LLM_HEDGE="false")
+
+    async def request(b):
+        raise FakeHTTPError(500)
+
+    with pytest.raises(FakeHTTPError):
+        asyncio.run(client._race(request))
+    assert [b.breaker.state for b in client.backends] == ["open", "open", "open"]
+
+
+def test_all_backends_open_raises_unavailable(make_client):
+    client = make_client()
+    for b in client.backends:
+        b.breaker.record_failure()
+    calls = []
+
+    async def request(b):
+        calls.append(b.name)
+        return "ok"
+
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(client._race(request))
+    assert calls == []
+
+
+def test_open_backend_is_skipped(make_client):
+    client = make_client()
+    backend(client, "a").breaker.record_failure()
+
+    async def request(b):
+        return b.name
+
+    winner, result = asyncio.run(client._race(request))
+    assert winner.name == result == "b"
+
+
+def test_losers_results_are_discarded(make_client):
+    client = make_client()
+    discarded = []
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        # Todos los intentos terminan en la misma iteración del event loop
+        finish_at = loop.time() + 0.2
+
+        async def request(b):
+            await asyncio.sleep(finish_at - loop.time())
+            return f"stream de {b.name}"
+
+        async def discard(result):
+            discarded.append(result)
+
+        return await client._race(request, discard=discard)
+
+    winner, result = asyncio.run(scenario())
+
+    # Intento principal y dos duplicados: se devuelve uno y se liberan los otros dos
+    assert result == f"stream de {winner.name}"
+    assert sorted(discarded + [result]) == ["stream de a", "stream de b", "stream de c"]
+
+
+def test_half_open_allows_a_single_probe(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=30)
+    now = [100.0]
+    monkeypatch.setattr("controllers.llm_routing.time.monotonic", lambda: now[0])
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] += 31
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # Una prueba cancelada libera el turno; una fallida reabre el circuito
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 31
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_hedges_respect_max_concurrency(make_client):
+    client = make_client(LLM_MAX_CONCURRENCY="2")
+    inflight, peak, calls = 0, 0, 0
+
+    class Completions:
+        async def create(self, model, **kwargs):
+            nonlocal inflight, peak, calls
+            calls += 1
+            inflight += 1
+            peak = max(peak, inflight)
+            try:
+                await asyncio.sleep(0.2)
+            finally:
+                inflight -= 1
+            message = SimpleNamespace(content=f"respuesta de {model}")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+
+    async def scenario():
+        single = await client.complete([{"role": "user", "content": "hola"}])
+        both = await asyncio.gather(*(client.complete([{"role": "user", "content": "hola"}]) for _ in range(2)))
+        return single, both
+
+    single, both = asyncio.run(scenario())
+
+    assert single and all(both)
+    # Sola, la primera llamada envía un duplicado (el segundo no cabe); las dos simultáneas
+    # ocupan los dos permisos y no envían ninguno
+    assert calls == 2 + 2
+    assert peak == 2
+
+    async def permits_released():
+        for _ in range(2):
+            await asyncio.wait_for(client._semaphore.acquire(), timeout=0.1)
+
+    asyncio.run(permits_released())
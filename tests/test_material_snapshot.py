@@ -0,0 +1,41 @@
+import marshal
+from models.material_snapshot import MaterialSnapshot
+from models.text_index import BM25Index, TextChunk, chunk_pages
+
+
+def test_round_trip_restores_index(tmp_path):
+    snapshot = MaterialSnapshot(path=str(tmp_path / "material.snapshot"))
+    chunks = chunk_pages(["1. Búsqueda\nLa búsqueda heurística usa una función h(n).", "2. Grafos\nUn grafo tiene nodos."])
+    index = BM25Index(chunks)
+    snapshot.save({
+        "source_hash": "s1",
+        "chunks": [[c.text, c.page, c.section, c.document] for c in chunks],
+        "index": index.to_state(),
+    })
+
+    data = snapshot.load("s1")
+    assert data is not None
+    restored = BM25Index.from_state([TextChunk(*c) for c in data["chunks"]], data["index"])
+    assert [(c.page, s) for c, s in restored.search("heurística")] == [(c.page, s) for c, s in index.search("heurística")]
+    assert restored.search("nodos")[0][0].section == "2. Grafos"
+
+
+def test_other_source_hash_or_format_is_ignored(tmp_path):
+    path = tmp_path / "material.snapshot"
+    snapshot = MaterialSnapshot(path=str(path))
+    snapshot.save({"source_hash": "s1", "content": "texto"})
+
+    assert snapshot.load("s2") is None
+
+    with open(path, "wb") as f:
+        marshal.dump({"source_hash": "s1", "content": "texto", "format": "0-py2.7"}, f)
+    assert snapshot.load("s1") is None
+
+
+def test_missing_or_corrupt_file_is_ignored(tmp_path):
+    path = tmp_path / "material.snapshot"
+    snapshot = MaterialSnapshot(path=str(path))
+    assert snapshot.load("s1") is None
+
+    path.write_bytes(b"no es marshal")
+    assert snapshot.load("s1") is None
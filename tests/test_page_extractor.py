@@ -0,0 +1,64 @@
+import concurrent.futures
+import pytest
+import models.page_extractor as page_extractor
+from models.page_extractor import PageExtractor, PageTextCache
+from tools.stub_services import build_pages_pdf
+
+PAGES = [(f"Pagina {number}", f"Contenido de la pagina {number}") for number in range(1, 21)]
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    # Registra los pools creados sin cambiar su comportamiento
+    created = []
+
+    class RecordingPool(concurrent.futures.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            created.append(kwargs)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(page_extractor, "ProcessPoolExecutor", RecordingPool)
+    return created
+
+
+def make_extractor(monkeypatch, tmp_path, workers: int, min_pages: int = 16) -> PageExtractor:
+    monkeypatch.setenv("PDF_EXTRACT_WORKERS", str(workers))
+    monkeypatch.setenv("PDF_EXTRACT_PARALLEL_MIN_PAGES", str(min_pages))
+    return PageExtractor(PageTextCache(str(tmp_path / "pages")))
+
+
+def test_large_pdf_is_extracted_in_process_pool(monkeypatch, tmp_path, pools):
+    extractor = make_extractor(monkeypatch, tmp_path, workers=3)
+    pages = extractor.extract(build_pages_pdf(PAGES))
+
+    assert len(pools) == 1
+    assert pools[0]["max_workers"] == 3
+    assert pools[0]["mp_context"].get_start_method() in ("forkserver", "spawn")
+    assert len(pages) == len(PAGES)
+    for text, lines in zip(pages, PAGES):
+        assert all(line in text for line in lines)
+
+
+def test_pooled_and_serial_extraction_match(monkeypatch, tmp_path, pools):
+    content = build_pages_pdf(PAGES)
+    pooled = make_extractor(monkeypatch, tmp_path / "pooled", workers=4).extract(content)
+    serial = make_extractor(monkeypatch, tmp_path / "serial", workers=1).extract(content)
+
+    assert len(pools) == 1
+    assert pooled == serial
+
+
+def test_small_pdf_is_extracted_in_process(monkeypatch, tmp_path, pools):
+    pages = make_extractor(monkeypatch, tmp_path, workers=4).extract(build_pages_pdf(PAGES[:3]))
+
+    assert pools == []
+    assert len(pages) == 3
+
+
+def test_unchanged_pdf_is_served_from_cache(monkeypatch, tmp_path, pools):
+    content = build_pages_pdf(PAGES)
+    first = make_extractor(monkeypatch, tmp_path, workers=3).extract(content)
+    second = make_extractor(monkeypatch, tmp_path, workers=3).extract(content)
+
+    assert len(pools) == 1
+    assert second == first
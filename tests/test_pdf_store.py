@@ -0,0 +1,98 @@
+import pytest
+import requests
+import models.pdf_store as pdf_store
+from models.pdf_store import PDFStore
+
+URL = "https://example.org/material.pdf"
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, content: bytes = b"", headers: dict | None = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+class FakeServer:
+    """Servidor con un único PDF que responde 304 si los validadores coinciden"""
+
+    def __init__(self, content: bytes, etag: str = '"v1"', last_modified: str = "Mon, 01 Sep 2025 10:00:00 GMT"):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.down = False
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append(headers)
+        if self.down:
+            raise requests.ConnectionError("sin conexión")
+        if headers.get("If-None-Match") == self.etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.content, {"ETag": self.etag, "Last-Modified": self.last_modified})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    fake = FakeServer(b"%PDF-1.4 v1")
+    monkeypatch.setattr(pdf_store.requests, "get", fake.get)
+    return fake
+
+
+def test_first_fetch_downloads_and_stores_validators(tmp_path, server):
+    store = PDFStore(root=str(tmp_path))
+
+    assert store.fetch(URL) == b"%PDF-1.4 v1"
+    assert server.requests == [{}]
+    assert store.get_cached(URL) == b"%PDF-1.4 v1"
+
+
+def test_revalidation_sends_validators_and_uses_cache_on_304(tmp_path, server):
+    statuses = []
+    PDFStore(root=str(tmp_path)).fetch(URL)
+    store = PDFStore(root=str(tmp_path))
+    store.on_fetch = lambda seconds, status: statuses.append(status)
+
+    assert store.fetch(URL) == b"%PDF-1.4 v1"
+    assert server.requests[-1] == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Sep 2025 10:00:00 GMT",
+    }
+    assert statuses == ["304"]
+
+
+def test_new_version_replaces_old_object(tmp_path, server):
+    store = PDFStore(root=str(tmp_path))
+    store.fetch(URL)
+    old_hash = store.current_hash(URL)
+
+    server.content, server.etag = b"%PDF-1.4 v2", '"v2"'
+    assert store.fetch(URL) == b"%PDF-1.4 v2"
+    assert store.current_hash(URL) != old_hash
+    assert not (tmp_path / "objects" / f"{old_hash}.pdf").exists()
+
+
+def test_network_error_falls_back_to_local_copy(tmp_path, server):
+    statuses = []
+    store = PDFStore(root=str(tmp_path))
+    store.fetch(URL)
+    store.on_fetch = lambda seconds, status: statuses.append(status)
+
+    server.down = True
+    assert store.fetch(URL) == b"%PDF-1.4 v1"
+    assert statuses == ["error"]
+
+
+def test_no_validators_without_local_copy(tmp_path, server):
+    store = PDFStore(root=str(tmp_path))
+    store.fetch(URL)
+    for path in (tmp_path / "objects").iterdir():
+        path.unlink()
+
+    assert store.fetch(URL) == b"%PDF-1.4 v1"
+    assert server.requests[-1] == {}
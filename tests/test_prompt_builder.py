@@ -0,0 +1,125 @@
+from controllers.prompt_builder import MATERIAL_HEADER, WEB_HEADER, PromptBuilder
+from models.pdf_handler import CourseMaterial
+from models.text_index import BM25Index, chunk_pages
+
+PAGES = [
+    "Unidad 1: Agentes inteligentes\nUn agente percibe su entorno y actúa sobre él.",
+    "Unidad 2: Búsqueda heurística\nA* combina el coste acumulado con una heurística admisible.",
+]
+FRAGMENTS = [f"[Sinóptico, pág. {i}] fragmento {i} " + "texto " * 40 for i in range(1, 4)]
+WEB = "Resultado web: " + "dato " * 60
+HISTORY = [
+    {"role": "system", "content": "Resumen: el estudiante preguntó por agentes."},
+    {"role": "user", "content": "¿Qué es un agente? " + "detalle " * 20},
+    {"role": "assistant", "content": "Un agente percibe y actúa. " + "detalle " * 20},
+    {"role": "user", "content": "¿Y un entorno? " + "detalle " * 20},
+    {"role": "assistant", "content": "El entorno es lo que rodea al agente. " + "detalle " * 20},
+]
+QUESTION = "¿Qué es una heurística admisible?"
+
+
+def make_material(content_hash: str = "hash-1", pages: list = PAGES) -> CourseMaterial:
+    chunks = chunk_pages(pages, document="Sinóptico")
+    return CourseMaterial(
+        content="\n".join(pages),
+        index=BM25Index(chunks),
+        content_hash=content_hash,
+        source_hash="source-" + content_hash,
+        page_count=len(pages),
+        documents=("sinoptico",),
+    )
+
+
+def make_builder(token_budget: int = 100000, stable_material: str = "outline") -> PromptBuilder:
+    return PromptBuilder(token_budget=token_budget, stable_material=stable_material, outline_tokens=600, rules="REGLAS", closing="FIN")
+
+
+def total_for(stable_material: str = "outline", **overrides) -> int:
+    args = {"fragments": FRAGMENTS, "web_snippets": WEB, "history": HISTORY, "question": QUESTION, **overrides}
+    return make_builder(stable_material=stable_material).build(make_material(), **args).total_tokens
+
+
+def test_prefix_is_byte_identical_for_same_material_hash():
+    first = make_builder().build(make_material(), FRAGMENTS, WEB, HISTORY, QUESTION)
+    second = make_builder().build(make_material(), FRAGMENTS[:1], "", [], "Otra pregunta distinta")
+
+    assert first.messages[0]["content"].encode("utf-8") == second.messages[0]["content"].encode("utf-8")
+    assert first.prefix_hash == second.prefix_hash
+    assert first.messages[1] != second.messages[1]
+
+    changed = make_builder().build(make_material("hash-2", PAGES + ["Unidad 3: Aprendizaje\nRegresión."]), [], "", [], QUESTION)
+    assert changed.prefix_hash != first.prefix_hash
+
+
+def test_nothing_dropped_within_budget():
+    prompt = make_builder().build(make_material(), FRAGMENTS, WEB, HISTORY, QUESTION)
+
+    assert prompt.dropped == {"web": 0, "history": 0, "material": 0}
+    assert prompt.total_tokens == sum(prompt.tokens.values())
+    assert len(prompt.messages) == 2 + len(HISTORY) + 1
+    assert prompt.messages[-1] == {"role": "user", "content": QUESTION}
+
+
+def test_web_is_dropped_first():
+    budget = total_for(web_snippets="")
+    prompt = make_builder(budget).build(make_material(), FRAGMENTS, WEB, HISTORY, QUESTION)
+
+    assert prompt.dropped == {"web": 1, "history": 0, "material": 0}
+    assert prompt.total_tokens <= budget
+    assert prompt.messages[1]["content"].endswith(f"{WEB_HEADER}\n")
+
+
+def test_history_is_dropped_before_material():
+    budget = total_for(web_snippets="", history=[])
+    prompt = make_builder(budget).build(make_material(), FRAGMENTS, WEB, HISTORY, QUESTION)
+
+    assert prompt.dropped == {"web": 1, "history": len(HISTORY), "material": 0}
+    assert prompt.total_tokens <= budget
+    assert all(fragment in prompt.messages[1]["content"] for fragment in FRAGMENTS)
+
+
+def test_least_relevant_fragments_are_dropped_last():
+    budget = total_for(web_snippets="", history=[], fragments=FRAGMENTS[:1])
+    prompt = make_builder(budget).build(make_material(), FRAGMENTS, WEB, HISTORY, QUESTION)
+
+    assert prompt.dropped == {"web": 1, "history": len(HISTORY), "material": len(FRAGMENTS) - 1}
+    assert FRAGMENTS[0] in prompt.messages[1]["content"]
+    assert FRAGMENTS[-1] not in prompt.messages[1]["content"]
+
+
+def test_summary_is_the_last_history_message_dropped():
+    budget = total_for(web_snippets="", history=HISTORY[:1])
+    prompt = make_builder(budget).build(make_material(), FRAGMENTS, WEB, HISTORY, QUESTION)
+
+    assert prompt.dropped == {"web": 1, "history": len(HISTORY) - 1, "material": 0}
+    assert prompt.messages[2] == HISTORY[0]
+    assert prompt.messages[3] == {"role": "user", "content": QUESTION}
+
+
+def test_outline_mode_sends_outline_and_fragments():
+    prompt = make_builder(stable_material="outline").build(make_material(), FRAGMENTS, WEB, [], QUESTION)
+    prefix, context = prompt.messages[0]["content"], prompt.messages[1]["content"]
+
+    assert "ESQUEMA DEL MATERIAL DEL CURSO" in prefix
+    assert "- Unidad 2: Búsqueda heurística (pág. 2)" in prefix
+    assert "A* combina" not in prefix
+    assert context.startswith(MATERIAL_HEADER)
+    assert FRAGMENTS[0] in context
+
+
+def test_full_mode_sends_whole_material_without_fragments():
+    prompt = make_builder(stable_material="full").build(make_material(), FRAGMENTS, WEB, [], QUESTION)
+    prefix, context = prompt.messages[0]["content"], prompt.messages[1]["content"]
+
+    assert "MATERIAL DEL CURSO:\n" + "\n".join(PAGES) in prefix
+    assert MATERIAL_HEADER not in context
+    assert FRAGMENTS[0] not in context
+    assert context.startswith(WEB_HEADER)
+    assert prompt.dropped["material"] == 0
+
+
+def test_output_is_deterministic():
+    first = make_builder(800).build(make_material(), FRAGMENTS, WEB, HISTORY, QUESTION)
+    second = make_builder(800).build(make_material(), FRAGMENTS, WEB, HISTORY, QUESTION)
+
+    assert first == second
@@ -0,0 +1,231 @@
+import asyncio
+import pytest
+import controllers.request_control as request_control
+from controllers.request_control import SingleFlight, TokenBucketLimiter
+from models.text_index import question_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(request_control.time, "monotonic", fake)
+    return fake
+
+
+# --- TokenBucketLimiter ---
+
+def test_burst_then_rejection_with_retry_after(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=6, burst=3)
+
+    assert [limiter.acquire(1)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after, notify = limiter.acquire(1)
+    assert not allowed
+    assert retry_after == pytest.approx(10.0)
+    assert notify
+
+
+def test_refill_follows_rate_and_caps_at_burst(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=6, burst=2)
+    limiter.acquire(1)
+    limiter.acquire(1)
+
+    clock.now += 5
+    allowed, retry_after, _ = limiter.acquire(1)
+    assert not allowed
+    assert retry_after == pytest.approx(5.0)
+
+    clock.now += 5
+    assert limiter.acquire(1)[0]
+
+    # Tras mucho tiempo inactivo no se acumulan más de `burst` tokens
+    clock.now += 3600
+    assert [limiter.acquire(1)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_notify_only_on_first_rejection_until_allowed_again(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=6, burst=1)
+    limiter.acquire(1)
+
+    notifications = [limiter.acquire(1)[2] for _ in range(3)]
+    assert notifications == [True, False, False]
+
+    clock.now += 10
+    assert limiter.acquire(1)[0]
+    assert limiter.acquire(1)[2]
+
+
+def test_chats_have_independent_buckets(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=6, burst=1)
+
+    assert limiter.acquire(1)[0]
+    assert limiter.acquire(2)[0]
+    assert not limiter.acquire(1)[0]
+
+
+def test_buckets_are_bounded_lru(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=6, burst=1, max_chats=2)
+    limiter.acquire(1)
+    limiter.acquire(2)
+    limiter.acquire(1)  # el chat 1 pasa a ser el más reciente
+    limiter.acquire(3)
+
+    assert len(limiter) == 2
+    # El chat 1 sigue limitado; el 2 se olvidó y vuelve con la cubeta llena
+    assert not limiter.acquire(1)[0]
+    assert limiter.acquire(2)[0]
+
+
+def test_disabled_limiter_allows_everything(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=0, burst=1)
+
+    assert all(limiter.acquire(1) == (True, 0.0, False) for _ in range(100))
+    assert len(limiter) == 0
+
+
+# --- SingleFlight ---
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "respuesta"
+
+        results = await asyncio.gather(*(flight.run("k", work) for _ in range(5)))
+        return calls, results, len(flight)
+
+    calls, results, inflight = asyncio.run(scenario())
+    assert calls == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result == "respuesta" for result, _ in results)
+    assert inflight == 0
+
+
+def test_questions_with_different_interrogatives_are_not_coalesced():
+    # Misma clave que usa BotController.handle_text_message
+    questions = ["¿Cuándo es el corte II?", "¿Dónde es el corte II?", "cuando es el CORTE ii"]
+
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        def work(question):
+            async def run():
+                calls.append(question)
+                await asyncio.sleep(0.05)
+                return question
+            return run
+
+        results = await asyncio.gather(*(
+            flight.run((question_key(question), "h1"), work(question)) for question in questions
+        ))
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == questions[:2]
+    assert results == [
+        ("¿Cuándo es el corte II?", False),
+        ("¿Dónde es el corte II?", False),
+        ("¿Cuándo es el corte II?", True),
+    ]
+
+
+def test_none_key_and_full_table_run_without_sharing():
+    async def scenario():
+        flight = SingleFlight(max_keys=1)
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+
+        results = await asyncio.gather(
+            flight.run(None, work), flight.run(None, work), flight.run("a", work), flight.run("b", work),
+        )
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 4
+    assert not any(shared for _, shared in results)
+
+
+def test_followers_retry_when_leader_raises():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            if calls == 1:
+                raise ValueError("fallo del líder")
+            return "respuesta"
+
+        return await asyncio.gather(*(flight.run("k", work) for _ in range(3)), return_exceptions=True), calls
+
+    results, calls = asyncio.run(scenario())
+    assert isinstance(results[0], ValueError)
+    assert results[1:] == [("respuesta", False), ("respuesta", False)]
+    assert calls == 3
+
+
+def test_followers_retry_when_leader_is_cancelled():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "respuesta"
+
+        leader = asyncio.create_task(flight.run("k", work))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.run("k", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results, calls, len(flight)
+
+    results, calls, inflight = asyncio.run(scenario())
+    assert results == [("respuesta", False), ("respuesta", False)]
+    assert calls == 3
+    assert inflight == 0
+
+
+def test_cancelled_follower_does_not_cancel_leader():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "respuesta"
+
+        leader = asyncio.create_task(flight.run("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.run("k", work))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader, follower
+
+    result, follower = asyncio.run(scenario())
+    assert result == ("respuesta", False)
+    assert follower.cancelled()
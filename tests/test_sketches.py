@@ -0,0 +1,56 @@
+import random
+import pytest
+from tools.sketches import CountMinSketch, HeavyHitters, HyperLogLog, LatencyHistogram
+
+
+@pytest.mark.parametrize("distinct", [0, 10, 1000, 50000])
+def test_hyperloglog_error_within_bound(distinct):
+    hll = HyperLogLog(p=14)
+    for i in range(distinct):
+        # Cada elemento aparece dos veces: los repetidos no cuentan
+        hll.add(f"user-{i}")
+        hll.add(f"user-{i}")
+
+    # Error estándar 1.04 / sqrt(2^14) ~ 0.8 %; se admite ~4 veces ese error
+    assert hll.count() == pytest.approx(distinct, rel=0.03, abs=1)
+
+
+def test_count_min_never_underestimates_and_error_is_bounded():
+    rng = random.Random(7)
+    width, total = 512, 20000
+    sketch = CountMinSketch(width=width, depth=4)
+    counts = {}
+    for _ in range(total):
+        value = f"pregunta {int(rng.paretovariate(1.2))}"
+        counts[value] = counts.get(value, 0) + 1
+        sketch.add(value)
+
+    errors = [sketch.estimate(value) - true for value, true in counts.items()]
+    assert min(errors) >= 0
+    # Cota de Count-Min: error <= e * N / width con probabilidad 1 - e^-depth (~98 %)
+    bound = 2.72 * total / width
+    assert sum(1 for error in errors if error <= bound) >= 0.95 * len(errors)
+
+
+def test_heavy_hitters_find_the_most_frequent():
+    rng = random.Random(3)
+    hitters = HeavyHitters(capacity=20)
+    stream = [f"frecuente {i}" for i in range(5) for _ in range(200 - 30 * i)]
+    stream += [f"rara {rng.randrange(5000)}" for _ in range(3000)]
+    rng.shuffle(stream)
+    for value in stream:
+        hitters.add(value)
+
+    top = hitters.top(5)
+    assert [value for value, _ in top] == [f"frecuente {i}" for i in range(5)]
+    assert all(count >= 200 - 30 * i for i, (_, count) in enumerate(top))
+
+
+def test_latency_histogram_percentiles_within_bucket_error():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(0.5) is None
+    for value in range(1, 1001):
+        histogram.add(float(value))
+
+    assert histogram.percentile(0.5) == pytest.approx(500, rel=0.03)
+    assert histogram.percentile(0.95) == pytest.approx(950, rel=0.03)
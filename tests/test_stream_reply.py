@@ -0,0 +1,98 @@
+import asyncio
+from telegram.error import RetryAfter
+from controllers.stream_reply import TELEGRAM_MESSAGE_LIMIT, StreamingReply, split_message
+
+
+class FakeMessage:
+    """Mensaje de Telegram: reply_text crea un mensaje nuevo y edit_text lo reemplaza"""
+
+    def __init__(self, chat: list, retry_after: int = 0):
+        self.chat = chat
+        self.text = None
+        self.retry_after = retry_after
+
+    async def reply_text(self, text: str) -> "FakeMessage":
+        if self.retry_after:
+            self.retry_after -= 1
+            raise RetryAfter(0)
+        message = FakeMessage(self.chat)
+        message.text = text
+        self.chat.append(message)
+        return message
+
+    async def edit_text(self, text: str) -> None:
+        self.text = text
+
+
+# --- split_message ---
+
+def test_short_text_is_one_part():
+    assert split_message("hola") == ["hola"]
+    assert split_message("") == [""]
+    assert split_message("x" * TELEGRAM_MESSAGE_LIMIT) == ["x" * TELEGRAM_MESSAGE_LIMIT]
+
+
+def test_long_text_splits_at_limit_without_cutting_words():
+    words = " ".join(f"palabra{i}" for i in range(1000))
+    parts = split_message(words)
+
+    assert len(parts) > 1
+    assert all(len(part) <= TELEGRAM_MESSAGE_LIMIT for part in parts)
+    assert " ".join(parts) == words
+
+
+def test_prefers_paragraph_and_line_breaks():
+    first = "a" * 3000
+    second = "b " * 1000
+    parts = split_message(f"{first}\n\n{second}")
+    assert parts[0] == first
+
+    lines = "\n".join("línea " + "c" * 50 for _ in range(100))
+    assert all(part.endswith("c" * 50) for part in split_message(lines))
+
+
+def test_text_without_separators_is_cut_at_limit():
+    parts = split_message("x" * (TELEGRAM_MESSAGE_LIMIT + 10))
+    assert [len(part) for part in parts] == [TELEGRAM_MESSAGE_LIMIT, 10]
+
+
+# --- StreamingReply ---
+
+def test_final_flush_shows_complete_text():
+    chat = []
+
+    async def scenario():
+        # Con un intervalo largo solo se envía el primer fragmento; el resto llega al terminar
+        reply = StreamingReply(FakeMessage(chat), edit_interval=60)
+        for delta in ("Una ", "heurística ", "admisible."):
+            await reply.push(delta)
+        assert [m.text for m in chat] == ["Una "]
+        return await reply.finish()
+
+    assert asyncio.run(scenario()) == "Una heurística admisible."
+    assert [m.text for m in chat] == ["Una heurística admisible."]
+
+
+def test_long_stream_continues_in_new_messages():
+    chat = []
+    text = " ".join(f"palabra{i}" for i in range(1000))
+
+    async def scenario():
+        reply = StreamingReply(FakeMessage(chat), edit_interval=0)
+        for i in range(0, len(text), 100):
+            await reply.push(text[i:i + 100])
+        return await reply.finish()
+
+    assert asyncio.run(scenario()) == text
+    assert [m.text for m in chat] == split_message(text)
+
+
+def test_empty_stream_sends_placeholder_and_finish_retries():
+    chat = []
+
+    async def scenario():
+        reply = StreamingReply(FakeMessage(chat, retry_after=1), edit_interval=0)
+        return await reply.finish()
+
+    assert asyncio.run(scenario()) == ""
+    assert [m.text for m in chat] == ["…"]
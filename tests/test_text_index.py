@@ -0,0 +1,74 @@
+import pytest
+from models.text_index import BM25Index, chunk_pages, normalize_query, tokenize
+
+
+def test_tokenize_normalizes_and_drops_stopwords():
+    assert tokenize("¿Qué son las Redes Neuronales?") == ["red", "neuronal"]
+    assert tokenize("Año de diseño") == ["año", "diseño"]
+    # "no" y "sin" cambian el sentido de la pregunta
+    assert "no" in tokenize("¿Por qué no converge?")
+
+
+def test_normalize_query_ignores_order_and_repetition():
+    assert normalize_query("redes neuronales y redes") == normalize_query("Neuronales redes")
+
+
+def test_chunks_follow_sections_and_pages():
+    pages = [
+        "UNIDAD 1 INTRODUCCIÓN\nTexto de la introducción.\n1.1 Agentes\nUn agente percibe su entorno.",
+        "Sigue la sección de agentes.\n2. Búsqueda\nLa búsqueda explora estados.",
+    ]
+    chunks = chunk_pages(pages, document="Apuntes")
+
+    assert [(c.page, c.section) for c in chunks] == [
+        (1, "UNIDAD 1 INTRODUCCIÓN"),
+        (1, "1.1 Agentes"),
+        (2, "1.1 Agentes"),
+        (2, "2. Búsqueda"),
+    ]
+    assert all(c.document == "Apuntes" for c in chunks)
+
+
+def test_long_sections_are_split_by_size():
+    page = "1. Tema\n" + "\n".join("línea de texto número %d" % i for i in range(200))
+    chunks = chunk_pages([page], max_chars=300)
+
+    assert len(chunks) > 1
+    assert all(len(c.text) <= 300 + 40 for c in chunks)
+    assert all(c.section == "1. Tema" for c in chunks)
+
+
+@pytest.fixture
+def index():
+    pages = [
+        "1. Búsqueda\nLa búsqueda heurística usa una función heurística admisible.",
+        "2. Grafos\nUn grafo tiene nodos y aristas.",
+        "3. Redes neuronales\nLas redes neuronales aprenden pesos con descenso de gradiente.",
+    ]
+    return BM25Index(chunk_pages(pages))
+
+
+def test_bm25_ranks_matching_chunk_first(index):
+    results = index.search("¿Qué es una heurística admisible?")
+    assert results[0][0].section == "1. Búsqueda"
+    assert index.search("red neuronal")[0][0].section == "3. Redes neuronales"
+    assert index.search("termodinámica") == []
+
+
+def test_bm25_scores_are_sorted_and_limited(index):
+    results = index.search("búsqueda grafo redes", k=2)
+    assert len(results) == 2
+    assert results[0][1] >= results[1][1] > 0
+
+
+def test_relevance_is_normalized(index):
+    chunk, score = index.search("heurística admisible")[0]
+    assert 0.0 < index.relevance("heurística admisible", score) <= 1.0
+    # Términos que no aparecen en el material bajan la relevancia
+    assert index.relevance("heurística admisible termodinámica", score) < index.relevance("heurística admisible", score)
+    assert index.relevance("", score) == 0.0
+
+
+def test_state_round_trip(index):
+    restored = BM25Index.from_state(index.chunks, index.to_state())
+    assert restored.search("grafo nodos") == index.search("grafo nodos")
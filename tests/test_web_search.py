@@ -0,0 +1,65 @@
+import asyncio
+import httpx
+from controllers.metrics import STAGE_DURATION
+from controllers.web_search import WebSearch
+
+RESPONSE = {"AbstractText": "A* es un algoritmo de búsqueda informada.", "RelatedTopics": []}
+
+
+def observations() -> int:
+    return STAGE_DURATION.count(stage="web_search")
+
+
+def make_search(handler) -> WebSearch:
+    return WebSearch(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def test_completed_and_failed_searches_are_timed():
+    async def ok(request):
+        return httpx.Response(200, json=RESPONSE)
+
+    async def failing(request):
+        return httpx.Response(500)
+
+    before = observations()
+    snippets, path = asyncio.run(make_search(ok).search("¿Qué es A*?"))
+    assert path == "network"
+    assert "A* es un algoritmo" in snippets
+    assert asyncio.run(make_search(failing).search("¿Qué es A*?")) == ("", "unavailable")
+    assert observations() == before + 2
+
+
+def test_cached_search_is_not_timed():
+    async def ok(request):
+        return httpx.Response(200, json=RESPONSE)
+
+    async def scenario():
+        search = make_search(ok)
+        await search.search("¿Qué es la búsqueda heurística?")
+        before = observations()
+        result = await search.search("busqueda heuristica")
+        return result, observations() - before
+
+    (_, path), timed = asyncio.run(scenario())
+    assert path == "cache"
+    assert timed == 0
+
+
+def test_cancelled_search_is_not_timed():
+    async def slow(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, json=RESPONSE)
+
+    async def scenario():
+        search = make_search(slow)
+        before = observations()
+        task = asyncio.create_task(search.search("¿Qué es A*?"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return observations() - before
+
+    assert asyncio.run(scenario()) == 0
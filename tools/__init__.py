@@ -0,0 +1,3 @@
+"""
+Herramientas de línea de comandos (analítica y mantenimiento)
+"""
@@ -0,0 +1,218 @@
+"""
+Informe de uso a partir de los registros JSONL de AnalyticsLogger.
+
+Recorre en una sola pasada y con memoria acotada el archivo actual y los
+segmentos rotados (.gz). Ejemplos:
+
+    python -m tools.analytics_report
+    python -m tools.analytics_report logs/ --top 30 --json
+"""
+import os
+import sys
+import glob
+import gzip
+import json
+import argparse
+from dotenv import load_dotenv
+from models.text_index import normalize_query
+from tools.sketches import HeavyHitters, HyperLogLog, LatencyHistogram
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def resolve_log_files(paths: list) -> list:
+    """
+    Expande archivos y directorios a la lista de registros (rotados primero, luego el actual)
+
+    Args:
+        paths: Archivos o directorios; vacío = LOG_FILE_PATH y sus segmentos rotados
+
+    Returns:
+        list[str]: Rutas en orden cronológico (los nombres de los segmentos se ordenan por fecha)
+    """
+    if not paths:
+        base = os.getenv("LOG_FILE_PATH", "logs/interactions.log")
+        return sorted(glob.glob(base + ".*.gz")) + ([base] if os.path.exists(base) else [])
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = glob.glob(os.path.join(path, "*.log")) + glob.glob(os.path.join(path, "*.log.*.gz"))
+            rotated = sorted(f for f in found if f.endswith(".gz"))
+            current = sorted(f for f in found if not f.endswith(".gz"))
+            files.extend(rotated + current)
+        else:
+            files.append(path)
+    return files
+
+
+def iter_log_entries(files: list, stats: dict | None = None):
+    """
+    Recorre las entradas de los registros sin cargarlos en memoria
+
+    Yields:
+        dict: Cada entrada JSON válida
+    """
+    for path in files:
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        if stats is not None:
+                            stats["malformed"] = stats.get("malformed", 0) + 1
+                        continue
+                    if isinstance(entry, dict):
+                        yield entry
+        except OSError as e:
+            print(f"⚠️ No se pudo leer {path}: {e}", file=sys.stderr)
+
+
+class UsageReport:
+    """Acumula las métricas de uso entrada a entrada"""
+
+    def __init__(self, top_capacity: int = 500):
+        self.total = 0
+        self.per_day = {}
+        self.per_hour = {}
+        self.hour_of_day = [0] * 24
+        self.users = HyperLogLog()
+        self.questions = HeavyHitters(capacity=top_capacity)
+        self.latencies = {}
+        self.web_paths = {}
+        self.sources = {}
+        self.first = None
+        self.last = None
+
+    def add(self, entry: dict) -> None:
+        self.total += 1
+        timestamp = entry.get("timestamp") or ""
+        if len(timestamp) >= 13:
+            day, hour = timestamp[:10], timestamp[:13]
+            self.per_day[day] = self.per_day.get(day, 0) + 1
+            self.per_hour[hour] = self.per_hour.get(hour, 0) + 1
+            try:
+                self.hour_of_day[int(timestamp[11:13])] += 1
+            except ValueError:
+                pass
+            self.first = timestamp if self.first is None or timestamp < self.first else self.first
+            self.last = timestamp if self.last is None or timestamp > self.last else self.last
+
+        user_id = entry.get("user_id")
+        if user_id:
+            self.users.add(str(user_id))
+
+        question = entry.get("question")
+        if isinstance(question, str):
+            normalized = normalize_query(question)
+            if normalized:
+                self.questions.add(normalized)
+
+        web = entry.get("used_web")
+        web_key = "none" if web is None else str(web).lower()
+        self.web_paths[web_key] = self.web_paths.get(web_key, 0) + 1
+        source = entry.get("source") or "unknown"
+        self.sources[source] = self.sources.get(source, 0) + 1
+
+        latencies = entry.get("latency_ms")
+        if isinstance(latencies, dict):
+            for stage, value in latencies.items():
+                if isinstance(value, (int, float)):
+                    self.latencies.setdefault(stage, LatencyHistogram()).add(float(value))
+
+    def web_ratio(self) -> float | None:
+        # Entradas en las que se usó la web (caché o red) frente a las que registran el camino
+        used = sum(v for k, v in self.web_paths.items() if k in ("cache", "network", "true"))
+        known = sum(v for k, v in self.web_paths.items() if k != "none")
+        return round(used / known, 4) if known else None
+
+    def to_dict(self, top: int) -> dict:
+        return {
+            "total_questions": self.total,
+            "first_timestamp": self.first,
+            "last_timestamp": self.last,
+            "distinct_users_approx": self.users.count() if self.total else 0,
+            "per_day": dict(sorted(self.per_day.items())),
+            "per_hour": dict(sorted(self.per_hour.items())),
+            "hour_of_day_utc": self.hour_of_day,
+            "sources": self.sources,
+            "web_paths": self.web_paths,
+            "web_usage_ratio": self.web_ratio(),
+            "latency_ms_percentiles": {
+                stage: {f"p{int(q * 100)}": hist.percentile(q) for q in PERCENTILES} | {"count": hist.count}
+                for stage, hist in sorted(self.latencies.items())
+            },
+            "top_questions_approx": [
+                {"question": question, "count": count} for question, count in self.questions.top(top)
+            ],
+        }
+
+
+def print_report(data: dict) -> None:
+    print(f"📊 Preguntas: {data['total_questions']}  ({data['first_timestamp']} → {data['last_timestamp']})")
+    print(f"👥 Usuarios distintos (aprox.): {data['distinct_users_approx']}")
+    ratio = data["web_usage_ratio"]
+    print(f"🌐 Uso de búsqueda web: {'n/d' if ratio is None else f'{ratio:.1%}'}  {data['web_paths']}")
+    print(f"🗂️ Origen de las respuestas: {data['sources']}")
+
+    print("\n📅 Preguntas por día:")
+    for day, count in data["per_day"].items():
+        print(f"  {day}  {count}")
+
+    print("\n🕐 Preguntas por hora del día (UTC):")
+    for hour, count in enumerate(data["hour_of_day_utc"]):
+        if count:
+            print(f"  {hour:02d}:00  {count}")
+
+    busiest = sorted(data["per_hour"].items(), key=lambda item: -item[1])[:10]
+    if busiest:
+        print("\n🔥 Horas con más preguntas:")
+        for hour, count in busiest:
+            print(f"  {hour}:00  {count}")
+
+    if data["latency_ms_percentiles"]:
+        print("\n⏱️ Latencia por etapa (ms):")
+        for stage, values in data["latency_ms_percentiles"].items():
+            cols = "  ".join(f"{k}={v}" for k, v in values.items())
+            print(f"  {stage:<16} {cols}")
+
+    print("\n❓ Preguntas más frecuentes (normalizadas, aprox.):")
+    for item in data["top_questions_approx"]:
+        print(f"  {item['count']:>6}  {item['question']}")
+
+
+def main(argv: list | None = None) -> int:
+    # Cargar variables de entorno
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Informe de uso a partir de los registros de interacciones")
+    parser.add_argument("paths", nargs="*", help="Archivos .log/.gz o directorios (por defecto LOG_FILE_PATH)")
+    parser.add_argument("--top", type=int, default=20, help="Número de preguntas frecuentes a mostrar")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    files = resolve_log_files(args.paths)
+    if not files:
+        print("❌ No se encontraron registros de interacciones", file=sys.stderr)
+        return 1
+
+    read_stats = {}
+    report = UsageReport(top_capacity=max(args.top * 10, 200))
+    for entry in iter_log_entries(files, read_stats):
+        report.add(entry)
+
+    data = report.to_dict(args.top)
+    data["files"] = files
+    data["malformed_lines"] = read_stats.get("malformed", 0)
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        print_report(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
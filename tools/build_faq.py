@@ -0,0 +1,194 @@
+"""
+Genera la FAQ precalculada del material actual: una respuesta por cada tema del
+material (títulos de sección) y por cada pregunta frecuente de los registros.
+
+Las respuestas se generan por lotes con concurrencia acotada, con el mismo
+prompt y el mismo LLM que usa el bot, y se guardan en FAQ_DIR con el hash del
+material: si los PDFs cambian, el bot deja de servirlas hasta regenerarlas.
+El bot recoge el archivo nuevo al arrancar o en la siguiente revalidación del
+material (PDF_REFRESH_SECONDS). Ejemplos:
+
+    python -m tools.build_faq
+    python -m tools.build_faq logs/ --topics 30 --questions 50 --min-count 3
+    python -m tools.build_faq --course calculo --concurrency 2
+"""
+import re
+import sys
+import time
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from controllers.bot_controller import BotController
+from models.course_registry import DEFAULT_COURSE_ID, load_courses
+from models.text_index import question_key, tokenize
+from tools.analytics_report import iter_log_entries, resolve_log_files
+from tools.sketches import HeavyHitters
+
+# "Unidad 2:", "Tema III -", "3.1." ... delante del nombre del tema
+_HEADING_PREFIX_RE = re.compile(
+    r"^\s*(?:(?:unidad|tema|cap[ií]tulo|m[oó]dulo)\s*[\divxlc]*|\d+(?:\.\d+)*)\s*[.):\-–]*\s*", re.IGNORECASE,
+)
+
+# Títulos de sección que no son temas del curso
+GENERIC_HEADINGS = {
+    question_key(word) for word in (
+        "objetivos", "contenido", "contenidos", "introducción", "bibliografía", "referencias",
+        "evaluación", "índice", "unidad", "tema", "conclusiones", "resumen",
+    )
+}
+
+
+def extract_topics(chunks: list, limit: int) -> list:
+    """
+    Temas del material a partir de los títulos de sección, en orden de aparición
+
+    Args:
+        chunks: Fragmentos del índice del material
+        limit: Número máximo de temas
+
+    Returns:
+        list[str]: Nombres de los temas
+    """
+    topics, seen = [], set()
+    for chunk in chunks:
+        topic = _HEADING_PREFIX_RE.sub("", chunk.section).strip(" .:-–") or chunk.section.strip()
+        if topic.isupper():
+            topic = topic.capitalize()
+        key = question_key(topic)
+        if not key or key in seen or key in GENERIC_HEADINGS:
+            continue
+        seen.add(key)
+        topics.append(topic)
+        if len(topics) >= limit:
+            break
+    return topics
+
+
+def frequent_questions(files: list, limit: int, min_count: int, course_id: str) -> list:
+    """
+    Preguntas más frecuentes del curso en los registros (por `question_key`, aprox.)
+
+    Returns:
+        list[tuple[str, int]]: (pregunta tal como la escribió un estudiante, frecuencia)
+    """
+    counter = HeavyHitters(capacity=max(limit * 10, 200))
+    examples = {}
+    for entry in iter_log_entries(files):
+        if (entry.get("course") or DEFAULT_COURSE_ID) != course_id:
+            continue
+        question = entry.get("question")
+        if not isinstance(question, str) or str(entry.get("answer", "")).startswith("❌"):
+            continue
+        # Un solo término de contenido ("hola", "gracias") no es una pregunta del temario
+        if len(set(tokenize(question))) < 2:
+            continue
+        key = question_key(question)
+        counter.add(key)
+        if key in counter.candidates:
+            examples.setdefault(key, question.strip())
+        if len(examples) > 2 * counter.capacity:
+            examples = {key: value for key, value in examples.items() if key in counter.candidates}
+    return [
+        (examples[key], count)
+        for key, count in counter.top(limit)
+        if count >= min_count and key in examples
+    ]
+
+
+async def generate_answers(controller: BotController, items: list, concurrency: int) -> list:
+    """
+    Genera las respuestas con como mucho `concurrency` llamadas al LLM a la vez
+
+    Args:
+        controller: Bot del curso con el material cargado
+        items: Entradas sin respuesta ({"question", "aliases", "kind", "count"})
+        concurrency: Llamadas simultáneas
+
+    Returns:
+        list[dict]: Entradas con respuesta (las que fallaron se omiten)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    done = 0
+
+    async def answer(item: dict):
+        nonlocal done
+        async with semaphore:
+            trace = {"latency_ms": {}}
+            respuesta = await controller.generate_response(item["question"], [], trace)
+        done += 1
+        if trace.get("error"):
+            print(f"⚠️ [{done}/{len(items)}] Sin respuesta: {item['question']}", file=sys.stderr)
+            return None
+        print(f"✅ [{done}/{len(items)}] {item['question']}", file=sys.stderr)
+        return {**item, "answer": respuesta}
+
+    results = await asyncio.gather(*(answer(item) for item in items))
+    return [result for result in results if result]
+
+
+async def build(args) -> int:
+    courses = load_courses()
+    course = next((c for c in courses if c.course_id == args.course), None) if args.course else courses[0]
+    if course is None:
+        print(f"❌ No existe el curso '{args.course}'", file=sys.stderr)
+        return 1
+
+    controller = BotController(course)
+    try:
+        if not await asyncio.to_thread(controller.initialize_pdf):
+            print("❌ No se pudo cargar el material del curso", file=sys.stderr)
+            return 1
+        material = controller.pdf_handler.material
+
+        items, seen = [], set()
+        files = resolve_log_files(args.paths)
+        for question, count in frequent_questions(files, args.questions, args.min_count, course.course_id):
+            seen.add(question_key(question))
+            items.append({"question": question, "aliases": [], "kind": "log", "count": count})
+        for topic in extract_topics(material.index.chunks, args.topics):
+            # Solo formulaciones completas: el nombre del tema a secas no se usa como alias
+            question = f"Explícame el tema: {topic}"
+            aliases = [f"¿Qué es {topic}?", f"Explícame {topic}"]
+            keys = {question_key(text) for text in [question] + aliases}
+            if keys & seen:
+                continue
+            seen.update(keys)
+            items.append({"question": question, "aliases": aliases, "kind": "topic", "count": 0})
+        if not items:
+            print("❌ No se encontraron temas ni preguntas frecuentes", file=sys.stderr)
+            return 1
+
+        print(f"📝 Generando {len(items)} respuestas (concurrencia {args.concurrency})...", file=sys.stderr)
+        started = time.perf_counter()
+        entries = await generate_answers(controller, items, args.concurrency)
+        if not entries:
+            print("❌ No se generó ninguna respuesta", file=sys.stderr)
+            return 1
+        path = controller.faq_store.save(material.content_hash, entries, {
+            "course": course.course_id,
+            "log_files": files,
+            "requested": len(items),
+            "duration_s": round(time.perf_counter() - started, 1),
+        })
+        print(f"💾 FAQ guardada en {path}: {len(entries)} de {len(items)} respuestas")
+        return 0
+    finally:
+        await controller.aclose()
+
+
+def main(argv: list | None = None) -> int:
+    # Cargar variables de entorno
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Genera la FAQ precalculada del material actual")
+    parser.add_argument("paths", nargs="*", help="Archivos .log/.gz o directorios (por defecto LOG_FILE_PATH)")
+    parser.add_argument("--course", help="Curso de COURSES_CONFIG (por defecto el primero)")
+    parser.add_argument("--topics", type=int, default=30, help="Número máximo de temas del material")
+    parser.add_argument("--questions", type=int, default=50, help="Número máximo de preguntas frecuentes")
+    parser.add_argument("--min-count", type=int, default=3, help="Frecuencia mínima de una pregunta de los registros")
+    parser.add_argument("--concurrency", type=int, default=4, help="Llamadas simultáneas al LLM")
+    args = parser.parse_args(argv)
+    return asyncio.run(build(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
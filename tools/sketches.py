@@ -0,0 +1,107 @@
+import math
+import hashlib
+import heapq
+
+
+def _hash64(value: str, seed: int = 0) -> int:
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8, salt=seed.to_bytes(8, "little")).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HyperLogLog:
+    """Conteo aproximado de elementos distintos con memoria fija (2^p registros)"""
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, value: str) -> None:
+        h = _hash64(value)
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        estimate = self.alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Corrección para cardinalidades pequeñas (linear counting)
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class CountMinSketch:
+    """Frecuencias aproximadas (nunca por debajo del valor real) con memoria fija"""
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.tables = [[0] * width for _ in range(depth)]
+
+    def add(self, value: str, count: int = 1) -> int:
+        estimate = None
+        for row in range(self.depth):
+            column = _hash64(value, row) % self.width
+            self.tables[row][column] += count
+            cell = self.tables[row][column]
+            estimate = cell if estimate is None else min(estimate, cell)
+        return estimate
+
+    def estimate(self, value: str) -> int:
+        return min(self.tables[row][_hash64(value, row) % self.width] for row in range(self.depth))
+
+
+class HeavyHitters:
+    """Elementos más frecuentes: Count-Min Sketch más un conjunto acotado de candidatos"""
+
+    def __init__(self, capacity: int = 200, width: int = 4096, depth: int = 4):
+        self.capacity = capacity
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates = {}
+        self._floor = 0  # cota inferior del menor candidato (se recalcula solo al desalojar)
+
+    def add(self, value: str) -> None:
+        estimate = self.sketch.add(value)
+        if value in self.candidates or len(self.candidates) < self.capacity:
+            self.candidates[value] = estimate
+            return
+        if estimate <= self._floor:
+            return
+        smallest = min(self.candidates, key=self.candidates.get)
+        self._floor = self.candidates[smallest]
+        if estimate > self._floor:
+            del self.candidates[smallest]
+            self.candidates[value] = estimate
+
+    def top(self, n: int) -> list:
+        return heapq.nlargest(n, self.candidates.items(), key=lambda item: item[1])
+
+
+class LatencyHistogram:
+    """Histograma logarítmico de latencias (error relativo ~2.5 %) para percentiles"""
+
+    def __init__(self, growth: float = 1.05):
+        self.log_growth = math.log(growth)
+        self.growth = growth
+        self.buckets = {}
+        self.count = 0
+
+    def add(self, value_ms: float) -> None:
+        bucket = int(math.log(max(value_ms, 0.1) / 0.1) / self.log_growth)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+
+    def percentile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return round(0.1 * self.growth ** (bucket + 0.5), 1)
+        return None
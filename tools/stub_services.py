@@ -0,0 +1,252 @@
+"""
+Servicios locales que sustituyen a las APIs externas para pruebas sin red:
+
+- API de bots de Telegram (`/bot<token>/<método>`): registra cada llamada y
+  responde con objetos mínimos válidos para python-telegram-bot.
+- API de chat compatible con OpenAI/OpenRouter (`/v1/chat/completions`): responde
+  con un eco de la última pregunta, con latencia configurable y soporte de streaming.
+- Búsqueda web (`/search`): respuesta vacía con el formato de DuckDuckGo.
+- PDFs del curso (`/material.pdf` y las plantillas `/corte_i.pdf`, `/corte_ii.pdf`,
+  `/corte_iii.pdf`): documentos de una página generados al vuelo.
+"""
+import sys
+import json
+import time
+import threading
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_MATERIAL_LINES = (
+    "Sinoptico del curso de Inteligencia Artificial",
+    "Unidad 1: Agentes inteligentes y entornos",
+    "Unidad 2: Busqueda no informada y busqueda heuristica",
+    "Unidad 3: Aprendizaje supervisado y no supervisado",
+    "Evaluacion: tres cortes con plantillas de medicion",
+)
+
+TEMPLATE_LINES = {
+    "corte_i": ("Plantilla de medicion de Corte I", "Criterio 1: definicion de agente (40%)", "Criterio 2: ejemplos de entornos (60%)"),
+    "corte_ii": ("Plantilla de medicion de Corte II", "Criterio 1: algoritmo A* (50%)", "Criterio 2: heuristicas admisibles (50%)"),
+    "corte_iii": ("Plantilla de medicion de Corte III", "Criterio 1: regresion lineal (30%)", "Criterio 2: clustering k-means (70%)"),
+}
+
+
+def build_text_pdf(lines: tuple = DEFAULT_MATERIAL_LINES) -> bytes:
+    """
+    Genera un PDF mínimo de una página con las líneas de texto indicadas
+    """
+    return build_pages_pdf([lines])
+
+
+def build_pages_pdf(pages: list) -> bytes:
+    """
+    Genera un PDF mínimo con una página por cada lista de líneas de `pages`
+    """
+    def escape(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # árbol de páginas: se completa al final
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for lines in pages:
+        commands = ["BT", "/F1 12 Tf", "72 720 Td", "16 TL"]
+        commands.extend(f"({escape(line)}) Tj T*" for line in lines)
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1")
+        page_object = len(objects) + 1
+        kids.append(f"{page_object} 0 R")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents " + f"{page_object + 1} 0 R".encode() + b" >>"
+        )
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Los clientes cancelan solicitudes a propósito (p. ej. los duplicados que pierden la carrera)
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class StubServices:
+    """
+    Servidor HTTP con los stubs de Telegram, LLM, búsqueda web y PDF.
+
+    - `llm_delay`: segundos que tarda cada respuesta del LLM
+    - `llm_chunks`: fragmentos en los que se divide la respuesta en modo streaming
+    - `llm_chunk_delay`: segundos entre fragmentos en modo streaming
+    - `llm_model_delays`: latencia propia de algunos modelos (modelo -> segundos)
+    - `llm_failing_models`: modelos que responden con HTTP 500
+    - `calls`: lista de llamadas a la API de Telegram `(instante, método, parámetros)`
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, llm_delay: float = 0.5,
+                 llm_chunks: int = 4, llm_chunk_delay: float = 0.0, pdf_bytes: bytes | None = None,
+                 llm_model_delays: dict | None = None, llm_failing_models: set | None = None):
+        self.llm_delay = llm_delay
+        self.llm_model_delays = dict(llm_model_delays or {})
+        self.llm_failing_models = set(llm_failing_models or ())
+        self.llm_chunks = max(1, llm_chunks)
+        self.llm_chunk_delay = llm_chunk_delay
+        self.llm_calls = 0
+        self.pdfs = {"/material.pdf": pdf_bytes or build_text_pdf()}
+        self.pdfs.update({f"/{key}.pdf": build_text_pdf(lines) for key, lines in TEMPLATE_LINES.items()})
+        self.calls = []
+        self._lock = threading.Lock()
+        self._next_message_id = 1
+        self._server = _QuietHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "StubServices":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def calls_for(self, method: str) -> list:
+        with self._lock:
+            return [call for call in self.calls if call[1] == method]
+
+    # --- Telegram ---
+
+    def _telegram(self, method: str, params: dict):
+        with self._lock:
+            self.calls.append((time.time(), method, params))
+            message_id = self._next_message_id
+            self._next_message_id += 1
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}
+        if method in ("sendMessage", "editMessageText", "sendDocument"):
+            chat_id = int(params.get("chat_id") or 0)
+            message = {
+                "message_id": int(params.get("message_id") or message_id),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+            }
+            if "text" in params:
+                message["text"] = params["text"]
+            if method == "sendDocument":
+                message["document"] = {"file_id": f"stub-file-{message_id}", "file_unique_id": f"u{message_id}"}
+            return message
+        return True
+
+    # --- LLM ---
+
+    def _llm_answer(self, payload: dict) -> str:
+        question = ""
+        for message in payload.get("messages", []):
+            if message.get("role") == "user":
+                question = message.get("content") or ""
+        return f"Respuesta a: {question}"
+
+    def _make_handler(self):
+        stub = self
+
+        class _StubHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path in stub.pdfs:
+                    self._reply(200, stub.pdfs[path], "application/pdf")
+                elif path == "/search":
+                    self._reply(200, b"{}", "application/json")
+                else:
+                    self._reply(404, b"Not Found", "text/plain")
+
+            def do_POST(self):
+                path = self.path.split("?", 1)[0]
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length > 0 else b""
+                if path.startswith("/bot"):
+                    method = path.rsplit("/", 1)[-1]
+                    result = stub._telegram(method, self._form(body))
+                    self._json(200, {"ok": True, "result": result})
+                elif path.endswith("/chat/completions"):
+                    self._chat_completion(json.loads(body or b"{}"))
+                else:
+                    self._reply(404, b"Not Found", "text/plain")
+
+            def _form(self, body: bytes) -> dict:
+                content_type = self.headers.get("Content-Type", "")
+                if content_type.startswith("application/json"):
+                    return json.loads(body or b"{}")
+                if content_type.startswith("multipart/form-data"):
+                    # Solo se necesitan los campos simples (chat_id, caption...)
+                    params = {}
+                    for part in body.split(b"--" + content_type.split("boundary=")[-1].encode()):
+                        header, _, value = part.partition(b"\r\n\r\n")
+                        if b'name="' in header and b"filename=" not in header:
+                            name = header.split(b'name="', 1)[1].split(b'"', 1)[0].decode()
+                            params[name] = value.rstrip(b"\r\n").decode("utf-8", "replace")
+                    return params
+                return {key: values[-1] for key, values in parse_qs(body.decode("utf-8")).items()}
+
+            def _chat_completion(self, payload: dict):
+                model = payload.get("model", "stub")
+                with stub._lock:
+                    stub.llm_calls += 1
+                time.sleep(stub.llm_model_delays.get(model, stub.llm_delay))
+                if model in stub.llm_failing_models:
+                    self._json(500, {"error": {"message": f"{model} no disponible", "code": 500}})
+                    return
+                answer = stub._llm_answer(payload)
+                if not payload.get("stream"):
+                    self._json(200, {
+                        "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                    })
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                size = max(1, -(-len(answer) // stub.llm_chunks))
+                for start in range(0, len(answer), size):
+                    if start and stub.llm_chunk_delay:
+                        time.sleep(stub.llm_chunk_delay)
+                    chunk = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "delta": {"content": answer[start:start + size]}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _json(self, status: int, data) -> None:
+                self._reply(status, json.dumps(data).encode("utf-8"), "application/json")
+
+            def _reply(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # Evitar logs por cada request
+            def log_message(self, format, *args):
+                return
+
+        return _StubHandler
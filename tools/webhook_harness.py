@@ -0,0 +1,185 @@
+"""
+Prueba local del modo webhook sin Telegram ni OpenRouter.
+
+Levanta los stubs de tools/stub_services.py, arranca `main.py` con BOT_MODE=webhook
+apuntando a ellos, envía por POST updates sintéticos de varios chats y comprueba
+que cada chat recibe sus respuestas en orden. Ejemplo:
+
+    python -m tools.webhook_harness --chats 20 --messages 5 --llm-delay 0.5
+"""
+import os
+import re
+import sys
+import json
+import time
+import signal
+import argparse
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from tools.stub_services import StubServices
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKER = re.compile(r"\[m(\d+)\]")
+SECRET = "harness-secret"
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def build_update(update_id: int, chat_id: int, seq: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": seq + 1,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": f"Estudiante {chat_id}"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"Estudiante {chat_id}"},
+            "text": f"Pregunta de prueba sobre agentes inteligentes [m{seq}]",
+        },
+    }
+
+
+def post_update(url: str, update: dict) -> tuple:
+    request = urllib.request.Request(
+        url, data=json.dumps(update).encode("utf-8"), method="POST",
+        headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": SECRET},
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - started
+
+
+def collect_replies(stub: StubServices) -> dict:
+    """
+    Orden en que aparece por primera vez cada marcador en los mensajes de cada chat
+    """
+    seen = {}
+    for _, method, params in sorted(stub.calls, key=lambda call: call[0]):
+        if method not in ("sendMessage", "editMessageText"):
+            continue
+        chat = seen.setdefault(int(params.get("chat_id") or 0), [])
+        for match in MARKER.finditer(params.get("text", "")):
+            seq = int(match.group(1))
+            if seq not in chat:
+                chat.append(seq)
+    return seen
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba local del modo webhook con updates sintéticos")
+    parser.add_argument("--chats", type=int, default=10, help="Chats simultáneos")
+    parser.add_argument("--messages", type=int, default=5, help="Mensajes por chat")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="Latencia simulada del LLM (s)")
+    parser.add_argument("--workers", type=int, default=16, help="UPDATE_WORKERS del bot")
+    parser.add_argument("--port", type=int, default=8765, help="Puerto del bot (health + webhook)")
+    parser.add_argument("--timeout", type=float, default=120, help="Tiempo máximo de espera (s)")
+    args = parser.parse_args(argv)
+
+    stub = StubServices(llm_delay=args.llm_delay).start()
+    workdir = tempfile.mkdtemp(prefix="webhook_harness_")
+    bot_url = f"http://127.0.0.1:{args.port}"
+    env = dict(
+        os.environ,
+        BOT_MODE="webhook",
+        PORT=str(args.port),
+        WEBHOOK_URL=bot_url,
+        WEBHOOK_PATH="telegram",
+        WEBHOOK_SECRET=SECRET,
+        UPDATE_WORKERS=str(args.workers),
+        API_TOKEN_Telegram="123456:HARNESS",
+        API_TOKEN_deepseek="harness",
+        TELEGRAM_API_BASE_URL=stub.base_url,
+        LLM_BASE_URL=f"{stub.base_url}/v1",
+        WEB_SEARCH_ENDPOINT=f"{stub.base_url}/search",
+        PDF_URL=f"{stub.base_url}/material.pdf",
+        PDF_URL_CORTE_I=f"{stub.base_url}/corte_i.pdf",
+        PDF_URL_CORTE_II=f"{stub.base_url}/corte_ii.pdf",
+        PDF_URL_CORTE_III=f"{stub.base_url}/corte_iii.pdf",
+        PDF_CACHE_DIR=os.path.join(workdir, "pdf_cache"),
+        RESOURCE_REGISTRY_PATH=os.path.join(workdir, "resource_registry.json"),
+        ANSWER_CACHE_PATH=os.path.join(workdir, "answer_cache.json"),
+        FAQ_DIR=os.path.join(workdir, "faq"),
+        HISTORY_DB_PATH=os.path.join(workdir, "history.sqlite3"),
+        LOG_FILE_PATH=os.path.join(workdir, "interactions.log"),
+        STREAM_EDIT_INTERVAL="0.1",
+        RATE_LIMIT_PER_MINUTE="0",
+    )
+    bot = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env)
+    try:
+        if not wait_ready(f"{bot_url}/ready", bot, timeout=60):
+            print("❌ El bot no quedó listo (¿puerto ocupado o error al arrancar?)", file=sys.stderr)
+            return 1
+
+        webhook_url = f"{bot_url}/telegram"
+        chat_ids = [1000 + i for i in range(args.chats)]
+        statuses, post_latencies = [], []
+
+        def send_chat(index: int, chat_id: int):
+            # Telegram entrega los updates de un chat en orden: uno tras otro
+            for seq in range(args.messages):
+                status, latency = post_update(webhook_url, build_update(index * args.messages + seq + 1, chat_id, seq))
+                statuses.append(status)
+                post_latencies.append(latency)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, args.chats)) as pool:
+            list(pool.map(send_chat, range(len(chat_ids)), chat_ids))
+
+        expected = list(range(args.messages))
+        deadline = time.monotonic() + args.timeout
+        while time.monotonic() < deadline:
+            replies = collect_replies(stub)
+            if all(len(replies.get(chat_id, [])) >= args.messages for chat_id in chat_ids):
+                break
+            time.sleep(0.1)
+        elapsed = time.perf_counter() - started
+
+        replies = collect_replies(stub)
+        incomplete = [chat_id for chat_id in chat_ids if len(replies.get(chat_id, [])) < args.messages]
+        out_of_order = [chat_id for chat_id in chat_ids
+                        if chat_id not in incomplete and replies[chat_id][:args.messages] != expected]
+        sequential = args.chats * args.messages * args.llm_delay
+
+        print(f"📨 Updates enviados: {len(statuses)} (HTTP 200: {statuses.count(200)})")
+        print(f"⏱️ POST al webhook: p50 {percentile(post_latencies, 0.5) * 1000:.1f} ms, "
+              f"p95 {percentile(post_latencies, 0.95) * 1000:.1f} ms")
+        print(f"⏱️ Todas las respuestas en {elapsed:.2f} s (secuencial ≈ {sequential:.2f} s)")
+        print(f"💬 Chats incompletos: {len(incomplete)} · chats con respuestas desordenadas: {len(out_of_order)}")
+        ok = statuses.count(200) == len(statuses) and not incomplete and not out_of_order
+        print("✅ Orden por chat respetado" if ok else "❌ La prueba falló")
+        return 0 if ok else 1
+    finally:
+        bot.send_signal(signal.SIGINT)
+        try:
+            bot.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            bot.kill()
+        stub.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())